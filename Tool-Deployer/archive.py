@@ -0,0 +1,201 @@
+import os
+import re
+import time
+import zlib
+import hashlib
+import tarfile
+import http.client
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Optional, Tuple
+from colorama import Fore
+from command_runner import runner, backoff_delay, NETWORK_TIMEOUT
+from safe_tar import safe_parts, extract_member
+
+# Where repository tarballs come from; {owner}, {repo}, {ref} and {commit} are filled in.
+# {commit} is the resolved commit when it is known and the requested ref otherwise.
+ARCHIVE_URL = os.environ.get('TOOL_DEPLOYER_ARCHIVE_URL', "https://codeload.github.com/{owner}/{repo}/tar.gz/{commit}")
+# Reconnects after a dropped connection, each resuming where the download stopped
+DOWNLOAD_RETRIES = 5
+# Seconds without data before a connection counts as dropped
+READ_TIMEOUT = 60.0
+CHUNK = 256 * 1024
+# Server errors worth another attempt; anything else in the 4xx range is final
+RETRIED_STATUS = {408, 425, 429, 500, 502, 503, 504}
+COMMIT_PATTERN = re.compile(r'[0-9a-f]{40}')
+
+def archive_url(template: str, repo_url: str, ref: Optional[str] = None, commit: Optional[str] = None) -> str:
+    """Fill in the download URL template for a repository URL such as https://github.com/owner/repo.git"""
+    path = urllib.parse.urlparse(repo_url).path if '://' in repo_url else repo_url.split(':', 1)[-1]
+    parts = [part for part in path.split('/') if part]
+    if len(parts) < 2:
+        raise ValueError(f"cannot tell the owner and repository of {repo_url}")
+    repo = parts[-1][:-4] if parts[-1].endswith('.git') else parts[-1]
+    quote = lambda value: urllib.parse.quote(value, safe='/')
+    return template.format(owner=quote(parts[-2]), repo=quote(repo), ref=quote(ref or 'HEAD'),
+                           commit=quote(commit or ref or 'HEAD'))
+
+class ResumableStream:
+    """An HTTP(S) download read like a file, reconnecting with a Range request when the connection drops.
+
+    Every byte handed out is also hashed, so the checksum covers exactly what
+    was extracted. A server that ignores the range is read past the part already
+    consumed; one that serves different content (a changed ETag) is an error.
+    """
+
+    def __init__(self, url: str, retries: int = DOWNLOAD_RETRIES, timeout: float = READ_TIMEOUT):
+        self.url = url
+        self.retries = retries
+        self.timeout = timeout
+        self.offset = 0
+        self.length: Optional[int] = None
+        self.validator: Optional[str] = None
+        self.resumed = 0
+        self.digest = hashlib.sha256()
+        self._response = None
+
+    @staticmethod
+    def _validator(response) -> Optional[str]:
+        # Weak ETags cannot be used in If-Range
+        etag = response.headers.get('ETag')
+        return etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+
+    def _open(self):
+        headers = {'User-Agent': 'tool-deployer', 'Accept-Encoding': 'identity'}
+        if self.offset:
+            headers['Range'] = f"bytes={self.offset}-"
+            if self.validator:
+                headers['If-Range'] = self.validator
+            self.resumed += 1
+        response = urllib.request.urlopen(urllib.request.Request(self.url, headers=headers), timeout=self.timeout)
+        if not self.offset:
+            self.validator = self._validator(response)
+            length = response.headers.get('Content-Length')
+            self.length = int(length) if length and length.isdigit() else None
+        elif (getattr(response, 'status', None) or 200) != 206:
+            if self.validator and self._validator(response) != self.validator:
+                response.close()
+                raise ValueError(f"{self.url} changed while it was being downloaded")
+            remaining = self.offset
+            while remaining:
+                skipped = response.read(min(CHUNK, remaining))
+                if not skipped:
+                    raise http.client.IncompleteRead(b'', remaining)
+                remaining -= len(skipped)
+        self._response = response
+
+    def read(self, size: int = -1) -> bytes:
+        size = size if size and size > 0 else CHUNK
+        attempt = 0
+        while True:
+            try:
+                if self._response is None:
+                    self._open()
+                data = self._response.read(size)
+                if not data and self.length is not None and self.offset < self.length:
+                    raise http.client.IncompleteRead(b'', self.length - self.offset)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if isinstance(e, urllib.error.HTTPError) and e.code not in RETRIED_STATUS:
+                    raise OSError(f"{self.url}: HTTP {e.code} {e.reason}") from e
+                attempt += 1
+                if attempt > self.retries:
+                    raise OSError(f"download of {self.url} failed after {attempt} attempts: {e}") from e
+                time.sleep(backoff_delay(attempt))
+        self.offset += len(data)
+        self.digest.update(data)
+        return data
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+class ArchiveSource:
+    """Installs repository snapshots from tarballs over HTTP(S) instead of git clones.
+
+    The tarball is extracted while it downloads, with no temporary file: only
+    the files end up on disk, and no history or .git directory is transferred.
+    A dropped connection resumes with a Range request. The commit comes from
+    git ls-remote, so archive installs can still be checked for updates cheaply.
+    """
+
+    def __init__(self, config, template: Optional[str] = None):
+        self.config = config
+        self.template = template or ARCHIVE_URL
+
+    def resolve(self, repo_url: str, ref: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """The commit a ref (default: the remote HEAD) points at, and the branch if it is one"""
+        if ref is None:
+            argv = ['git', 'ls-remote', '--symref', repo_url, 'HEAD']
+        else:
+            argv = ['git', 'ls-remote', repo_url, f"refs/heads/{ref}", f"refs/tags/{ref}", f"refs/tags/{ref}^{{}}"]
+        result = runner.run(argv, retries=2, timeout=NETWORK_TIMEOUT)
+        if not result.ok:
+            self.config.print(f"Could not look up {ref or 'HEAD'} of {repo_url}: {result.describe()}", Fore.YELLOW)
+            return (ref if ref and COMMIT_PATTERN.fullmatch(ref) else None), None
+        refs, head = {}, None
+        for line in result.stdout.splitlines():
+            value, _, name = line.partition('\t')
+            if value.startswith('ref: '):
+                head = value[len('ref: '):].strip()
+            else:
+                refs[name.strip()] = value.strip()
+        if ref is None:
+            branch = head[len('refs/heads/'):] if head and head.startswith('refs/heads/') else None
+            return refs.get('HEAD'), branch
+        if f"refs/heads/{ref}" in refs:
+            return refs[f"refs/heads/{ref}"], ref
+        # Annotated tags are peeled to the commit they point at
+        commit = refs.get(f"refs/tags/{ref}^{{}}") or refs.get(f"refs/tags/{ref}")
+        if commit:
+            return commit, None
+        return (ref if COMMIT_PATTERN.fullmatch(ref) else None), None
+
+    def fetch(self, repo_url: str, destination: str, ref: Optional[str] = None, commit: Optional[str] = None,
+              sha256: Optional[str] = None) -> Dict:
+        """Download and extract a tarball into destination, dropping its top-level directory.
+
+        Returns {'url': template, 'sha256': digest, 'commit': commit}. Without a
+        known commit, the one git archive stores in the pax header is used. A
+        checksum mismatch is only known once everything is extracted, so callers
+        discard destination whenever this raises.
+        """
+        from mirror_cache import format_size
+        url = archive_url(self.template, repo_url, ref, commit)
+        self.config.print(f"Downloading {url} into {destination}...", Fore.CYAN)
+        root = os.path.realpath(destination)
+        os.makedirs(root, exist_ok=True)
+        start = time.perf_counter()
+        stream = ResumableStream(url)
+        try:
+            with tarfile.open(fileobj=stream, mode='r|*') as tar:
+                for member in tar:
+                    parts = safe_parts(member.name)
+                    if len(parts) < 2:
+                        if member.isdir():
+                            continue
+                        raise ValueError(f"{member.name} is outside the archive's top-level directory")
+                    # Hardlinks name earlier members with the top-level directory
+                    extract_member(tar, member, root, parts[1:], link_prefix=parts[:1])
+                embedded = tar.pax_headers.get('comment')
+            # The tar end marker can come before the end of the compressed data; the checksum covers all of it
+            while stream.read(CHUNK):
+                pass
+        except (tarfile.TarError, EOFError, zlib.error) as e:
+            raise ValueError(f"{url} is not a readable tarball: {e}")
+        finally:
+            stream.close()
+
+        digest = stream.digest.hexdigest()
+        if sha256 and digest != sha256.lower():
+            raise ValueError(f"checksum mismatch for {url}: expected {sha256.lower()}, got {digest}")
+        message = f"Downloaded {format_size(stream.offset)} in {time.perf_counter() - start:.2f}s"
+        if stream.resumed:
+            message += f", resumed {stream.resumed} times"
+        self.config.print(message, Fore.CYAN)
+        if not commit and embedded and COMMIT_PATTERN.fullmatch(embedded):
+            commit = embedded
+        return {'url': self.template, 'sha256': digest, 'commit': commit}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Import-time budget check for the quick CLI paths.
+
+Runs `list`, `uninstall` and `--help` under `python -X importtime` against an
+empty temporary HOME and fails when a command imports one of the heavy modules
+or its total import time goes over budget.
+
+    python benchmarks/import_time.py [--budget-ms 100]
+"""
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "tool_deployer.py")
+
+DEFAULT_BUDGET_MS = 100.0
+
+# Commands that must stay fast, and the modules they must not import
+QUICK_COMMANDS = [["--help"], ["list"], ["uninstall", "does-not-exist"]]
+HEAVY_MODULES = {
+    "tqdm", "packaging", "importlib.metadata", "dependency_manager", "venv_manager",
+    "mirror_cache", "git_utils", "executable_scanner", "concurrent.futures", "yaml", "asyncio",
+    "bundle", "tarfile", "requirements_index", "watcher", "bytecode", "dedupe", "status", "archive",
+    "integrity", "safe_tar",
+}
+
+def measure(args, home):
+    """Run a command under -X importtime and return (total_ms, imported module names)"""
+    env = dict(os.environ, HOME=home, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", SCRIPT, *args],
+                            env=env, capture_output=True, text=True)
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports are not indented; their cumulative times add up to the total
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+def check(budget_ms=DEFAULT_BUDGET_MS, runs=3):
+    """Measure every quick command; returns ([(label, total_ms)], [failure messages])"""
+    timings, failures = [], []
+    with tempfile.TemporaryDirectory() as home:
+        # Warm the bytecode cache of the interpreter's own modules
+        measure(["--help"], home)
+        for command in QUICK_COMMANDS:
+            results = [measure(command, home) for _ in range(max(1, runs))]
+            total = min(total for total, _ in results)
+            heavy = sorted(name for name in results[0][1] if name in HEAVY_MODULES)
+            label = " ".join(command)
+            timings.append((label, total))
+            if heavy:
+                failures.append(f"{label}: imports {', '.join(heavy)}")
+            if total > budget_ms:
+                failures.append(f"{label}: {total:.1f} ms exceeds the {budget_ms:.0f} ms budget")
+    return timings, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum total import time per command")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per command; the fastest one is compared")
+    args = parser.parse_args()
+
+    timings, failures = check(args.budget_ms, args.runs)
+    for label, total in timings:
+        print(f"{label:<28} {total:7.1f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Offline benchmark suite for Tool Deployer.
+
+Builds synthetic bare repositories reachable over file://, puts stub pip/npm/yarn
+executables first on PATH and times install, update, list, verify and uninstall
+for 1, 10 and 100 tools. Nothing touches the network or the real home directory.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --threshold 0.25
+
+With --baseline the run fails when any metric is slower than the baseline by more
+than the threshold (a fraction, 0.25 = 25%).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "tool_deployer.py")
+sys.path.insert(0, ROOT)
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_THRESHOLD = 0.25
+# Timings below this are dominated by noise and are never reported as regressions
+NOISE_FLOOR = 0.05
+
+RUN_SH = "#!/bin/sh\necho \"$(basename \"$(dirname \"$0\")\") ok\"\n"
+
+# Stub package managers: instant installs and deterministic answers to version queries
+STUBS = {
+    "pip": """#!/bin/sh
+case "$1" in
+  --version) echo "pip 24.0 from stub (python 3)";;
+  show) echo "Name: $2"; echo "Version: 1.0.0";;
+  list) echo "[]";;
+  *) echo "stub pip $*";;
+esac
+""",
+    "npm": """#!/bin/sh
+case "$1" in
+  --version|-v) echo "10.0.0";;
+  list|ls) echo "{}";;
+  *) echo "stub npm $*";;
+esac
+""",
+    "yarn": """#!/bin/sh
+case "$1" in
+  --version|-v) echo "1.22.0";;
+  list) echo "{}";;
+  *) echo "stub yarn $*";;
+esac
+""",
+}
+
+def _fast_import(repo: str, commits: List[Dict[str, str]]):
+    """Write a linear history with git fast-import; each commit maps paths to contents"""
+    stream = []
+    for idx, files in enumerate(commits, 1):
+        message = f"commit {idx}\n".encode()
+        stream.append(f"commit refs/heads/main\nmark :{idx}\n"
+                      f"committer Bench <bench@example.com> {1700000000 + idx} +0000\n".encode())
+        stream.append(f"data {len(message)}\n".encode() + message)
+        if idx > 1:
+            stream.append(f"from :{idx - 1}\n".encode())
+        for path, content in files.items():
+            data = content.encode()
+            mode = "100755" if path.endswith(".sh") else "100644"
+            stream.append(f"M {mode} inline {path}\ndata {len(data)}\n".encode() + data + b"\n")
+        stream.append(b"\n")
+    subprocess.run(["git", "-C", repo, "fast-import", "--quiet"], input=b"".join(stream), check=True)
+
+def _fixture_commits(kind: str) -> List[Dict[str, str]]:
+    base = {"run.sh": RUN_SH, "README.md": f"# {kind}\n"}
+    if kind == "small":
+        base["main.py"] = "print('small')\n"
+        base["requirements.txt"] = "".join(f"smallpkg{i}==1.0.{i}\n" for i in range(5))
+        return [base, {"main.py": "print('small v2')\n"}]
+    if kind == "history":
+        return [base] + [{"CHANGES.txt": f"change {i}\n" * (i % 7 + 1)} for i in range(500)]
+    if kind == "many_files":
+        base.update({f"pkg{i // 100}/module{i}.py": f"VALUE = {i}\n" for i in range(5000)})
+        return [base]
+    if kind == "deep_tree":
+        path = ""
+        for depth in range(15):
+            path += f"level{depth}/"
+            base[f"{path}file{depth}.py"] = f"DEPTH = {depth}\n"
+            base[f"{path}tool{depth}.sh"] = "#!/bin/sh\n"
+        return [base]
+    if kind == "big_requirements":
+        base["requirements.txt"] = "".join(f"benchpkg{i}==1.{i % 10}.{i}\n" for i in range(300))
+        return [base]
+    if kind == "big_package_json":
+        base["package.json"] = json.dumps({
+            "name": "big-package-json", "version": "1.0.0", "bin": {"big": "run.sh"},
+            "dependencies": {f"bench-dep-{i}": f"^{i % 5}.{i % 10}.0" for i in range(300)},
+        }, indent=2)
+        return [base]
+    raise ValueError(kind)
+
+FIXTURES = ["small", "history", "many_files", "deep_tree", "big_requirements", "big_package_json"]
+
+def create_fixtures(workdir: str) -> Dict[str, str]:
+    """Create the bare fixture repositories and return name -> file:// URL"""
+    urls = {}
+    for kind in FIXTURES:
+        repo = os.path.join(workdir, "repos", f"{kind}.git")
+        subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=main", repo], check=True)
+        _fast_import(repo, _fixture_commits(kind))
+        urls[kind] = "file://" + repo
+    return urls
+
+def advance_fixtures(urls: Dict[str, str], round_number: int):
+    """Push one more commit to every fixture so updates have something to pull"""
+    for url in urls.values():
+        repo = url[len("file://"):]
+        message = f"bench update {round_number}\n".encode()
+        content = f"round {round_number}\n".encode()
+        stream = (f"commit refs/heads/main\ncommitter Bench <bench@example.com> {1800000000 + round_number} +0000\n"
+                  f"data {len(message)}\n").encode() + message + b"from refs/heads/main^0\n" + \
+                 f"M 100644 inline BENCH_ROUND\ndata {len(content)}\n".encode() + content + b"\n\n"
+        subprocess.run(["git", "-C", repo, "fast-import", "--quiet", "--force"], input=stream, check=True)
+
+def create_stubs(workdir: str) -> str:
+    stub_dir = os.path.join(workdir, "stubs")
+    os.makedirs(stub_dir, exist_ok=True)
+    for name, content in STUBS.items():
+        path = os.path.join(stub_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        os.chmod(path, 0o755)
+    return stub_dir
+
+class Runner:
+    """Runs the deployer CLI against an isolated HOME with the stubs on PATH"""
+
+    def __init__(self, home: str, stub_dir: str):
+        self.env = dict(os.environ, HOME=home, PATH=stub_dir + os.pathsep + os.environ.get("PATH", ""))
+
+    def run(self, *args: str):
+        result = subprocess.run([sys.executable, SCRIPT, "-q", "--no-banner", *args], env=self.env,
+                                stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed ({result.returncode}):\n{result.stdout}{result.stderr}")
+
+    def timed(self, *args: str) -> float:
+        start = time.perf_counter()
+        self.run(*args)
+        return time.perf_counter() - start
+
+def bench_scale(urls: Dict[str, str], stub_dir: str, count: int, jobs: int, workdir: str) -> Dict[str, float]:
+    """Time the CLI lifecycle for `count` tools cycled over the fixtures"""
+    home = tempfile.mkdtemp(prefix=f"home-{count}-", dir=workdir)
+    runner = Runner(home, stub_dir)
+    names = [f"{FIXTURES[i % len(FIXTURES)]}-{i}" for i in range(count)]
+    manifest = os.path.join(home, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump([{"url": urls[name.rsplit("-", 1)[0]], "name": name, "executable": "run.sh"} for name in names], f)
+
+    results = {}
+    results["install"] = runner.timed("install", "--manifest", manifest, "--jobs", str(jobs))
+    results["list"] = runner.timed("list")
+    results["update_noop"] = runner.timed("update", "--all", "--jobs", str(jobs))
+    advance_fixtures(urls, count)
+    results["update_changed"] = runner.timed("update", "--all", "--jobs", str(jobs))
+    results["verify"] = bench_verify([os.path.join(home, "tools", name) for name in names])
+    start = time.perf_counter()
+    for name in names:
+        runner.run("uninstall", name)
+    results["uninstall"] = time.perf_counter() - start
+    shutil.rmtree(home, ignore_errors=True)
+    return results
+
+def bench_verify(tool_dirs: List[str]) -> float:
+    """Time dependency verification over installed tools, in-process"""
+    from tool_deployer import config
+    from dependency_manager import DependencyManager
+    config.quiet = True
+    manager = DependencyManager(config)
+    start = time.perf_counter()
+    for tool_dir in tool_dirs:
+        manager.verify_dependencies(tool_dir)
+    return time.perf_counter() - start
+
+def bench_components(urls: Dict[str, str], workdir: str) -> Dict[str, float]:
+    """Time clone_repo, detect_executables and verify_dependencies on each fixture"""
+    from tool_deployer import config, clone_repo, detect_executables
+    from dependency_manager import DependencyManager
+    config.quiet = True
+    results = {}
+    checkouts = os.path.join(workdir, "checkouts")
+    for kind, url in urls.items():
+        target = os.path.join(checkouts, kind)
+        start = time.perf_counter()
+        clone_repo(url, target)
+        results[f"clone_repo[{kind}]"] = time.perf_counter() - start
+        start = time.perf_counter()
+        detect_executables(target)
+        results[f"detect_executables[{kind}]"] = time.perf_counter() - start
+        start = time.perf_counter()
+        DependencyManager(config).verify_dependencies(target)
+        results[f"verify_dependencies[{kind}]"] = time.perf_counter() - start
+    return results
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Return a message for every metric that regressed beyond the threshold"""
+    regressions = []
+    for metric, value in sorted(results.items()):
+        previous = baseline.get(metric)
+        if previous is None or value < NOISE_FLOOR:
+            continue
+        if value > previous * (1 + threshold):
+            regressions.append(f"{metric}: {value:.3f}s vs {previous:.3f}s baseline (+{(value / previous - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Tool Deployer benchmarks")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma separated tool counts (default: 1,10,100)")
+    parser.add_argument("--jobs", type=int, default=8, help="Parallel jobs for install and update")
+    parser.add_argument("--repeat", type=int, default=1, help="Run everything N times and keep the best time per metric")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown against the baseline as a fraction (default: 0.25)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary fixtures for inspection")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    workdir = tempfile.mkdtemp(prefix="tool-deployer-bench-")
+    results: Dict[str, float] = {}
+    try:
+        urls = create_fixtures(workdir)
+        stub_dir = create_stubs(workdir)
+        # In-process benchmarks also need the stubs and must not write to the real home
+        os.environ["PATH"] = stub_dir + os.pathsep + os.environ.get("PATH", "")
+        os.environ["HOME"] = os.path.join(workdir, "home-components")
+        for round_number in range(max(1, args.repeat)):
+            samples = bench_components(urls, os.path.join(workdir, f"round{round_number}"))
+            for count in scales:
+                for metric, value in bench_scale(urls, stub_dir, count, args.jobs, workdir).items():
+                    samples[f"{metric}[{count}]"] = value
+            for metric, value in samples.items():
+                results[metric] = min(value, results.get(metric, value))
+    finally:
+        if args.keep:
+            print(f"Fixtures kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for metric, value in results.items():
+        print(f"{metric:<40} {value:8.3f}s")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+            "scales": scales,
+            "jobs": args.jobs,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import os
+import io
+import sys
+import json
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+from colorama import Fore
+from command_runner import runner, NETWORK_TIMEOUT
+from safe_tar import safe_parts, extract_member
+
+BUNDLE_FORMAT = 1
+METADATA_FILE = "bundle.json"
+# git bundles are streamed into the archive in members of at most this size
+CHUNK_SIZE = 16 * 1024 * 1024
+
+def compression_for(path: str) -> str:
+    """Pick the tar compression from an archive name"""
+    return "gz" if path.endswith((".tar.gz", ".tgz")) else ""
+
+class _ChunkWriter:
+    """Splits a byte stream of unknown length into fixed-size tar members"""
+
+    def __init__(self, tar: tarfile.TarFile, prefix: str):
+        self.tar = tar
+        self.prefix = prefix
+        self.buffer = bytearray()
+        self.index = 0
+
+    def write(self, data: bytes):
+        self.buffer.extend(data)
+        while len(self.buffer) >= CHUNK_SIZE:
+            self._emit(bytes(self.buffer[:CHUNK_SIZE]))
+            del self.buffer[:CHUNK_SIZE]
+
+    def close(self):
+        if self.buffer or not self.index:
+            self._emit(bytes(self.buffer))
+        self.buffer = bytearray()
+
+    def _emit(self, data: bytes):
+        info = tarfile.TarInfo(f"{self.prefix}.{self.index:04d}")
+        info.size = len(data)
+        info.mtime = int(datetime.now().timestamp())
+        self.tar.addfile(info, io.BytesIO(data))
+        self.index += 1
+
+class ToolBundle:
+    """Packs installed tools into one tar stream and unpacks it for offline installs.
+
+    An archive holds bundle.json (registry metadata), each tool's repository as
+    git bundle chunks, its node_modules and shallow boundary, and a shared
+    wheelhouse of the Python dependencies. Everything is streamed into the archive straight from git and
+    the tool directories.
+    """
+
+    def __init__(self, config, tool_manager):
+        self.config = config
+        self.tool_manager = tool_manager
+
+    def _metadata(self, name: str, info: Dict) -> Optional[Dict]:
+        path = info['path']
+        url = info.get('url') or self.tool_manager._git_output(['remote', 'get-url', 'origin'], cwd=path)
+        if not url or not os.path.isdir(os.path.join(path, '.git')):
+            return None
+        executable = info.get('executable')
+        return {
+            'url': url,
+            'ref': info.get('ref'),
+            'clone': info.get('clone'),
+            'venv': bool(info.get('venv')),
+            'executable': os.path.relpath(executable, path) if executable else None,
+            'commit': info.get('commit'),
+            'branch': info.get('branch'),
+        }
+
+    def export(self, names: List[str], fileobj, compression: str = "") -> List[str]:
+        """Write the named tools into a tar stream and return the names that were exported"""
+        tools = {}
+        for name in names:
+            info = self.tool_manager.get_tool(name)
+            if not info:
+                self.config.print(f"Tool {name} is not installed, skipping.", Fore.YELLOW)
+                continue
+            metadata = self._metadata(name, info)
+            if not metadata:
+                self.config.print(f"{name} is not a git checkout, skipping.", Fore.YELLOW)
+                continue
+            tools[name] = (info, metadata)
+
+        with tarfile.open(fileobj=fileobj, mode=f"w|{compression}") as tar:
+            document = json.dumps({
+                'format': BUNDLE_FORMAT,
+                'created': datetime.now().isoformat(),
+                'python': f"{sys.version_info[0]}.{sys.version_info[1]}",
+                'tools': {name: metadata for name, (_, metadata) in tools.items()},
+            }, indent=2).encode()
+            info = tarfile.TarInfo(METADATA_FILE)
+            info.size = len(document)
+            info.mtime = int(datetime.now().timestamp())
+            tar.addfile(info, io.BytesIO(document))
+
+            wheels = set()
+            for name, (info, _) in tools.items():
+                self.config.print(f"Exporting {name}...", Fore.CYAN)
+                self._add_repository(tar, name, info['path'])
+                for extra in ('node_modules', os.path.join('.git', 'shallow')):
+                    # A bundle does not carry the shallow boundary, so it travels as a file
+                    if os.path.exists(os.path.join(info['path'], extra)):
+                        tar.add(os.path.join(info['path'], extra),
+                                arcname=f"tools/{name}/files/{extra.replace(os.sep, '/')}")
+                self._add_wheels(tar, name, info['path'], wheels)
+        return list(tools)
+
+    def _add_repository(self, tar: tarfile.TarFile, name: str, path: str):
+        writer = _ChunkWriter(tar, f"tools/{name}/repo.bundle")
+        runner.run(['git', '-C', path, 'bundle', 'create', '--quiet', '-', '--all'],
+                   check=True, timeout=NETWORK_TIMEOUT, stdout_sink=writer.write)
+        writer.close()
+
+    def _add_wheels(self, tar: tarfile.TarFile, name: str, path: str, added: set):
+        """Build wheels for a tool's Python requirements and add the ones not in the archive yet"""
+        args = self.tool_manager.venvs.requirement_args(path)
+        if not args:
+            return
+        os.makedirs(self.tool_manager.cache_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="wheels-", dir=self.tool_manager.cache_dir) as wheelhouse:
+            result = runner.run([sys.executable, '-m', 'pip', 'wheel', '--quiet', '-w', wheelhouse, *args],
+                                cwd=path, retries=3, timeout=NETWORK_TIMEOUT)
+            if not result.ok:
+                self.config.print(f"Could not build wheels for {name}; importing it will need network access: "
+                                  f"{result.describe()}", Fore.YELLOW)
+            for wheel in sorted(os.listdir(wheelhouse)):
+                if wheel not in added:
+                    tar.add(os.path.join(wheelhouse, wheel), arcname=f"wheels/{wheel}")
+                    added.add(wheel)
+
+    def unpack(self, fileobj, staging_dir: str) -> Dict:
+        """Unpack an archive stream into staging_dir.
+
+        Returns the bundle metadata, with 'source' (the git bundle) and 'overlay'
+        (files to place in the checkout) added to every tool, and 'wheelhouse'.
+        """
+        wheelhouse = os.path.join(staging_dir, 'wheels')
+        os.makedirs(wheelhouse, exist_ok=True)
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+                metadata = self._unpack_members(tar, staging_dir, wheelhouse)
+        except tarfile.TarError as e:
+            raise ValueError(f"not a valid archive: {e}") from e
+
+        if metadata is None:
+            raise ValueError(f"archive has no {METADATA_FILE}; is it a tool bundle?")
+        for name, tool in metadata['tools'].items():
+            tool['source'] = os.path.join(staging_dir, name, 'repo.bundle')
+            tool['overlay'] = os.path.join(staging_dir, name, 'files')
+        metadata['wheelhouse'] = wheelhouse
+        return metadata
+
+    def _unpack_members(self, tar: tarfile.TarFile, staging_dir: str, wheelhouse: str) -> Optional[Dict]:
+        metadata = None
+        for member in tar:
+            parts = safe_parts(member.name, "bundle")
+            if parts == [METADATA_FILE]:
+                metadata = json.loads(tar.extractfile(member).read())
+                if metadata.get('format') != BUNDLE_FORMAT:
+                    raise ValueError(f"unsupported bundle format {metadata.get('format')}")
+            elif len(parts) == 3 and parts[0] == 'tools' and parts[2].startswith('repo.bundle.'):
+                target = os.path.join(staging_dir, parts[1], 'repo.bundle')
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Chunks are stored in order, so appending reassembles the bundle
+                with open(target, 'ab') as f:
+                    shutil.copyfileobj(tar.extractfile(member), f)
+            elif len(parts) > 3 and parts[0] == 'tools' and parts[2] == 'files':
+                # Hardlinks may only point at earlier members of the same tool's files
+                extract_member(tar, member, os.path.join(staging_dir, parts[1], 'files'), parts[3:],
+                               link_prefix=parts[:3], what="bundle")
+            elif len(parts) == 2 and parts[0] == 'wheels' and member.isfile():
+                with open(os.path.join(wheelhouse, parts[1]), 'wb') as f:
+                    shutil.copyfileobj(tar.extractfile(member), f)
+        return metadata
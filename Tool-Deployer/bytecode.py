@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import shutil
+import threading
+import py_compile
+import importlib.util
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from colorama import Fore
+from command_runner import runner
+
+# Set to 0 to leave bytecode to be written by the first run of each tool
+PRECOMPILE = os.environ.get('TOOL_DEPLOYER_PRECOMPILE', '1') != '0'
+# Directories of a checkout whose modules are not imported when the tool runs
+SKIPPED_DIRS = {
+    '.git', 'node_modules', '.venv', 'venv', '__pycache__', '.tox', '.nox', '.eggs', 'build', 'dist',
+    'vendor', 'vendors', '_vendor', 'vendored', 'third_party', 'thirdparty', 'test', 'tests', 'testing',
+    'docs', 'doc', 'examples', 'samples',
+}
+# Installed packages import their vendored code, so only their tests are skipped
+SKIPPED_PACKAGE_DIRS = {'__pycache__', 'test', 'tests', 'testing'}
+# Fewer files than this are compiled in-process rather than on the worker pool
+PARALLEL_THRESHOLD = 64
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _executor():
+    """Process pool shared by every compilation in this run, so concurrent deploys do not oversubscribe the CPUs"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+            # Spawned workers do not inherit locks held by the runner threads at fork time
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _compile_files(paths: List[str], mode: py_compile.PycInvalidationMode) -> List[str]:
+    """Compile source files next to themselves; returns a message per file that failed"""
+    errors = []
+    for path in paths:
+        try:
+            py_compile.compile(path, doraise=True, invalidation_mode=mode)
+        except (py_compile.PyCompileError, OSError, ValueError) as e:
+            errors.append(f"{path}: {str(e).strip().splitlines()[-1] if str(e).strip() else e}")
+    return errors
+
+def compile_files(paths: List[str], mode: py_compile.PycInvalidationMode) -> List[str]:
+    """Compile files on all cores; returns the failures"""
+    if len(paths) < PARALLEL_THRESHOLD:
+        return _compile_files(paths, mode)
+    workers = os.cpu_count() or 2
+    size = max(16, len(paths) // (workers * 4))
+    chunks = [paths[start:start + size] for start in range(0, len(paths), size)]
+    try:
+        futures = [_executor().submit(_compile_files, chunk, mode) for chunk in chunks]
+        return [error for future in futures for error in future.result()]
+    except (OSError, RuntimeError):
+        # No worker processes available (e.g. restricted sandboxes): compile here instead
+        return _compile_files(paths, mode)
+
+def python_files(root: str, skipped: Set[str]) -> List[str]:
+    """Python sources below root, without descending into skipped or hidden directories"""
+    found = []
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name.lower() not in skipped and not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                    elif entry.name.endswith('.py') and entry.is_file():
+                        found.append(entry.path)
+        except OSError:
+            continue
+    return found
+
+def _link_or_copy(source: str, target: str) -> bool:
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        return True
+    except OSError:
+        return False
+
+class BytecodeCompiler:
+    """Precompiles deployed Python tools, so their first run does not pay for it.
+
+    Bytecode uses hash-based invalidation: it stays valid when a pull or a fresh
+    clone changes file mtimes, and a pyc is reused for as long as its source is
+    unchanged. That holds across releases too, so a new release links the pycs of
+    unchanged files from the active one and only compiles what the update touched.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def _changed(self, path: str, record: Optional[Dict]) -> Optional[Set[str]]:
+        """Files changed since the recorded compiled commit, or None if everything needs compiling"""
+        if not record or record.get('python') != sys.implementation.cache_tag or not record.get('commit'):
+            return None
+        if not os.path.exists(os.path.join(path, '.git')):
+            return None
+        result = runner.run(['git', 'diff', '--name-only', '-z', '--no-renames', record['commit'], 'HEAD'], cwd=path)
+        if not result.ok:
+            return None
+        return {os.path.normpath(name) for name in result.stdout.split('\0') if name}
+
+    def compile_tool(self, path: str, record: Optional[Dict] = None, base: Optional[str] = None) -> Optional[Dict]:
+        """Compile a checkout and return the record to store for it, or None if it has no Python code.
+
+        record describes the previously compiled tree, base is where that tree
+        lives: the same checkout for in-place updates, the active release otherwise.
+        """
+        if not PRECOMPILE:
+            return None
+        start = time.perf_counter()
+        sources = python_files(path, SKIPPED_DIRS)
+        if not sources:
+            return None
+        changed = self._changed(path, record)
+        todo, reused = [], 0
+        for source in sources:
+            relative = os.path.relpath(source, path)
+            if changed is not None and relative not in changed:
+                cfile = importlib.util.cache_from_source(source)
+                if os.path.exists(cfile):
+                    reused += 1
+                    continue
+                if base and base != path:
+                    previous = importlib.util.cache_from_source(os.path.join(base, relative))
+                    if os.path.exists(previous) and _link_or_copy(previous, cfile):
+                        reused += 1
+                        continue
+            todo.append(source)
+        errors = compile_files(todo, py_compile.PycInvalidationMode.CHECKED_HASH)
+        self._report(len(todo) - len(errors), reused, errors, time.perf_counter() - start)
+        commit = None
+        # Archive downloads have no git metadata; git must not pick up a repository further up
+        if os.path.exists(os.path.join(path, '.git')):
+            result = runner.run(['git', 'rev-parse', 'HEAD'], cwd=path)
+            commit = result.stdout.strip() if result.ok else None
+        return {'commit': commit, 'python': sys.implementation.cache_tag}
+
+    def compile_packages(self, entries: Iterable[str]):
+        """Compile unpacked store entries that have not been compiled for this interpreter yet.
+
+        Venvs hardlink their packages from the store, so each package version is
+        compiled once and every tool using it gets the bytecode for free. Store
+        entries never change, which makes unchecked hash-based pycs safe here.
+        """
+        if not PRECOMPILE:
+            return
+        start = time.perf_counter()
+        marker_name = f".bytecode-{sys.implementation.cache_tag}"
+        pending: List[Tuple[str, List[str]]] = []
+        for entry in entries:
+            site = os.path.join(entry, "site")
+            if os.path.isdir(site) and not os.path.exists(os.path.join(entry, marker_name)):
+                pending.append((entry, python_files(site, SKIPPED_PACKAGE_DIRS)))
+        if not pending:
+            return
+        sources = [source for _, files in pending for source in files]
+        errors = compile_files(sources, py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        for entry, _ in pending:
+            try:
+                open(os.path.join(entry, marker_name), 'w').close()
+            except OSError:
+                pass
+        self._report(len(sources) - len(errors), 0, errors, time.perf_counter() - start, "dependency ")
+
+    def _report(self, compiled: int, reused: int, errors: List[str], elapsed: float, kind: str = ""):
+        if self.config.verbose:
+            for error in errors[:20]:
+                self.config.print(f"Could not compile {error}", Fore.YELLOW)
+        message = f"Compiled {compiled} {kind}Python files in {elapsed:.2f}s"
+        if reused:
+            message += f", reused {reused} unchanged"
+        if errors:
+            message += f"; {len(errors)} could not be compiled"
+        self.config.print(message, Fore.CYAN)
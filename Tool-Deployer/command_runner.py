@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import time
+import shlex
+import random
+import shutil
+import signal
+import threading
+from dataclasses import dataclass
+from subprocess import CalledProcessError
+from typing import Callable, Dict, List, Optional, Sequence
+
+from profiler import profiler, command_name
+
+# Upper bound on processes started by the engine at once, across all threads
+DEFAULT_MAX_PROCESSES = int(os.environ.get('TOOL_DEPLOYER_MAX_PROCESSES', (os.cpu_count() or 2) * 2))
+# Timeout for commands that talk to the network (clones, fetches, installers)
+NETWORK_TIMEOUT = float(os.environ.get('TOOL_DEPLOYER_NETWORK_TIMEOUT', 900))
+# Timeout for quick commands such as git config, rev-parse or ls-remote
+LOCAL_TIMEOUT = 120.0
+
+# Longest a worker thread blocks on a process slot before checking back with its event loop
+SLOT_WAIT = 1.0
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Failures worth retrying: name resolution, dropped connections and overloaded servers
+TRANSIENT_ERRORS = re.compile(
+    r"could not resolve (host|proxy)|temporary failure in name resolution|name or service not known"
+    r"|failed to connect|connection (timed out|reset|refused|closed)|operation timed out|timed out"
+    r"|network is unreachable|early eof|rpc failed|remote end hung up|unexpected disconnect"
+    r"|gnutls|ssl_(read|connect|error)|returned error: (408|429|50[0234])|http (408|429|50[0234])"
+    r"|readtimeout|connecttimeout|connectionerror|max retries exceeded|protocolerror"
+    r"|etimedout|econnreset|econnrefused|eai_again|enotfound|socket hang up",
+    re.I
+)
+
+@dataclass
+class CommandResult:
+    """Outcome of a command run by the engine"""
+    argv: List[str]
+    returncode: Optional[int]
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    attempts: int = 1
+    timed_out: bool = False
+    # Set when the process could not be started at all (missing executable, bad cwd)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def transient(self) -> bool:
+        """Whether the failure looks like a network hiccup that a retry may fix"""
+        if self.timed_out:
+            return True
+        if self.ok or self.error or self.returncode is None or self.returncode < 0:
+            return False
+        return bool(TRANSIENT_ERRORS.search(self.stderr[-4000:] + self.stdout[-2000:]))
+
+    @property
+    def output_bytes(self) -> int:
+        return len(self.stdout.encode()) + len(self.stderr.encode())
+
+    def describe(self) -> str:
+        """One line explanation of a failure"""
+        command = shlex.join(self.argv)
+        if self.error:
+            return f"{command}: {self.error}"
+        if self.timed_out:
+            return f"{command} timed out after {self.duration:.0f}s"
+        lines = [line.strip() for line in self.stderr.splitlines() if line.strip()]
+        # Prefer the tool's own error line over trailing hints such as git's access-rights advice
+        errors = [line for line in lines if line.lower().startswith(('fatal:', 'error:', 'err!', 'npm err'))]
+        detail = (errors or lines or [""])[-1]
+        return f"{command} exited with {self.returncode}" + (f": {detail}" if detail else "")
+
+class CommandError(CalledProcessError):
+    """Raised for failed commands when check=True; carries the CommandResult"""
+
+    def __init__(self, result: CommandResult):
+        super().__init__(-1 if result.returncode is None else result.returncode,
+                         result.argv, result.stdout, result.stderr)
+        self.result = result
+
+    def __str__(self) -> str:
+        return self.result.describe()
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Exponential backoff with jitter: half the delay is fixed, the other half random"""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def _kill(pid: int):
+    try:
+        if os.name == 'posix':
+            # Each command runs in its own session, so this also stops its children
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+class CommandRunner:
+    """Runs commands as argv lists on asyncio subprocesses, without an intermediate shell.
+
+    Commands get a timeout, retries with exponential backoff for transient network
+    failures, streamed output capture and a CommandResult instead of an exit. The
+    number of processes running at once is capped across all threads.
+    """
+
+    def __init__(self, max_processes: int = DEFAULT_MAX_PROCESSES):
+        self._slots = threading.BoundedSemaphore(max(1, max_processes))
+
+    def run(self, argv: Sequence, **options) -> CommandResult:
+        """Run a command from synchronous code; see run_async for the options"""
+        import asyncio
+        return asyncio.run(self.run_async(argv, **options))
+
+    def run_many(self, commands: List[Dict]) -> List[CommandResult]:
+        """Run several commands concurrently; each entry holds run_async's arguments (argv, cwd, ...)"""
+        import asyncio
+
+        async def run_all():
+            return await asyncio.gather(*(self.run_async(**command) for command in commands))
+        return asyncio.run(run_all())
+
+    async def run_async(self, argv: Sequence, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                        timeout: Optional[float] = LOCAL_TIMEOUT, retries: int = 0, check: bool = False,
+                        echo: bool = False, on_output: Optional[Callable[[str, str], None]] = None,
+                        on_start: Optional[Callable[[int], None]] = None, input: Optional[str] = None,
+                        stdout_sink: Optional[Callable[[bytes], None]] = None) -> CommandResult:
+        """Run a command and return its CommandResult.
+
+        retries only applies to transient failures (see CommandResult.transient).
+        Output lines are passed to on_output(stream, line) as they arrive and are
+        echoed to the terminal when echo is set. on_start receives the process id,
+        which callers can use to cancel the command. Binary output can be streamed
+        to stdout_sink in chunks instead of being captured; such commands are never
+        retried. check=True raises CommandError.
+        """
+        import asyncio
+        argv = [str(part) for part in argv]
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await self._attempt(argv, cwd, env, timeout, echo, on_output, on_start, input, stdout_sink)
+            # Output already handed to a sink cannot be taken back, so those runs are final
+            if result.ok or attempt > retries or not result.transient or stdout_sink:
+                break
+            delay = backoff_delay(attempt)
+            if echo or on_output:
+                message = f"{result.describe()}; retrying in {delay:.1f}s ({attempt}/{retries})\n"
+                if on_output:
+                    on_output('stderr', message)
+                else:
+                    sys.stderr.write(message)
+            await asyncio.sleep(delay)
+
+        result.attempts = attempt
+        result.duration = time.perf_counter() - start
+        profiler.record(command_name(argv), "subprocess", start, command=shlex.join(argv),
+                        exit_code=result.returncode, output_bytes=result.output_bytes,
+                        attempts=attempt, timed_out=result.timed_out)
+        if check and not result.ok:
+            raise CommandError(result)
+        return result
+
+    async def _acquire_slot(self):
+        """Wait for a process slot in a worker thread, so tasks sharing this event loop keep running"""
+        import asyncio
+        if self._slots.acquire(blocking=False):
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            # A bounded wait keeps the thread from outliving the loop when no slot is ever freed
+            waiter = loop.run_in_executor(None, lambda: self._slots.acquire(timeout=SLOT_WAIT))
+            try:
+                if await asyncio.shield(waiter):
+                    return
+            except asyncio.CancelledError:
+                # The thread can still get a slot after the task is cancelled; hand it back
+                if await waiter:
+                    self._slots.release()
+                raise
+
+    async def _attempt(self, argv, cwd, env, timeout, echo, on_output, on_start, input, stdout_sink) -> CommandResult:
+        import asyncio
+        await self._acquire_slot()
+        try:
+            # Resolve bare names through PATH (and PATHEXT on Windows) the way a shell would
+            executable = argv[0] if os.path.dirname(argv[0]) else shutil.which(argv[0]) or argv[0]
+            started = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    executable, *argv[1:], cwd=cwd, env=env,
+                    stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                    start_new_session=os.name == 'posix', limit=1024 * 1024
+                )
+            except OSError as e:
+                return CommandResult(argv, None, error=e.strerror or str(e))
+            if on_start:
+                on_start(process.pid)
+
+            output = {'stdout': [], 'stderr': []}
+
+            async def drain(stream):
+                while True:
+                    chunk = await stream.read(1024 * 1024)
+                    if not chunk:
+                        return
+                    stdout_sink(chunk)
+
+            async def pump(stream, name: str):
+                while True:
+                    line = await stream.readline()
+                    if not line:
+                        return
+                    text = line.decode(errors='replace')
+                    output[name].append(text)
+                    if on_output:
+                        on_output(name, text)
+                    if echo:
+                        target = sys.stdout if name == 'stdout' else sys.stderr
+                        target.write(text)
+                        target.flush()
+
+            async def communicate():
+                if input is not None:
+                    process.stdin.write(input.encode())
+                    await process.stdin.drain()
+                    process.stdin.close()
+                stdout = drain(process.stdout) if stdout_sink else pump(process.stdout, 'stdout')
+                await asyncio.gather(stdout, pump(process.stderr, 'stderr'))
+                return await process.wait()
+
+            timed_out = False
+            try:
+                returncode = await asyncio.wait_for(communicate(), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                _kill(process.pid)
+                returncode = await process.wait()
+            return CommandResult(argv, None if timed_out else returncode, ''.join(output['stdout']),
+                                 ''.join(output['stderr']), duration=time.perf_counter() - started,
+                                 timed_out=timed_out)
+        finally:
+            self._slots.release()
+
+# Shared engine used by every module
+runner = CommandRunner()
@@ -0,0 +1,307 @@
+import os
+import sys
+import stat
+import errno
+import shutil
+import hashlib
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from colorama import Fore
+
+# Set to 1 to deduplicate every tool right after it is installed or updated
+AUTO_DEDUPE = os.environ.get('TOOL_DEPLOYER_DEDUPE', '0') == '1'
+# Smaller files are left alone; linking them saves a block or two at best
+MIN_SIZE = 16 * 1024
+HASH_CHUNK = 1024 * 1024
+# Repository internals, and files that tools commonly rewrite in place
+SKIPPED_DIRS = {'.git', '.hg', '.svn'}
+SKIPPED_SUFFIXES = ('.db', '.sqlite', '.sqlite3', '.db-wal', '.db-shm', '.log', '.lock', '.pid')
+# Linux ioctl that makes a file share another file's extents copy-on-write (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+# Errors meaning the filesystem cannot clone between these two files
+CLONE_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EBADF}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    -- NULL until the file has a same-sized counterpart and gets hashed
+    digest TEXT
+);
+"""
+
+@dataclass
+class FileInfo:
+    """A regular file seen by a scan"""
+    path: str
+    dev: int
+    ino: int
+    size: int
+    mtime_ns: int
+    mode: int
+    uid: int
+    nlink: int
+    digest: Optional[str] = None
+
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result) -> "FileInfo":
+        return cls(path, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, stat.S_IMODE(st.st_mode),
+                   st.st_uid, st.st_nlink)
+
+    def unchanged(self, st: os.stat_result) -> bool:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (self.dev, self.ino, self.size, self.mtime_ns)
+
+@dataclass
+class DedupeReport:
+    """What a deduplication run found and did"""
+    scanned: int = 0
+    scanned_bytes: int = 0
+    hashed: int = 0
+    hashed_bytes: int = 0
+    linked: int = 0
+    reclaimed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in fixed-size chunks into one reused buffer"""
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+class Deduplicator:
+    """Replaces identical files across tool checkouts with reflinks or hardlinks.
+
+    Only files that share a device, size, mode and owner with another file are
+    hashed, and digests are kept in an index keyed by path, so a file whose size,
+    mtime and inode are unchanged is never read again. Reflinks are preferred
+    because the copies stay independent; hardlinks are the fallback, and files
+    on different filesystems are never linked.
+    """
+
+    def __init__(self, config, index_file: str, mode: str = 'auto', min_size: int = MIN_SIZE):
+        self.config = config
+        self.index_file = index_file
+        self.mode = mode
+        self.min_size = min_size
+        # Devices where cloning failed once; later files go straight to the fallback
+        self._no_reflink = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        connection = sqlite3.connect(self.index_file, timeout=30.0)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _load_index(self) -> Dict[str, Tuple[int, int, int, int, Optional[str]]]:
+        connection = self._connect()
+        try:
+            return {row[0]: tuple(row[1:]) for row in
+                    connection.execute("SELECT path, dev, ino, size, mtime_ns, digest FROM files")}
+        finally:
+            connection.close()
+
+    def _save_index(self, files: Iterable[FileInfo], roots: Optional[List[str]]):
+        """Record the scanned files; a full run (roots None) also forgets every other path"""
+        connection = self._connect()
+        try:
+            with connection:
+                if roots is None:
+                    connection.execute("DELETE FROM files")
+                else:
+                    for root in roots:
+                        prefix = os.path.join(root, '')
+                        connection.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+                connection.executemany(
+                    "INSERT OR REPLACE INTO files (path, dev, ino, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f.path, f.dev, f.ino, f.size, f.mtime_ns, f.digest) for f in files]
+                )
+        finally:
+            connection.close()
+
+    def scan(self, roots: List[str]) -> List[FileInfo]:
+        """Regular files of at least min_size below the roots, without following symlinks"""
+        files = []
+        stack = list(roots)
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in SKIPPED_DIRS:
+                                    stack.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False) or entry.name.endswith(SKIPPED_SUFFIXES):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if st.st_size >= self.min_size:
+                            files.append(FileInfo.from_stat(entry.path, st))
+            except OSError:
+                continue
+        return files
+
+    def _indexed_elsewhere(self, index: Dict, roots: List[str], sizes: set) -> List[FileInfo]:
+        """Files indexed by earlier runs outside the roots that could match a scanned file and are unchanged"""
+        prefixes = tuple(os.path.join(root, '') for root in roots)
+        found = []
+        for path, (dev, ino, size, mtime_ns, digest) in index.items():
+            if size not in sizes or path.startswith(prefixes):
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (dev, ino, size, mtime_ns):
+                info = FileInfo.from_stat(path, st)
+                info.digest = digest
+                found.append(info)
+        return found
+
+    def run(self, roots: List[str], jobs: int = 8, dry_run: bool = False, full: bool = True) -> DedupeReport:
+        """Deduplicate the files below roots; full means the roots cover every tool.
+
+        A partial run (e.g. for one freshly installed tool) also links against
+        files in other tools that earlier runs have indexed.
+        """
+        report = DedupeReport()
+        index = self._load_index()
+        files = self.scan(roots)
+        report.scanned = len(files)
+        report.scanned_bytes = sum(f.size for f in files)
+        if not full:
+            files.extend(self._indexed_elsewhere(index, roots, {f.size for f in files}))
+        for f in files:
+            known = index.get(f.path)
+            if not f.digest and known and known[:4] == (f.dev, f.ino, f.size, f.mtime_ns):
+                f.digest = known[4]
+
+        groups: Dict[Tuple, List[FileInfo]] = {}
+        for f in files:
+            # Links share mode and owner, so only files that already agree on them are merged
+            groups.setdefault((f.dev, f.size, f.mode, f.uid), []).append(f)
+        candidates = [group for group in groups.values() if len({f.ino for f in group}) > 1]
+        self._hash(candidates, jobs, report)
+
+        for group in candidates:
+            by_digest: Dict[str, List[FileInfo]] = {}
+            for f in group:
+                if f.digest:
+                    by_digest.setdefault(f.digest, []).append(f)
+            for same in by_digest.values():
+                if len({f.ino for f in same}) > 1:
+                    self._merge(same, dry_run, report)
+
+        if not dry_run:
+            try:
+                self._save_index(files, None if full else roots)
+            except sqlite3.Error as e:
+                report.errors.append(f"{self.index_file}: {e}")
+        return report
+
+    def _hash(self, candidates: List[List[FileInfo]], jobs: int, report: DedupeReport):
+        """Hash the candidates without a known digest, each inode once, in parallel"""
+        pending: Dict[Tuple[int, int], List[FileInfo]] = {}
+        for group in candidates:
+            for f in group:
+                if not f.digest:
+                    pending.setdefault((f.dev, f.ino), []).append(f)
+        if not pending:
+            return
+
+        def digest_of(links: List[FileInfo]) -> Optional[str]:
+            try:
+                return hash_file(links[0].path)
+            except OSError as e:
+                report.errors.append(f"{links[0].path}: {e}")
+                return None
+
+        from concurrent.futures import ThreadPoolExecutor
+        # hashlib releases the GIL on large buffers, so threads hash on all cores
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for links, digest in zip(pending.values(), executor.map(digest_of, pending.values())):
+                report.hashed += 1
+                report.hashed_bytes += links[0].size
+                for f in links:
+                    f.digest = digest
+
+    def _merge(self, same: List[FileInfo], dry_run: bool, report: DedupeReport):
+        """Point every path of identical content at one inode"""
+        inodes: Dict[int, List[FileInfo]] = {}
+        for f in same:
+            inodes.setdefault(f.ino, []).append(f)
+        # Keep the inode that is already the most shared
+        keeper_ino = max(inodes, key=lambda ino: (inodes[ino][0].nlink, -min(len(f.path) for f in inodes[ino])))
+        keeper = inodes[keeper_ino][0]
+        for ino, links in inodes.items():
+            if ino == keeper_ino:
+                continue
+            replaced = 0
+            for f in links:
+                if dry_run or self._replace(keeper, f, report):
+                    replaced += 1
+            report.linked += replaced
+            # The data is only freed once no other name refers to the old inode
+            if replaced == len(links) and links[0].nlink == len(links):
+                report.reclaimed += links[0].size
+
+    def _replace(self, keeper: FileInfo, target: FileInfo, report: DedupeReport) -> bool:
+        temporary = os.path.join(os.path.dirname(target.path),
+                                 f".{os.path.basename(target.path)}.{os.urandom(4).hex()}.dedupe")
+        try:
+            if not keeper.unchanged(os.lstat(keeper.path)):
+                return False
+            if not self._clone(keeper, temporary, target):
+                if self.mode == 'reflink':
+                    return False
+                os.link(keeper.path, temporary)
+            # The target may have been rewritten since it was hashed
+            if not target.unchanged(os.lstat(target.path)):
+                os.unlink(temporary)
+                return False
+            os.replace(temporary, target.path)
+        except OSError as e:
+            report.errors.append(f"{target.path}: {e}")
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            return False
+        try:
+            updated = os.lstat(target.path)
+            target.dev, target.ino, target.mtime_ns = updated.st_dev, updated.st_ino, updated.st_mtime_ns
+        except OSError:
+            target.digest = None
+        return True
+
+    def _clone(self, keeper: FileInfo, temporary: str, target: FileInfo) -> bool:
+        """Create temporary as a copy-on-write clone of keeper with target's metadata; False if unsupported"""
+        if self.mode == 'hardlink' or not sys.platform.startswith('linux') or keeper.dev in self._no_reflink:
+            return False
+        import fcntl
+        try:
+            with open(keeper.path, 'rb') as source, open(temporary, 'xb') as clone:
+                fcntl.ioctl(clone.fileno(), FICLONE, source.fileno())
+        except OSError as e:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            if e.errno not in CLONE_UNSUPPORTED:
+                raise
+            self._no_reflink.add(keeper.dev)
+            return False
+        shutil.copystat(target.path, temporary)
+        return True
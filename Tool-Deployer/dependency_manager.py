@@ -1,33 +1,59 @@
 import os
-import subprocess
+import sys
+import glob
+import json
+import shutil
+import hashlib
 import re
-from packaging import version
-import semver
-from typing import Dict, List, Optional, Tuple
+import signal
+import threading
+import time
+from colorama import Fore
+from profiler import profiler
+from command_runner import runner, NETWORK_TIMEOUT
+from typing import Callable, Dict, List, Optional, Tuple
 
 class DependencyManager:
     """Manages dependencies for different package managers"""
+
+    # Installed-distribution snapshots keyed by site-packages directories and their mtimes,
+    # shared between instances so concurrent installs reuse the same scan
+    _pip_snapshots: Dict[Tuple, Dict[str, str]] = {}
+    _pip_snapshots_lock = threading.Lock()
+    # Serializes prefixed output lines from concurrently running installers
+    _output_lock = threading.Lock()
     
-    def __init__(self, config):
+    def __init__(self, config, python: Optional[str] = None, venvs=None, venv_dir: Optional[str] = None):
         self.config = config
+        # Optional per-tool virtual environment that receives pip dependencies
+        self.venvs = venvs
+        self.venv_dir = venv_dir if venvs else None
+        if self.venv_dir and not python:
+            python = venvs.python_path(self.venv_dir)
+        # Interpreter whose environment is inspected; None means the running interpreter
+        self.python = python
+        # Running installer processes, so a failing manager can cancel the others
+        self._processes: Dict[str, int] = {}
+        self._processes_lock = threading.Lock()
+        self._cancelled = threading.Event()
         self.package_managers = {
             'pip': {
                 'files': ['requirements.txt', 'setup.py'],
-                'install_cmd': 'pip install -r {file}',
-                'version_cmd': 'pip show {package}',
-                'version_regex': r'Version: ([\d.]+)'
+                'fingerprint_files': ['requirements.txt', 'setup.py', 'setup.cfg', 'pyproject.toml'],
+                'runtime': 'python',
+                'install_cmd': ['pip', 'install', '-r', '{file}']
             },
             'npm': {
                 'files': ['package.json'],
-                'install_cmd': 'npm install',
-                'version_cmd': 'npm list {package}',
-                'version_regex': r'@([\d.]+)'
+                'fingerprint_files': ['package.json', 'package-lock.json', 'npm-shrinkwrap.json'],
+                'runtime': 'node',
+                'install_cmd': ['npm', 'install']
             },
             'yarn': {
                 'files': ['package.json', 'yarn.lock'],
-                'install_cmd': 'yarn install',
-                'version_cmd': 'yarn list {package}',
-                'version_regex': r'@([\d.]+)'
+                'fingerprint_files': ['package.json', 'yarn.lock'],
+                'runtime': 'node',
+                'install_cmd': ['yarn', 'install']
             }
         }
 
@@ -43,38 +69,223 @@ class DependencyManager:
         
         return detected_managers
 
-    def check_package_version(self, manager: str, package: str) -> Optional[str]:
-        """Check the installed version of a package"""
+    def _site_packages(self) -> List[str]:
+        """Return the directories searched for installed Python distributions"""
+        if not self.python:
+            return [path for path in sys.path if os.path.isdir(path)]
+
+        # Virtual environments have a predictable layout, so avoid starting the interpreter
+        prefix = os.path.dirname(os.path.dirname(os.path.abspath(self.python)))
+        paths = glob.glob(os.path.join(prefix, 'lib', 'python*', 'site-packages'))
+        paths += glob.glob(os.path.join(prefix, 'Lib', 'site-packages'))
+        if paths:
+            return paths
+
+        result = runner.run([self.python, '-c', 'import sys, json; print(json.dumps(sys.path))'])
+        if not result.ok:
+            return []
+        return [path for path in json.loads(result.stdout) if os.path.isdir(path)]
+
+    def installed_pip_packages(self) -> Dict[str, str]:
+        """Snapshot installed distributions as {normalized name: version}.
+
+        The snapshot is rebuilt only when a site-packages directory changes, which
+        happens whenever a distribution is installed, upgraded or removed.
+        """
+        paths = self._site_packages()
+        key = tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+        with self._pip_snapshots_lock:
+            snapshot = self._pip_snapshots.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        # importlib.metadata and packaging are only needed when verifying, so load them here
+        from importlib import metadata
+        from packaging.utils import canonicalize_name
+        snapshot = {}
+        for dist in metadata.distributions(path=paths):
+            name = dist.metadata['Name']
+            if name:
+                # First match wins, mirroring import precedence along the path
+                snapshot.setdefault(canonicalize_name(name), dist.version)
+
+        with self._pip_snapshots_lock:
+            self._pip_snapshots[key] = snapshot
+        return snapshot
+
+    def _read_package_lock(self, tool_dir: str) -> Dict[str, str]:
+        """Read top-level resolved versions from package-lock.json (lockfile v1-v3)"""
+        lock_path = os.path.join(tool_dir, 'package-lock.json')
+        if not os.path.exists(lock_path):
+            return {}
         try:
-            cmd = self.package_managers[manager]['version_cmd'].format(package=package)
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                match = re.search(self.package_managers[manager]['version_regex'], result.stdout)
+            with open(lock_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.config.print("Error parsing package-lock.json", Fore.RED)
+            return {}
+
+        versions = {}
+        for path, info in data.get('packages', {}).items():
+            # Only direct installs under the root node_modules, not nested copies
+            if path.startswith('node_modules/') and '/node_modules/' not in path and 'version' in info:
+                versions[path[len('node_modules/'):]] = info['version']
+        for package, info in data.get('dependencies', {}).items():
+            if isinstance(info, dict) and 'version' in info:
+                versions.setdefault(package, info['version'])
+        return versions
+
+    def _read_yarn_lock(self, tool_dir: str) -> Dict[str, Dict[str, str]]:
+        """Read yarn.lock (classic and berry) into {package: {range: version}}"""
+        lock_path = os.path.join(tool_dir, 'yarn.lock')
+        if not os.path.exists(lock_path):
+            return {}
+
+        entries: Dict[str, Dict[str, str]] = {}
+        specifiers: List[Tuple[str, str]] = []
+        with open(lock_path, 'r') as f:
+            for line in f:
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                if not line[0].isspace():
+                    # Entry header, e.g. '"@scope/pkg@^1.0.0", "@scope/pkg@~1.2.0":'
+                    specifiers = []
+                    for spec in line.strip().rstrip(':').split(','):
+                        spec = spec.strip().strip('"')
+                        name, _, spec_range = spec.rpartition('@')
+                        if name:
+                            specifiers.append((name, spec_range.replace('npm:', '', 1)))
+                    continue
+                match = re.match(r'^\s+version:?\s+"?([^"\s]+)"?', line)
                 if match:
-                    return match.group(1)
-            return None
-        except Exception as e:
-            self.config.print(f"Error checking version for {package}: {e}", Fore.RED)
-            return None
+                    for name, spec_range in specifiers:
+                        entries.setdefault(name, {})[spec_range] = match.group(1)
+                    specifiers = []
+        return entries
+
+    def resolve_node_versions(self, tool_dir: str, dependencies: Dict[str, str]) -> Dict[str, str]:
+        """Resolve versions of declared dependencies without starting npm or yarn.
+
+        Installed packages in node_modules take precedence; otherwise the version
+        pinned in package-lock.json or yarn.lock is used.
+        """
+        package_lock = None
+        yarn_lock = None
+        versions = {}
+        for package, required_version in dependencies.items():
+            # Scoped packages live in node_modules/@scope/name
+            manifest = os.path.join(tool_dir, 'node_modules', *package.split('/'), 'package.json')
+            try:
+                with open(manifest, 'r') as f:
+                    installed = json.load(f).get('version')
+                if installed:
+                    versions[package] = installed
+                    continue
+            except (OSError, json.JSONDecodeError):
+                pass
+
+            if package_lock is None:
+                package_lock = self._read_package_lock(tool_dir)
+            if package in package_lock:
+                versions[package] = package_lock[package]
+                continue
+
+            if yarn_lock is None:
+                yarn_lock = self._read_yarn_lock(tool_dir)
+            resolved = yarn_lock.get(package, {})
+            if resolved:
+                versions[package] = resolved.get(required_version, next(iter(resolved.values())))
+        return versions
 
-    def compare_versions(self, current: str, required: str) -> bool:
+    def check_package_version(self, manager: str, package: str, tool_dir: Optional[str] = None) -> Optional[str]:
+        """Check the installed version of a package"""
+        if manager == 'pip':
+            from packaging.utils import canonicalize_name
+            return self.installed_pip_packages().get(canonicalize_name(package))
+        if manager in ['npm', 'yarn']:
+            return self.resolve_node_versions(tool_dir or os.getcwd(), {package: '*'}).get(package)
+        return None
+
+    def compare_versions(self, current: str, required: str, manager: str = 'pip') -> bool:
         """Compare version strings and return True if current version meets requirements"""
         try:
             if manager == 'npm' or manager == 'yarn':
-                return semver.compare(current, required) >= 0
+                from npm_semver import satisfies
+                # Non-semver specs (tags, URLs, file: paths) are met by any installed version
+                matches = satisfies(current, required)
+                return True if matches is None else matches
+            elif required[:1] in '<>=!~':
+                from packaging.specifiers import SpecifierSet
+                return SpecifierSet(required).contains(current, prereleases=True)
             else:
-                return version.parse(current) >= version.parse(required)
+                # A bare version is treated as a minimum, as before; no version means any
+                from packaging import version
+                return not required or version.parse(current) >= version.parse(required)
         except Exception as e:
             self.config.print(f"Error comparing versions: {e}", Fore.RED)
             return False
 
+    def _emit(self, manager: str, stream: str, line: str):
+        """Print an installer's output line, prefixed with the manager name"""
+        with self._output_lock:
+            self.config.print(f"[{manager}] {line.rstrip()}", Fore.WHITE if stream == 'stdout' else Fore.YELLOW)
+
+    def _tracker(self, manager: str) -> Callable[[int], None]:
+        """on_start hook that registers a manager's running process, so a failing manager can cancel it"""
+        def started(pid: int):
+            with self._processes_lock:
+                self._processes[manager] = pid
+            if self._cancelled.is_set():
+                # Another manager failed while this one was waiting to retry or between commands
+                self._cancel_running()
+        return started
+
+    def _untrack(self, manager: str):
+        with self._processes_lock:
+            self._processes.pop(manager, None)
+
+    def _run_streamed(self, manager: str, command: List[str], cwd: str) -> int:
+        """Run an installer command, multiplexing its stdout and stderr with prefixes"""
+        result = runner.run(command, cwd=cwd, timeout=NETWORK_TIMEOUT, retries=2,
+                            on_output=lambda stream, line: self._emit(manager, stream, line),
+                            on_start=self._tracker(manager))
+        self._untrack(manager)
+        if result.error or result.timed_out:
+            self.config.print(f"[{manager}] {result.describe()}", Fore.RED)
+        return -1 if result.returncode is None else result.returncode
+
+    def _cancel_running(self):
+        """Stop every installer that is still running"""
+        self._cancelled.set()
+        with self._processes_lock:
+            for pid in self._processes.values():
+                try:
+                    # Installers run in their own session on POSIX, so this also stops their children
+                    if os.name == 'posix':
+                        os.killpg(pid, signal.SIGTERM)
+                    else:
+                        os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
     def install_dependencies(self, tool_dir: str, manager: str) -> bool:
         """Install dependencies using the specified package manager"""
+        return self._install(tool_dir, manager) == 0
+
+    def _install(self, tool_dir: str, manager: str) -> int:
+        """Install dependencies for one manager and return the installer's exit status"""
         try:
             if manager not in self.package_managers:
                 self.config.print(f"Unsupported package manager: {manager}", Fore.RED)
-                return False
+                return -1
+
+            if manager == 'pip' and self.venv_dir:
+                try:
+                    if self.venvs.install_requirements(tool_dir, self.venv_dir, on_start=self._tracker(manager)):
+                        return 0
+                finally:
+                    self._untrack(manager)
+                return -1 if self._cancelled.is_set() else 1
 
             info = self.package_managers[manager]
             install_cmd = info['install_cmd']
@@ -84,57 +295,165 @@ class DependencyManager:
                 for file in info['files']:
                     file_path = os.path.join(tool_dir, file)
                     if os.path.exists(file_path):
-                        install_cmd = install_cmd.format(file=file_path)
+                        install_cmd = [part.format(file=file_path) for part in install_cmd]
                         break
                 else:
                     self.config.print(f"No suitable file found for {manager}", Fore.RED)
-                    return False
+                    return -1
 
             self.config.print(f"Installing dependencies using {manager}...", Fore.CYAN)
-            result = subprocess.run(install_cmd, shell=True, cwd=tool_dir)
-            return result.returncode == 0
+            return self._run_streamed(manager, install_cmd, tool_dir)
 
         except Exception as e:
             self.config.print(f"Error installing dependencies with {manager}: {e}", Fore.RED)
-            return False
+            return -1
+
+    def _runtime_id(self, manager: str) -> str:
+        """Identify the interpreter a manager installs for, without starting it"""
+        runtime = self.package_managers[manager]['runtime']
+        if runtime == 'python':
+            binary = self.python or sys.executable
+        else:
+            binary = shutil.which(runtime)
+        if not binary or not os.path.exists(binary):
+            return f"{runtime}:missing"
+        # The resolved binary and its mtime change whenever the runtime is upgraded or replaced
+        resolved = os.path.realpath(binary)
+        identity = f"{runtime}:{resolved}:{os.stat(resolved).st_mtime_ns}"
+        if runtime == 'python' and self.venv_dir:
+            # A recreated venv starts empty even if the requirement files are the same
+            identity += f":{os.lstat(binary).st_ctime_ns}"
+        return identity
+
+    def fingerprint(self, tool_dir: str, manager: str) -> str:
+        """Hash a manager's dependency files together with the runtime they are installed for"""
+        digest = hashlib.sha256()
+        digest.update(self._runtime_id(manager).encode())
+        for file in self.package_managers[manager]['fingerprint_files']:
+            file_path = os.path.join(tool_dir, file)
+            if os.path.exists(file_path):
+                digest.update(b'\0' + file.encode() + b'\0')
+                with open(file_path, 'rb') as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    def install_changed(self, tool_dir: str, managers: List[str], recorded: Optional[Dict[str, str]] = None,
+                        force: bool = False) -> Tuple[bool, Dict[str, str]]:
+        """Install dependencies for managers whose fingerprint differs from the recorded one.
+
+        Returns whether every install succeeded and the fingerprints to record.
+        """
+        recorded = recorded or {}
+        fingerprints = {}
+        pending = []
+        for manager in managers:
+            fingerprint = self.fingerprint(tool_dir, manager)
+            if not force and recorded.get(manager) == fingerprint:
+                self.config.print(f"{manager} dependencies unchanged, skipping installation.", Fore.GREEN)
+                fingerprints[manager] = fingerprint
+            else:
+                pending.append(manager)
+
+        if not pending:
+            return True, fingerprints
+
+        # Managers sharing a runtime write to the same place (npm and yarn both fill
+        # node_modules), so they run in order; different runtimes run side by side.
+        groups: Dict[str, List[str]] = {}
+        for manager in pending:
+            groups.setdefault(self.package_managers[manager]['runtime'], []).append(manager)
+
+        self._cancelled.clear()
+        outcomes: Dict[str, Tuple[Optional[int], float]] = {}
+
+        tool = profiler.current_tool()
+
+        def run_group(group: List[str]):
+            for manager in group:
+                if self._cancelled.is_set():
+                    return
+                start = time.monotonic()
+                with profiler.bind_tool(tool), profiler.span(f"install {manager}", manager=manager) as fields:
+                    returncode = self._install(tool_dir, manager)
+                    fields['exit_code'] = returncode
+                outcomes[manager] = (returncode, time.monotonic() - start)
+                if returncode != 0:
+                    # Fail fast: stop the other managers instead of waiting for them
+                    self._cancel_running()
+                    return
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            list(executor.map(run_group, groups.values()))
+
+        success = True
+        for manager in pending:
+            if manager not in outcomes:
+                self.config.print(f"{manager}: cancelled", Fore.YELLOW)
+                success = False
+                continue
+            returncode, duration = outcomes[manager]
+            if returncode < 0 and self._cancelled.is_set():
+                self.config.print(f"{manager}: cancelled after {duration:.1f}s", Fore.YELLOW)
+                success = False
+            elif returncode == 0:
+                self.config.print(f"{manager}: installed in {duration:.1f}s (exit 0)", Fore.GREEN)
+                # Fingerprint after installing, since installers may rewrite lockfiles
+                fingerprints[manager] = self.fingerprint(tool_dir, manager)
+            else:
+                self.config.print(f"{manager}: failed after {duration:.1f}s (exit {returncode})", Fore.RED)
+                success = False
+        return success, fingerprints
 
     def verify_dependencies(self, tool_dir: str) -> Dict[str, List[Tuple[str, str, bool]]]:
         """Verify all dependencies in the tool directory"""
         results = {}
+        node_results = None
         
         for manager in self.detect_package_managers(tool_dir):
             results[manager] = []
+
+            if manager in ['npm', 'yarn']:
+                # npm and yarn read the same package.json and node_modules, so resolve once
+                if node_results is None:
+                    node_results = self._verify_node_dependencies(tool_dir)
+                results[manager] = list(node_results)
+                continue
             
-            # Read dependency files
-            for file in self.package_managers[manager]['files']:
-                file_path = os.path.join(tool_dir, file)
-                if os.path.exists(file_path):
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                        
-                        # Extract dependencies and their versions
-                        if manager == 'pip':
-                            # Handle requirements.txt
-                            for line in content.split('\n'):
-                                if '==' in line:
-                                    package, required_version = line.split('==')
-                                    current_version = self.check_package_version(manager, package)
-                                    if current_version:
-                                        meets_requirements = self.compare_versions(current_version, required_version)
-                                        results[manager].append((package, required_version, meets_requirements))
-                        
-                        elif manager in ['npm', 'yarn']:
-                            # Handle package.json
-                            import json
-                            try:
-                                data = json.loads(content)
-                                dependencies = data.get('dependencies', {})
-                                for package, required_version in dependencies.items():
-                                    current_version = self.check_package_version(manager, package)
-                                    if current_version:
-                                        meets_requirements = self.compare_versions(current_version, required_version)
-                                        results[manager].append((package, required_version, meets_requirements))
-                            except json.JSONDecodeError:
-                                self.config.print(f"Error parsing {file}", Fore.RED)
+            if manager == 'pip':
+                results[manager] = self._verify_pip_dependencies(tool_dir)
         
+        return results
+
+    def _verify_pip_dependencies(self, tool_dir: str) -> List[Tuple[str, str, bool]]:
+        """Check requirements.txt (and its -r includes) against the installed distributions"""
+        from requirements_index import read_requirements
+        from packaging.markers import Marker
+        results = []
+        for requirement in read_requirements(os.path.join(tool_dir, 'requirements.txt')):
+            if requirement['marker'] and not Marker(requirement['marker']).evaluate():
+                continue
+            current_version = self.check_package_version('pip', requirement['name'])
+            if current_version:
+                required_version = requirement['specifier'] or 'any'
+                meets_requirements = self.compare_versions(current_version, requirement['specifier'], 'pip')
+                results.append((requirement['name'], required_version, meets_requirements))
+        return results
+
+    def _verify_node_dependencies(self, tool_dir: str) -> List[Tuple[str, str, bool]]:
+        """Check package.json dependencies against node_modules and lockfiles in one pass"""
+        try:
+            with open(os.path.join(tool_dir, 'package.json'), 'r') as f:
+                dependencies = json.load(f).get('dependencies', {})
+        except (OSError, json.JSONDecodeError):
+            self.config.print("Error parsing package.json", Fore.RED)
+            return []
+
+        results = []
+        versions = self.resolve_node_versions(tool_dir, dependencies)
+        for package, required_version in dependencies.items():
+            current_version = versions.get(package)
+            if current_version:
+                meets_requirements = self.compare_versions(current_version, required_version, 'npm')
+                results.append((package, required_version, meets_requirements))
         return results 
\ No newline at end of file
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+from collections import deque
+from typing import List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Directories that never contain a tool's entry point but can hold thousands of files
+PRUNED_DIRS = {
+    '.git', '.hg', '.svn', 'node_modules', '.venv', 'venv', 'env', '__pycache__', '.tox', '.nox',
+    'site-packages', 'vendor', 'vendors', 'third_party', 'thirdparty', 'bower_components',
+    'dist', 'build', '.eggs', 'test', 'tests', 'testing', 'docs', 'doc', 'examples', 'samples',
+    '.github', '.idea', '.vscode', '.mypy_cache', '.pytest_cache',
+}
+SCRIPT_EXTENSIONS = ('.py', '.sh', '.js')
+EXCLUDED_FILES = {'setup.py', 'conftest.py', '__init__.py', 'noxfile.py', 'fabfile.py', 'gulpfile.js',
+                  'webpack.config.js', 'gruntfile.js', 'babel.config.js', 'jest.config.js'}
+PREFERRED_NAMES = {'main', 'cli', '__main__', 'run', 'start', 'app'}
+BIN_DIRS = {'bin', 'scripts', 'script', 'cmd'}
+
+DECLARED_SCORE = 100
+SNIFF_BYTES = 128
+
+def _sniff(path: str) -> bytes:
+    """Read just enough of a file to recognise a shebang or binary header"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(SNIFF_BYTES)
+    except OSError:
+        return b''
+
+def _module_file(tool_dir: str, module: str) -> Optional[str]:
+    """Map a dotted module name to its source file in a flat or src/ layout"""
+    parts = module.strip().split('.')
+    for base in (tool_dir, os.path.join(tool_dir, 'src')):
+        for candidate in (os.path.join(base, *parts) + '.py',
+                          os.path.join(base, *parts, '__main__.py'),
+                          os.path.join(base, *parts, '__init__.py')):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+def _python_entry_points(tool_dir: str) -> List[str]:
+    targets = []
+    pyproject = os.path.join(tool_dir, 'pyproject.toml')
+    if os.path.isfile(pyproject):
+        if tomllib:
+            try:
+                with open(pyproject, 'rb') as f:
+                    data = tomllib.load(f)
+                targets += list(data.get('project', {}).get('scripts', {}).values())
+                targets += list(data.get('tool', {}).get('poetry', {}).get('scripts', {}).values())
+            except (OSError, ValueError):
+                pass
+        else:
+            with open(pyproject, 'r', errors='ignore') as f:
+                section = re.search(r'^\[(?:project\.scripts|tool\.poetry\.scripts)\]\s*$(.*?)(?=^\[|\Z)',
+                                    f.read(), re.M | re.S)
+            if section:
+                targets += re.findall(r'=\s*["\']([\w.]+:[\w.]+)["\']', section.group(1))
+
+    for config_file in ('setup.py', 'setup.cfg'):
+        path = os.path.join(tool_dir, config_file)
+        if os.path.isfile(path):
+            with open(path, 'r', errors='ignore') as f:
+                content = f.read()
+            if 'console_scripts' in content:
+                targets += re.findall(r'[\w.-]+\s*=\s*([\w.]+:[\w.]+)', content)
+
+    files = []
+    for target in targets:
+        module = target.split(':')[0]
+        path = _module_file(tool_dir, module)
+        if path:
+            files.append(path)
+    return files
+
+def _node_entry_points(tool_dir: str) -> List[str]:
+    path = os.path.join(tool_dir, 'package.json')
+    if not os.path.isfile(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    bins = data.get('bin')
+    if isinstance(bins, str):
+        bins = [bins]
+    elif isinstance(bins, dict):
+        bins = list(bins.values())
+    else:
+        bins = []
+    files = [os.path.normpath(os.path.join(tool_dir, b)) for b in bins if isinstance(b, str)]
+    return [f for f in files if os.path.isfile(f)]
+
+def declared_entry_points(tool_dir: str) -> List[str]:
+    """Entry points declared by the project: console_scripts and package.json bin"""
+    seen = []
+    for path in _python_entry_points(tool_dir) + _node_entry_points(tool_dir):
+        if path not in seen:
+            seen.append(path)
+    return seen
+
+def _score(entry: os.DirEntry, depth: int, in_bin_dir: bool, tool_name: str) -> Optional[int]:
+    """Score a file as a potential entry point, or return None if it is not one"""
+    name = entry.name
+    lowered = name.lower()
+    if name.startswith('.') or 'sample' in lowered or lowered in EXCLUDED_FILES:
+        return None
+    stem, extension = os.path.splitext(lowered)
+    is_script = extension in SCRIPT_EXTENSIONS
+    try:
+        is_exec = bool(entry.stat().st_mode & 0o111)
+    except OSError:
+        return None
+
+    # Only sniff files that could plausibly be run: scripts, executables and root-level files
+    header = _sniff(entry.path) if (is_script or is_exec or (depth == 0 and not extension)) else b''
+    has_shebang = header.startswith(b'#!')
+    if not (is_script or has_shebang or (is_exec and header.startswith(b'\x7fELF'))):
+        return None
+
+    score = 50
+    if has_shebang:
+        score += 15
+    if is_exec:
+        score += 10
+    if stem == tool_name or stem.replace('_', '-') == tool_name:
+        score += 30
+    elif stem in PREFERRED_NAMES:
+        score += 15
+    if stem.startswith(('test', 'setup', 'install', 'build', 'config')):
+        score -= 25
+    # Shallow files are far more likely to be the tool itself
+    score -= (0 if in_bin_dir else depth) * 15
+    return score
+
+def scan_executables(tool_dir: str, max_depth: int = 4, max_entries: int = 20000,
+                     tool_name: Optional[str] = None) -> List[Tuple[int, str]]:
+    """Return (score, path) candidates for a tool's entry point, best first.
+
+    Declared entry points come first. The tree is then scanned breadth-first with
+    os.scandir, skipping heavy directories and stopping after max_entries. Files
+    named like the tool rank higher; tool_name defaults to the directory name,
+    which for releases/<commit> layouts is not the tool's name.
+    """
+    tool_name = (tool_name or os.path.basename(os.path.normpath(tool_dir))).lower()
+    candidates = {path: DECLARED_SCORE + 20 - idx for idx, path in enumerate(declared_entry_points(tool_dir))}
+
+    queue = deque([(tool_dir, 0, False)])
+    scanned = 0
+    while queue and scanned < max_entries:
+        directory, depth, in_bin_dir = queue.popleft()
+        try:
+            # Entries are read lazily, so the budget also bounds a single huge directory
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if scanned >= max_entries:
+                        break
+                    scanned += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < max_depth and entry.name.lower() not in PRUNED_DIRS and not entry.name.startswith('.'):
+                                queue.append((entry.path, depth + 1, depth == 0 and entry.name.lower() in BIN_DIRS))
+                            continue
+                        if not entry.is_file() or entry.path in candidates:
+                            continue
+                    except OSError:
+                        continue
+                    score = _score(entry, depth, in_bin_dir, tool_name)
+                    if score is not None:
+                        candidates[entry.path] = score
+        except OSError:
+            continue
+
+    return sorted(((score, path) for path, score in candidates.items()), key=lambda c: (-c[0], c[1]))
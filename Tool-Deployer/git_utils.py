@@ -0,0 +1,96 @@
+import re
+from typing import Dict, List, Optional
+
+DEFAULT_SUBMODULE_JOBS = 4
+
+def make_clone_options(depth: Optional[int] = None, filter_spec: Optional[str] = None,
+                       sparse: Optional[List[str]] = None, submodules: bool = False,
+                       submodule_jobs: Optional[int] = None) -> Dict:
+    """Build the clone strategy stored with a tool, omitting unset options"""
+    options = {}
+    if depth:
+        options['depth'] = int(depth)
+    if filter_spec:
+        options['filter'] = filter_spec
+    if sparse:
+        options['sparse'] = list(sparse)
+    if submodules:
+        options['submodules'] = True
+        options['submodule_jobs'] = int(submodule_jobs or DEFAULT_SUBMODULE_JOBS)
+    return options
+
+def is_commit_sha(ref: str) -> bool:
+    """Check whether a ref looks like an abbreviated or full commit SHA"""
+    return bool(re.fullmatch(r'[0-9a-f]{7,40}', ref or ''))
+
+def clone_commands(repo_url: str, install_dir: str, options: Optional[Dict] = None,
+                   ref: Optional[str] = None) -> List[List[str]]:
+    """Return the git commands (argv lists) that clone a repository with the given strategy"""
+    options = options or {}
+    depth = options.get('depth')
+    sparse = options.get('sparse')
+    submodule_jobs = str(options.get('submodule_jobs', DEFAULT_SUBMODULE_JOBS))
+
+    clone = ['git', 'clone']
+    if depth:
+        clone += ['--depth', str(depth)]
+    if options.get('filter'):
+        clone.append(f"--filter={options['filter']}")
+    if sparse:
+        clone.append('--sparse')
+    if ref and not is_commit_sha(ref):
+        # Branches and tags can be cloned directly, which keeps shallow clones valid
+        clone += ['--branch', ref]
+    clone += [repo_url, install_dir]
+
+    commands = [clone]
+    if sparse:
+        commands.append(['git', '-C', install_dir, 'sparse-checkout', 'set', '--no-cone', *sparse])
+    if ref and is_commit_sha(ref):
+        if depth:
+            commands.append(['git', '-C', install_dir, 'fetch', '--depth', str(depth), 'origin', ref])
+            commands.append(['git', '-C', install_dir, 'checkout', 'FETCH_HEAD'])
+        else:
+            commands.append(['git', '-C', install_dir, 'checkout', ref])
+    if options.get('submodules'):
+        # A separate step rather than clone --recurse-submodules, so rewrite_url never applies to submodules
+        submodule = ['git', '-C', install_dir, 'submodule', 'update', '--init', '--recursive', '--jobs', submodule_jobs]
+        if depth:
+            submodule += ['--depth', '1']
+        commands.append(submodule)
+    return commands
+
+def rewrite_url(commands: List[List[str]], repo_url: str, source: str) -> List[List[str]]:
+    """Redirect git commands that talk to repo_url to another source, such as a local mirror.
+
+    The rewrite is passed as transient config, so the checkout keeps repo_url as its origin.
+    insteadOf matches URL prefixes and reaches child git processes, so it is kept
+    off submodule commands and fetches do not recurse: a submodule at
+    .../tool-core.git must not be redirected because the tool is at .../tool.
+    """
+    rewrite = ['-c', f'url.{source}.insteadOf={repo_url}', '-c', 'fetch.recurseSubmodules=false']
+    return [command if 'submodule' in command else command[:1] + rewrite + command[1:] for command in commands]
+
+def update_commands(options: Optional[Dict] = None) -> List[List[str]]:
+    """Return the git commands (argv lists) that update a checkout without deepening it"""
+    options = options or {}
+    depth = options.get('depth')
+
+    if depth:
+        # A plain pull would fetch history back to the shallow boundary; fetch at the
+        # recorded depth instead and move the branch, keeping local edits where possible.
+        fetch = ['git', 'fetch', '--depth', str(depth)]
+        if options.get('filter'):
+            fetch.append(f"--filter={options['filter']}")
+        commands = [fetch + ['origin'], ['git', 'reset', '--keep', '@{upstream}']]
+    else:
+        # Partial clones keep their filter through the promisor remote config
+        commands = [['git', 'pull']]
+
+    if options.get('submodules'):
+        submodule = ['git', 'submodule', 'update', '--init', '--recursive',
+                     '--jobs', str(options.get('submodule_jobs', DEFAULT_SUBMODULE_JOBS))]
+        if depth:
+            submodule += ['--depth', str(depth)]
+        commands.append(submodule)
+    return commands
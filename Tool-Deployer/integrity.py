@@ -0,0 +1,312 @@
+import os
+import stat
+import hashlib
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from colorama import Fore
+from releases import RELEASES_DIRNAME, INCOMING_PREFIX
+from dedupe import hash_file
+
+# Set to 0 to skip recording manifests when tools are installed and updated
+RECORD_INTEGRITY = os.environ.get('TOOL_DEPLOYER_INTEGRITY', '1') != '0'
+# Files are hashed in batches of up to this many files or bytes, so small files do not cost a task each
+BATCH_FILES = 256
+BATCH_BYTES = 16 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifests (
+    tool TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    tool TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mode INTEGER NOT NULL,
+    -- SHA-256 of the content at record time; 'link:<target>' for symlinks
+    digest TEXT NOT NULL,
+    -- Stat of the file when its content last matched digest
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    PRIMARY KEY (tool, path)
+);
+"""
+
+# path -> (mode, digest, size, mtime_ns, ctime_ns, ino)
+Rows = Dict[str, Tuple[int, str, int, int, int, int]]
+
+@dataclass
+class IntegrityReport:
+    """Differences between a tool's tree and its recorded manifest"""
+    name: str
+    root: str
+    # ok, changed, missing (no tree) or unrecorded (no manifest)
+    state: str = 'ok'
+    recorded_at: Optional[str] = None
+    manifest: Optional[str] = None
+    files: int = 0
+    hashed: int = 0
+    hashed_bytes: int = 0
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int, int]:
+    # ctime cannot be set back from user space, so a restored mtime does not hide an edit
+    return st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino
+
+def scan(root: str) -> Dict[str, os.stat_result]:
+    """Files and symlinks below root by relative path, without following symlinks"""
+    found = {}
+    prefix = len(os.path.join(root, ''))
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not stat.S_ISDIR(st.st_mode):
+                        found[entry.path[prefix:]] = st
+                    # Deploys still in progress are not part of the tool yet
+                    elif not entry.name.startswith(INCOMING_PREFIX):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return found
+
+def _hash_batch(paths: List[str]) -> List[Optional[str]]:
+    digests = []
+    for path in paths:
+        try:
+            digests.append(hash_file(path))
+        except OSError:
+            digests.append(None)
+    return digests
+
+def hash_files(files: List[Tuple[str, int]], jobs: int) -> Dict[str, Optional[str]]:
+    """SHA-256 of (path, size) pairs, in batches on a thread pool; None for unreadable files"""
+    batches, batch, batch_bytes = [], [], 0
+    for path, size in files:
+        batch.append(path)
+        batch_bytes += size
+        if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+    if batch:
+        batches.append(batch)
+    if len(batches) <= 1 or jobs <= 1:
+        return {path: digest for batch in batches for path, digest in zip(batch, _hash_batch(batch))}
+    from concurrent.futures import ThreadPoolExecutor
+    # hashlib releases the GIL on large buffers, so threads hash on all cores
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return {path: digest for batch, digests in zip(batches, executor.map(_hash_batch, batches))
+                for path, digest in zip(batch, digests)}
+
+def _runtime_bytecode(path: str) -> bool:
+    """Whether a path is a pyc in a __pycache__ directory, which Python writes when a module is first imported"""
+    return path.endswith('.pyc') and os.path.basename(os.path.dirname(path)) == '__pycache__'
+
+def _release_of(path: str) -> Optional[str]:
+    """The releases/<id> directory a relative path lies in, if any"""
+    parts = path.split(os.sep, 2)
+    return os.path.join(parts[0], parts[1]) if len(parts) > 2 and parts[0] == RELEASES_DIRNAME else None
+
+class IntegrityChecker:
+    """Records a manifest of file hashes per tool and verifies tool trees against it.
+
+    Each file's stat (size, mtime, ctime, inode) is kept next to its hash, and a
+    file whose stat still matches is not read again, so verifying an unchanged
+    fleet only costs a directory walk. Files under releases/<id> are recorded
+    once, when the release is deployed: later installs and updates record the
+    new release and the 'current' link, but never re-record an older release,
+    so they cannot hide a change made to it. Flat trees are re-recorded whole.
+    """
+
+    def __init__(self, config, index_file: str, jobs: int = 8):
+        self.config = config
+        self.index_file = index_file
+        self.jobs = jobs
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        connection = sqlite3.connect(self.index_file, timeout=30.0)
+        connection.executescript(SCHEMA)
+        return connection
+
+    @staticmethod
+    def _rows(connection: sqlite3.Connection, name: str) -> Rows:
+        return {row[0]: tuple(row[1:]) for row in connection.execute(
+            "SELECT path, mode, digest, size, mtime_ns, ctime_ns, ino FROM files WHERE tool = ?", (name,))}
+
+    @staticmethod
+    def _cheap_digest(path: str, st: os.stat_result) -> Optional[str]:
+        """The digest of anything that is not a regular file, or None if the content needs hashing"""
+        if stat.S_ISLNK(st.st_mode):
+            return f"link:{os.readlink(path)}"
+        return None if stat.S_ISREG(st.st_mode) else ''
+
+    def record(self, name: str, root: str, fresh: Optional[str] = None) -> IntegrityReport:
+        """Record the manifest of a tool after a deploy; fresh is the newly built release (or root for all files)"""
+        report = IntegrityReport(name, root)
+        connection = self._connect()
+        try:
+            old = self._rows(connection, name)
+            scanned = scan(root)
+            fresh_prefix = os.path.relpath(fresh, root) if fresh else None
+            known = {_release_of(path) for path in old} - {None}
+
+            def rerecorded(path: str) -> bool:
+                release = _release_of(path)
+                if release is None or fresh_prefix == '.':
+                    return True
+                if fresh_prefix and (path + os.sep).startswith(fresh_prefix + os.sep):
+                    return True
+                # Releases recorded earlier keep their manifest; ones never seen are taken as they are
+                return release not in known
+
+            rows: Rows = {}
+            pending = []
+            for path, st in scanned.items():
+                if not rerecorded(path):
+                    continue
+                full = os.path.join(root, path)
+                previous = old.get(path)
+                try:
+                    digest = self._cheap_digest(full, st)
+                except OSError:
+                    continue
+                if digest is None and previous and previous[0] == st.st_mode and previous[2:] == _stat_key(st):
+                    digest = previous[1]
+                if digest is None:
+                    pending.append((full, st.st_size))
+                    report.hashed_bytes += st.st_size
+                    continue
+                rows[path] = (st.st_mode, digest) + _stat_key(st)
+            digests = hash_files(pending, self.jobs)
+            report.hashed = len(pending)
+            for full, _ in pending:
+                path = full[len(os.path.join(root, '')):]
+                if digests[full] is not None:
+                    rows[path] = (scanned[path].st_mode, digests[full]) + _stat_key(scanned[path])
+
+            # Older releases keep their rows, including files since removed from them, until they are pruned
+            for path, row in old.items():
+                if path not in rows and not rerecorded(path) and os.path.isdir(os.path.join(root, _release_of(path))):
+                    rows[path] = row
+            report.files = len(rows)
+            report.manifest = self._manifest_digest(rows)
+            report.recorded_at = datetime.now().isoformat()
+            with connection:
+                connection.execute("DELETE FROM files WHERE tool = ?", (name,))
+                connection.executemany(
+                    "INSERT INTO files (tool, path, mode, digest, size, mtime_ns, ctime_ns, ino) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(name, path) + row for path, row in rows.items()])
+                connection.execute("INSERT OR REPLACE INTO manifests (tool, root, recorded_at, digest) VALUES (?, ?, ?, ?)",
+                                   (name, root, report.recorded_at, report.manifest))
+        finally:
+            connection.close()
+        return report
+
+    @staticmethod
+    def _manifest_digest(rows: Rows) -> str:
+        """One hash over every path, mode and content hash, to keep somewhere the tools cannot write to"""
+        digest = hashlib.sha256()
+        for path in sorted(rows):
+            digest.update(f"{path}\0{rows[path][0]:o}\0{rows[path][1]}\n".encode('utf-8', 'surrogateescape'))
+        return digest.hexdigest()
+
+    def verify(self, tools: Dict[str, str], full: bool = False) -> List[IntegrityReport]:
+        """Compare each tool's tree (name -> root) with its manifest; full ignores the stat cache"""
+        from concurrent.futures import ThreadPoolExecutor
+        connection = self._connect()
+        try:
+            manifests = {row[0]: row[1:] for row in connection.execute(
+                "SELECT tool, recorded_at, digest FROM manifests")}
+            rows = {name: self._rows(connection, name) for name in tools if name in manifests}
+        finally:
+            connection.close()
+
+        # Walk every tree at once, then hash what changed across the whole fleet in one pool
+        reports, pending, refreshed = [], [], {}
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            scans = dict(zip(tools, executor.map(scan, tools.values())))
+        for name, root in tools.items():
+            report = IntegrityReport(name, root)
+            reports.append(report)
+            if name not in manifests:
+                report.state = 'unrecorded'
+                continue
+            report.recorded_at, report.manifest = manifests[name]
+            if not os.path.isdir(root):
+                report.state = 'missing'
+            recorded, scanned = rows[name], scans[name]
+            report.files = len(scanned)
+            # Pycs the manifest lists (precompiled at deploy time) are checked; ones written since by running the tool are not additions
+            report.added = sorted(path for path in scanned if path not in recorded and not _runtime_bytecode(path))
+            report.removed = sorted(path for path in recorded if path not in scanned)
+            for path, st in scanned.items():
+                row = recorded.get(path)
+                if row is None:
+                    continue
+                if row[0] != st.st_mode:
+                    report.modified.append(path)
+                    continue
+                full_path = os.path.join(root, path)
+                try:
+                    digest = self._cheap_digest(full_path, st)
+                except OSError:
+                    report.modified.append(path)
+                    continue
+                if digest is not None:
+                    if digest != row[1]:
+                        report.modified.append(path)
+                elif full or row[2:] != _stat_key(st):
+                    pending.append((report, path, full_path, st))
+                    report.hashed += 1
+                    report.hashed_bytes += st.st_size
+
+        digests = hash_files([(full_path, st.st_size) for _, _, full_path, st in pending], self.jobs)
+        for report, path, full_path, st in pending:
+            if digests[full_path] == rows[report.name][path][1]:
+                # Same content: remember the new stat so the file is not hashed again
+                refreshed.setdefault(report.name, []).append((_stat_key(st), path))
+            else:
+                report.modified.append(path)
+        for report in reports:
+            report.modified.sort()
+            if report.state == 'ok' and (report.added or report.removed or report.modified):
+                report.state = 'changed'
+        if refreshed:
+            self._refresh(refreshed)
+        return reports
+
+    def _refresh(self, refreshed: Dict[str, List[Tuple[Tuple[int, int, int, int], str]]]):
+        connection = self._connect()
+        try:
+            with connection:
+                for name, updates in refreshed.items():
+                    connection.executemany(
+                        "UPDATE files SET size = ?, mtime_ns = ?, ctime_ns = ?, ino = ? WHERE tool = ? AND path = ?",
+                        [key + (name, path) for key, path in updates])
+        except sqlite3.Error as e:
+            self.config.print(f"Could not update the integrity stat cache: {e}", Fore.YELLOW)
+        finally:
+            connection.close()
+
+    def forget(self, name: str):
+        """Drop the manifest of an uninstalled tool"""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM files WHERE tool = ?", (name,))
+                connection.execute("DELETE FROM manifests WHERE tool = ?", (name,))
+        finally:
+            connection.close()
@@ -0,0 +1,186 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from colorama import Fore
+from command_runner import runner, NETWORK_TIMEOUT
+
+DEFAULT_MAX_CACHE_SIZE = 10 * 1024 ** 3  # 10 GiB
+# Sizes of the mirrors, measured when each is synced, so eviction does not walk the whole cache
+SIZES_FILE = "sizes.json"
+
+def parse_size(value: str) -> int:
+    """Parse a human readable size such as 500M or 10G into bytes"""
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    value = str(value).strip().lower().rstrip('b')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+def format_size(size: int) -> str:
+    """Format a byte count for display"""
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+class MirrorCache:
+    """Keeps bare mirrors of cloned repositories so reinstalls and updates only fetch deltas"""
+
+    def __init__(self, config, cache_dir: str, max_size: Optional[int] = None):
+        self.config = config
+        self.cache_dir = cache_dir
+        if max_size is None:
+            max_size = parse_size(os.environ.get('TOOL_DEPLOYER_CACHE_MAX_SIZE', DEFAULT_MAX_CACHE_SIZE))
+        self.max_size = max_size
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Mirrors that workers are syncing or still cloning from, by path
+        self._leases: Dict[str, int] = {}
+
+    def mirror_path(self, repo_url: str) -> str:
+        """Return the mirror location for a repository URL"""
+        url_hash = hashlib.sha256(repo_url.rstrip('/').encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{url_hash}.git")
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def sync(self, repo_url: str) -> str:
+        """Create or incrementally fetch the mirror for a repository and return its path"""
+        path = self.mirror_path(repo_url)
+        with self._lock_for(path):
+            if os.path.isdir(path):
+                self.config.print(f"Fetching {repo_url} into mirror cache...", Fore.CYAN)
+                # A failed fetch raises, so callers go to the origin instead of cloning a stale mirror
+                runner.run(['git', '-C', path, 'fetch', '--prune', '--quiet', 'origin'],
+                           check=True, retries=2, timeout=NETWORK_TIMEOUT)
+            else:
+                self.config.print(f"Creating mirror of {repo_url}...", Fore.CYAN)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                staging = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+                try:
+                    runner.run(['git', 'clone', '--mirror', '--quiet', repo_url, staging],
+                               check=True, retries=3, timeout=NETWORK_TIMEOUT)
+                    # Allow shallow, partial and pinned-SHA clones to be served from the mirror
+                    for key in ['uploadpack.allowFilter', 'uploadpack.allowAnySHA1InWant']:
+                        runner.run(['git', '-C', staging, 'config', key, 'true'], check=True)
+                    os.rename(staging, path)
+                finally:
+                    if os.path.exists(staging):
+                        shutil.rmtree(staging, ignore_errors=True)
+            os.utime(path)
+            self._record_sizes({os.path.basename(path): self._directory_size(path)})
+        self.evict(keep=path)
+        return path
+
+    def _load_sizes(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.cache_dir, SIZES_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_sizes(self, sizes: Dict[str, Optional[int]]):
+        """Merge measured sizes (None drops a mirror) into the sizes file"""
+        with self._locks_guard:
+            recorded = self._load_sizes()
+            for name, size in sizes.items():
+                if size is None:
+                    recorded.pop(name, None)
+                else:
+                    recorded[name] = size
+            target = os.path.join(self.cache_dir, SIZES_FILE)
+            temporary = f"{target}.{os.getpid()}-{threading.get_ident()}"
+            try:
+                with open(temporary, 'w') as f:
+                    json.dump(recorded, f)
+                os.replace(temporary, target)
+            except OSError:
+                pass
+
+    @contextmanager
+    def lease(self, repo_url: str) -> Iterator[str]:
+        """Sync a mirror and keep it from being evicted until the caller has cloned or fetched from it"""
+        path = self.mirror_path(repo_url)
+        with self._locks_guard:
+            self._leases[path] = self._leases.get(path, 0) + 1
+        try:
+            yield self.sync(repo_url)
+        finally:
+            with self._locks_guard:
+                self._leases[path] -= 1
+                if not self._leases[path]:
+                    del self._leases[path]
+
+    def clone_source(self, mirror_path: str, clone_options: Optional[Dict] = None) -> str:
+        """Return the URL to clone from a mirror.
+
+        Plain clones use the bare path so git hardlinks the object store; shallow
+        and partial clones need the file:// transport for git to honour them.
+        """
+        clone_options = clone_options or {}
+        if clone_options.get('depth') or clone_options.get('filter'):
+            return 'file://' + os.path.abspath(mirror_path)
+        return mirror_path
+
+    def _directory_size(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for file in files:
+                try:
+                    total += os.lstat(os.path.join(root, file)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """List cached mirrors as (path, size, last_used) ordered from least recently used.
+
+        Sizes come from the last sync; only mirrors without one are measured.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        sizes = self._load_sizes()
+        mirrors, measured = [], {}
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and entry.name.endswith('.git'):
+                size = sizes.get(entry.name)
+                if size is None:
+                    size = measured[entry.name] = self._directory_size(entry.path)
+                mirrors.append((entry.path, size, entry.stat().st_mtime))
+        if measured:
+            self._record_sizes(measured)
+        return sorted(mirrors, key=lambda mirror: mirror[2])
+
+    def evict(self, max_size: Optional[int] = None, keep: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Remove least recently used mirrors until the cache fits within max_size.
+
+        Leased mirrors are skipped, so a mirror another worker is cloning from
+        with --reference or --dissociate is never removed under it.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        mirrors = self.entries()
+        total = sum(size for _, size, _ in mirrors)
+        removed = []
+        for path, size, _ in mirrors:
+            if total <= max_size:
+                break
+            if path == keep:
+                continue
+            with self._lock_for(path):
+                with self._locks_guard:
+                    leased = path in self._leases
+                if leased:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed.append((path, size))
+        if removed:
+            self._record_sizes({os.path.basename(path): None for path, _ in removed})
+        return removed
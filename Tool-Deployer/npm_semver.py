@@ -0,0 +1,143 @@
+import re
+from typing import List, Optional, Tuple
+
+_VERSION_RE = re.compile(
+    r'^\s*[v=]*\s*(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?'
+    r'(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?\s*$'
+)
+_WILDCARDS = ('x', 'X', '*')
+
+def _prerelease_key(prerelease: Optional[str]) -> Tuple:
+    # A release sorts after any of its prereleases; numeric identifiers sort before alphanumeric ones
+    if not prerelease:
+        return (1,)
+    parts = tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in prerelease.split('.'))
+    return (0, parts)
+
+def _parse_partial(text: str) -> Optional[Tuple[List[Optional[int]], Optional[str]]]:
+    """Parse a possibly partial version ('1', '1.2.x') into [major, minor, patch] and a prerelease"""
+    match = _VERSION_RE.match(text)
+    if not match:
+        return None
+    parts = [None if part is None or part in _WILDCARDS else int(part) for part in match.groups()[:3]]
+    # Anything after a wildcard is a wildcard as well
+    for idx in range(1, 3):
+        if parts[idx - 1] is None:
+            parts[idx] = None
+    return parts, match.group(4)
+
+def parse_version(text: str) -> Optional[Tuple]:
+    """Parse a full version into a sortable key, or None if it is not valid semver"""
+    parsed = _parse_partial(text)
+    if not parsed or None in parsed[0]:
+        return None
+    parts, prerelease = parsed
+    return (parts[0], parts[1], parts[2], _prerelease_key(prerelease))
+
+def _key(major: int, minor: int, patch: int, prerelease: Optional[str] = None) -> Tuple:
+    return (major, minor, patch, _prerelease_key(prerelease))
+
+def _lowest(parts: List[Optional[int]], prerelease: Optional[str]) -> Tuple:
+    return _key(parts[0] or 0, parts[1] or 0, parts[2] or 0, prerelease)
+
+def _next_boundary(parts: List[Optional[int]]) -> Optional[Tuple]:
+    """Smallest version above a partial version: 1.2 -> 1.3.0-0, 1 -> 2.0.0-0"""
+    if parts[0] is None:
+        return None
+    if parts[1] is None:
+        return _key(parts[0] + 1, 0, 0, '0')
+    if parts[2] is None:
+        return _key(parts[0], parts[1] + 1, 0, '0')
+    return None
+
+def _comparators(token: str) -> Optional[List[Tuple[str, Tuple]]]:
+    """Expand a single range token (^1.2, ~1, >=2.0.0, 1.x) into primitive comparators"""
+    match = re.match(r'^(<=|>=|<|>|=|~>|~|\^)?(.*)$', token)
+    operator, rest = match.group(1) or '', match.group(2)
+    parsed = _parse_partial(rest)
+    if not parsed:
+        return None
+    parts, prerelease = parsed
+    major, minor, patch = parts
+
+    if major is None:
+        # '*', 'x' and friends: any version unless it is an impossible '<*'
+        return [('<', _key(0, 0, 0, '0'))] if operator in ('<', '>') else []
+
+    lower = ('>=', _lowest(parts, prerelease))
+    if operator in ('', '='):
+        if patch is not None:
+            return [('=', _key(major, minor, patch, prerelease))]
+        return [lower, ('<', _next_boundary(parts))]
+    if operator in ('~', '~>'):
+        upper = _key(major + 1, 0, 0, '0') if minor is None else _key(major, minor + 1, 0, '0')
+        return [lower, ('<', upper)]
+    if operator == '^':
+        if major != 0 or minor is None:
+            upper = _key(major + 1, 0, 0, '0')
+        elif minor != 0 or patch is None:
+            upper = _key(0, minor + 1, 0, '0')
+        else:
+            upper = _key(0, 0, patch + 1, '0')
+        return [lower, ('<', upper)]
+    if operator == '>=':
+        return [lower]
+    if operator == '<':
+        return [('<', _lowest(parts, prerelease if patch is not None else '0'))]
+    if operator == '>':
+        boundary = _next_boundary(parts)
+        return [('>=', boundary)] if boundary else [('>', _lowest(parts, prerelease))]
+    if operator == '<=':
+        boundary = _next_boundary(parts)
+        return [('<', boundary)] if boundary else [('<=', _lowest(parts, prerelease))]
+    return None
+
+def _range_sets(spec: str) -> Optional[List[List[Tuple[str, Tuple]]]]:
+    sets = []
+    for alternative in spec.split('||'):
+        alternative = alternative.strip()
+        hyphen = re.match(r'^(\S+)\s+-\s+(\S+)$', alternative)
+        if hyphen:
+            tokens = [f">={hyphen.group(1)}", f"<={hyphen.group(2)}"]
+        else:
+            # Allow whitespace between an operator and its version, e.g. '>= 1.2'
+            tokens = re.sub(r'(<=|>=|<|>|=|~>|~|\^)\s+', r'\1', alternative).split()
+        comparators = []
+        for token in tokens:
+            expanded = _comparators(token)
+            if expanded is None:
+                return None
+            comparators.extend(expanded)
+        sets.append(comparators)
+    return sets
+
+_CHECKS = {
+    '=': lambda a, b: a == b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+def satisfies(version: str, spec: str) -> Optional[bool]:
+    """Check a version against an npm semver range.
+
+    Supports ^, ~, comparison operators, x-ranges, hyphen ranges and '||'.
+    Returns None when the spec is not a semver range (tags, URLs, file: paths).
+    """
+    current = parse_version(version)
+    sets = _range_sets(spec.strip() or '*')
+    if current is None or sets is None:
+        return None
+
+    for comparators in sets:
+        if not all(_CHECKS[op](current, bound) for op, bound in comparators):
+            continue
+        # Prereleases only match ranges that mention a prerelease of the same version
+        if current[3] != (1,) and not any(
+            bound[:3] == current[:3] and bound[3] != (1,) and op != '<'
+            for op, bound in comparators
+        ):
+            continue
+        return True
+    return False
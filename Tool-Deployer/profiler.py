@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+class Profiler:
+    """Collects timing spans and writes them as a Chrome trace (also readable by Perfetto).
+
+    Spans nest per thread, so each tool handled by a worker thread gets its own
+    lane with its phases and subprocesses underneath. A span opened with tool=<name>
+    tags every span below it, including those of helper threads started through
+    bind_tool(). Subprocess spans are recorded by the command runner. When profiling
+    is disabled spans cost next to nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._events: List[Dict] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self._origin = time.perf_counter()
+
+    def current_tool(self):
+        """The tool the calling thread is working on, if any"""
+        return getattr(self._local, "tool", None)
+
+    @contextmanager
+    def bind_tool(self, tool):
+        """Tag the calling thread's spans with a tool, e.g. in a helper thread of an install"""
+        previous = self.current_tool()
+        self._local.tool = tool
+        try:
+            yield
+        finally:
+            self._local.tool = previous
+
+    @contextmanager
+    def span(self, name: str, category: str = "phase", **args) -> Iterator[Dict]:
+        """Time a block; the yielded dict can be filled with extra fields such as an exit code"""
+        if not self.enabled:
+            yield args
+            return
+        if self.current_tool() and "tool" not in args:
+            args["tool"] = self.current_tool()
+        start = time.perf_counter()
+        try:
+            with self.bind_tool(args.get("tool")):
+                yield args
+        finally:
+            self.record(name, category, start, **args)
+
+    def record(self, name: str, category: str, start: float, **args):
+        """Record a span whose start (a time.perf_counter() value) was taken by the caller"""
+        if not self.enabled:
+            return
+        if self.current_tool() and "tool" not in args:
+            args["tool"] = self.current_tool()
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X", "ts": (start - self._origin) * 1e6,
+                 "dur": (time.perf_counter() - start) * 1e6, "pid": os.getpid(), "tid": thread.ident, "args": args}
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def write(self, path: str):
+        """Write the collected spans in Chrome trace event format"""
+        with self._lock:
+            events = sorted(self._events, key=lambda event: event["ts"])
+            threads = dict(self._threads)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                    for tid, name in threads.items()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self) -> List[Tuple[str, str, int, float, float]]:
+        """Aggregate spans by name as (category, name, count, total seconds, max seconds), slowest first"""
+        totals: Dict[Tuple[str, str], List[float]] = {}
+        with self._lock:
+            for event in self._events:
+                totals.setdefault((event["cat"], event["name"]), []).append(event["dur"] / 1e6)
+        rows = [(cat, name, len(durations), sum(durations), max(durations))
+                for (cat, name), durations in totals.items()]
+        return sorted(rows, key=lambda row: -row[3])
+
+def command_name(command) -> str:
+    """Short span name for a command: the program and its subcommand, e.g. 'git fetch'"""
+    try:
+        parts = shlex.split(command) if isinstance(command, str) else [str(part) for part in command]
+    except ValueError:
+        parts = str(command).split()
+    if not parts:
+        return "subprocess"
+    name = [os.path.basename(parts[0])]
+    skip = False
+    for part in parts[1:]:
+        if skip:
+            skip = False
+        elif part in ("-C", "-c", "-m"):
+            # Option values such as 'git -C <dir>' are not the subcommand, but 'python -m pip' is
+            skip = part != "-m"
+            if part == "-m":
+                name = []
+        elif not part.startswith("-") and (not name or os.sep not in part):
+            # Paths are arguments, not subcommands
+            name.append(os.path.basename(part) if not name else part)
+            if len(name) == 2:
+                break
+    return " ".join(name) or os.path.basename(parts[0])
+
+# Global profiler, enabled by --profile
+profiler = Profiler()
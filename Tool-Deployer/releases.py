@@ -0,0 +1,145 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from command_runner import runner
+
+RELEASES_DIRNAME = "releases"
+CURRENT_LINK = "current"
+INCOMING_PREFIX = ".incoming-"
+# Number of releases kept per tool for rollback, including the active one
+KEEP_RELEASES = max(1, int(os.environ.get('TOOL_DEPLOYER_KEEP_RELEASES', 3)))
+
+class ReleaseLayout:
+    """Side-by-side releases of a tool with an atomically switched 'current' link.
+
+    ~/tools/<name>/releases/<sha>/ holds one complete checkout, with its own
+    node_modules and venv, and ~/tools/<name>/current points at the active one.
+    The tools database and ~/bin entries refer to paths below 'current', so
+    activating or rolling back a release is a single rename of that link.
+    Windows cannot create directory links without extra privileges, so tools
+    there keep the flat layout: every method then works on the tool directory itself.
+    """
+
+    def __init__(self, config, trash, keep: int = KEEP_RELEASES):
+        self.config = config
+        self.trash = trash
+        self.keep = keep
+        self.supported = os.name == 'posix'
+
+    @staticmethod
+    def root_of(path: str) -> str:
+        """The tool directory for a recorded path, which is '<root>/current' for release layouts"""
+        if os.path.basename(path.rstrip(os.sep)) == CURRENT_LINK and os.path.islink(path):
+            return os.path.dirname(path.rstrip(os.sep))
+        return path
+
+    @staticmethod
+    def uses_releases(root: str) -> bool:
+        return os.path.islink(os.path.join(root, CURRENT_LINK))
+
+    def incoming(self, root: str) -> str:
+        """Create an empty directory to clone a new release into, next to the existing ones"""
+        if not self.supported:
+            return root
+        incoming = os.path.join(root, RELEASES_DIRNAME, f"{INCOMING_PREFIX}{os.urandom(6).hex()}")
+        # Unlike mkdtemp, this keeps the usual umask-based permissions for the checkout
+        os.makedirs(incoming)
+        return incoming
+
+    def seal(self, root: str, incoming: str, release_id: Optional[str] = None) -> str:
+        """Rename a cloned checkout to releases/<commit> and return its path.
+
+        Trees without git metadata (archive downloads) pass their release_id.
+
+        A reinstall asks for a fresh tree: an inactive release of the same commit
+        is replaced, while the active one keeps serving and the new tree gets a
+        numbered suffix until it is activated.
+        """
+        if not self.supported:
+            return incoming
+        commit = release_id or runner.run(['git', 'rev-parse', 'HEAD'], cwd=incoming, check=True).stdout.strip()
+        release = os.path.join(root, RELEASES_DIRNAME, commit)
+        active = self.active(root)
+        suffix = 1
+        while os.path.lexists(release):
+            if os.path.basename(release) != active:
+                self.trash.discard(release)
+                break
+            suffix += 1
+            release = os.path.join(root, RELEASES_DIRNAME, f"{commit}-{suffix}")
+        os.rename(incoming, release)
+        return release
+
+    def activate(self, root: str, release: str) -> str:
+        """Point 'current' at a release in one atomic rename and return the path to record"""
+        if not self.supported:
+            return release
+        current = os.path.join(root, CURRENT_LINK)
+        link = os.path.join(root, f".{CURRENT_LINK}-{os.urandom(6).hex()}")
+        # A relative link keeps working if ~/tools is moved or mounted elsewhere
+        os.symlink(os.path.relpath(release, root), link)
+        os.replace(link, current)
+        return current
+
+    def deactivate(self, root: str, release: str, previous: Optional[str]):
+        """Undo activate() for a release whose deploy failed afterwards and throw it away.
+
+        'current' goes back to the previous release id, or is removed when there
+        was none, so a first install leaves nothing behind.
+        """
+        if self.supported:
+            current = os.path.join(root, CURRENT_LINK)
+            if previous:
+                self.activate(root, self.release_path(root, previous))
+            elif os.path.islink(current):
+                os.unlink(current)
+        self.discard(root, release)
+
+    def active(self, root: str) -> Optional[str]:
+        """The id (commit) of the active release"""
+        try:
+            return os.path.basename(os.readlink(os.path.join(root, CURRENT_LINK)))
+        except OSError:
+            return None
+
+    def active_commit(self, root: str) -> Optional[str]:
+        """The commit of the active release, without a reinstall suffix"""
+        active = self.active(root)
+        return active.split('-', 1)[0] if active else None
+
+    def release_path(self, root: str, release_id: str) -> str:
+        return os.path.join(root, RELEASES_DIRNAME, release_id)
+
+    def discard(self, root: str, release: str):
+        """Throw away a release that failed before activation; a tool left without any release goes entirely"""
+        if not self.supported or not self.uses_releases(root):
+            target = root
+        else:
+            target = release
+        if os.path.lexists(target):
+            self.trash.discard(target)
+
+    def record(self, history: Optional[List[Dict]], release_id: str, **fields) -> List[Dict]:
+        """Append an activated release to a tool's history, newest last"""
+        history = [entry for entry in (history or []) if entry['id'] != release_id]
+        history.append({'id': release_id, 'activated_at': datetime.now().isoformat(), **fields})
+        return history
+
+    def prune(self, root: str, history: List[Dict]) -> List[Dict]:
+        """Keep the newest releases plus the active one, trash the rest and return the remaining history"""
+        if not self.supported:
+            return history
+        active = self.active(root)
+        kept = history[-self.keep:]
+        kept_ids = {entry['id'] for entry in kept} | {active}
+        kept = [entry for entry in history if entry['id'] in kept_ids]
+        releases_dir = os.path.join(root, RELEASES_DIRNAME)
+        try:
+            names = os.listdir(releases_dir)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            # Incoming checkouts may belong to a deploy that is still running
+            if name not in kept_ids and not name.startswith(INCOMING_PREFIX):
+                self.trash.discard(os.path.join(releases_dir, name))
+        return kept
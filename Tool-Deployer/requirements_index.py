@@ -0,0 +1,255 @@
+import os
+import json
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from colorama import Fore
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import Version, InvalidVersion
+
+REQUIREMENTS_FILE = "requirements.txt"
+# Bump when the cached parse format changes
+INDEX_VERSION = 1
+
+@dataclass
+class RequirementEntry:
+    """One requirement line of one tool"""
+    tool: str
+    name: str
+    requirement: str
+    specifier: str = ""
+    extras: List[str] = field(default_factory=list)
+    marker: Optional[str] = None
+    url: Optional[str] = None
+    source: str = ""
+    line: int = 0
+    # Whether the tool installs into its own venv rather than the shared environment
+    venv: bool = False
+
+    @property
+    def applies(self) -> bool:
+        """Whether the requirement's environment marker matches this interpreter"""
+        if not self.marker:
+            return True
+        from packaging.markers import Marker
+        return Marker(self.marker).evaluate()
+
+def parse_requirements(content: str) -> Dict:
+    """Parse requirements file content into requirements, includes and errors.
+
+    Follows pip's file format: comments, line continuations, per-requirement
+    options such as --hash, and -r includes. Constraints files, editables and
+    global options do not add requirements and are skipped.
+    """
+    parsed = {'requirements': [], 'includes': [], 'errors': []}
+    logical = []
+    pending, start = "", 0
+    for number, raw in enumerate(content.splitlines(), 1):
+        if not pending:
+            start = number
+        if raw.endswith('\\'):
+            pending += raw[:-1] + ' '
+            continue
+        logical.append((start, pending + raw))
+        pending = ""
+    if pending:
+        logical.append((start, pending))
+
+    for number, line in logical:
+        # Comments start a line or follow whitespace; '#' inside URLs is a fragment
+        if line.lstrip().startswith('#'):
+            continue
+        line = line.split(' #', 1)[0].split('\t#', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith('-'):
+            option, _, value = line.replace('=', ' ', 1).partition(' ')
+            if option in ('-r', '--requirement') and value.strip():
+                parsed['includes'].append(value.strip())
+            continue
+        # Per-requirement options (--hash, --config-settings) follow the requirement itself
+        requirement = line.split(' --', 1)[0].strip()
+        try:
+            req = Requirement(requirement)
+        except InvalidRequirement as e:
+            parsed['errors'].append({'line': number, 'text': line, 'error': str(e).splitlines()[0]})
+            continue
+        parsed['requirements'].append({
+            'line': number,
+            'requirement': str(req),
+            'name': canonicalize_name(req.name),
+            'specifier': str(req.specifier),
+            'extras': sorted(req.extras),
+            'marker': str(req.marker) if req.marker else None,
+            'url': req.url,
+        })
+    return parsed
+
+def read_requirements(path: str, seen: Optional[set] = None) -> List[Dict]:
+    """Parse a requirements file and the files it includes, without caching"""
+    seen = seen if seen is not None else set()
+    real = os.path.realpath(path)
+    if real in seen or not os.path.exists(path):
+        return []
+    seen.add(real)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        parsed = parse_requirements(f.read())
+    requirements = list(parsed['requirements'])
+    for include in parsed['includes']:
+        requirements.extend(read_requirements(os.path.join(os.path.dirname(path), include), seen))
+    return requirements
+
+def _candidates(specifiers: List[SpecifierSet]) -> List[Version]:
+    """Versions that together cover every region the specifiers can carve out.
+
+    Bounds are checked on both sides: each version named in a specifier, one
+    just above it, and versions below and above everything mentioned.
+    """
+    candidates = {Version("0"), Version("999999")}
+    for specifier_set in specifiers:
+        for specifier in specifier_set:
+            try:
+                version = Version(specifier.version.rstrip('.*').rstrip('.'))
+            except InvalidVersion:
+                continue
+            candidates.add(version)
+            epoch = f"{version.epoch}!" if version.epoch else ""
+            candidates.add(Version(f"{epoch}{version.base_version}.0.0.0.1"))
+    return sorted(candidates)
+
+def find_conflict(entries: List[RequirementEntry]) -> Optional[str]:
+    """Explain why requirements on the same package cannot all be met, or return None"""
+    urls = {entry.url for entry in entries if entry.url}
+    if len(urls) > 1:
+        return "different URLs: " + ", ".join(sorted(urls))
+    specifiers = [SpecifierSet(entry.specifier) for entry in entries if entry.specifier]
+    if len(specifiers) < 2:
+        return None
+    arbitrary = {s.version for specifier_set in specifiers for s in specifier_set if s.operator == '==='}
+    if len(arbitrary) > 1:
+        return "different arbitrary pins: " + ", ".join(sorted(arbitrary))
+    for candidate in _candidates(specifiers):
+        if all(specifier_set.contains(candidate, prereleases=True) for specifier_set in specifiers):
+            return None
+    return "no version satisfies " + ", ".join(sorted({str(s) for s in specifiers}))
+
+class RequirementsIndex:
+    """Python requirements of every registered tool, parsed once and queried together.
+
+    Parsed files are cached by content hash in the tools cache, so rebuilding the
+    index only parses requirements files that changed since the last run.
+    """
+
+    def __init__(self, config, tool_manager):
+        self.config = config
+        self.tool_manager = tool_manager
+        self.cache_file = os.path.join(tool_manager.cache_dir, "requirements-index.json")
+        self.entries: List[RequirementEntry] = []
+        self.errors: List[Tuple[str, str, int, str]] = []
+        self.by_name: Dict[str, List[RequirementEntry]] = {}
+
+    def _load_cache(self) -> Dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            return cache['files'] if cache.get('version') == INDEX_VERSION else {}
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _save_cache(self, files: Dict):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temporary = f"{self.cache_file}.{os.getpid()}"
+        with open(temporary, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'files': files}, f)
+        os.replace(temporary, self.cache_file)
+
+    def build(self) -> "RequirementsIndex":
+        """Index the requirements of every registered tool"""
+        cache = self._load_cache()
+        used: Dict[str, Dict] = {}
+        for name, info in self.tool_manager.registry.all().items():
+            path = os.path.join(info['path'], REQUIREMENTS_FILE)
+            if os.path.exists(path):
+                self._index_file(name, bool(info.get('venv')), path, info['path'], cache, used, set())
+
+        for entry in self.entries:
+            self.by_name.setdefault(entry.name, []).append(entry)
+        # Keep only the files still in use, so the cache does not grow with every edit
+        if used.keys() != cache.keys():
+            try:
+                self._save_cache(used)
+            except OSError as e:
+                self.config.print(f"Could not write requirements cache: {e}", Fore.YELLOW)
+        return self
+
+    def _index_file(self, tool: str, venv: bool, path: str, root: str, cache: Dict, used: Dict, seen: set):
+        real = os.path.realpath(path)
+        if real in seen:
+            return
+        seen.add(real)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            self.errors.append((tool, path, 0, str(e)))
+            return
+        digest = hashlib.sha256(content).hexdigest()
+        parsed = cache.get(digest) or used.get(digest)
+        if parsed is None:
+            parsed = parse_requirements(content.decode('utf-8', errors='replace'))
+        used[digest] = parsed
+
+        source = os.path.relpath(path, root)
+        for item in parsed['requirements']:
+            self.entries.append(RequirementEntry(
+                tool=tool, name=item['name'], requirement=item['requirement'], specifier=item['specifier'],
+                extras=item['extras'], marker=item['marker'], url=item['url'], source=source,
+                line=item['line'], venv=venv
+            ))
+        for error in parsed['errors']:
+            self.errors.append((tool, source, error['line'], error['error']))
+        for include in parsed['includes']:
+            self._index_file(tool, venv, os.path.join(os.path.dirname(path), include), root, cache, used, seen)
+
+    def who_needs(self, package: str) -> List[RequirementEntry]:
+        """Every requirement on a package, across all tools"""
+        return self.by_name.get(canonicalize_name(package), [])
+
+    def shared(self) -> Dict[str, List[RequirementEntry]]:
+        """Requirements installed into the shared environment, i.e. by tools without a venv, grouped by package"""
+        groups: Dict[str, List[RequirementEntry]] = {}
+        for name, entries in self.by_name.items():
+            entries = [entry for entry in entries if not entry.venv and entry.applies]
+            if entries:
+                groups[name] = entries
+        return groups
+
+    def conflicts(self) -> List[Tuple[str, List[RequirementEntry], str]]:
+        """Packages whose requirements in the shared environment cannot be met together"""
+        found = []
+        for name, entries in sorted(self.shared().items()):
+            reason = find_conflict(entries)
+            if reason:
+                found.append((name, entries, reason))
+        return found
+
+    def merged(self) -> List[str]:
+        """One requirement line per package for the shared environment, for a single resolver pass.
+
+        Packages with conflicts are left out; check conflicts() first.
+        """
+        lines = []
+        for name, entries in sorted(self.shared().items()):
+            if find_conflict(entries):
+                continue
+            extras = sorted({extra for entry in entries for extra in entry.extras})
+            extras_part = f"[{','.join(extras)}]" if extras else ""
+            url = next((entry.url for entry in entries if entry.url), None)
+            if url:
+                lines.append(f"{name}{extras_part} @ {url}")
+                continue
+            specifiers = sorted({str(s) for entry in entries for s in SpecifierSet(entry.specifier)})
+            lines.append(f"{name}{extras_part}{','.join(specifiers)}")
+        return lines
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tarfile
+from typing import List
+
+def safe_parts(name: str, what: str = "archive") -> List[str]:
+    """Split a member name, rejecting absolute paths and parent references"""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if name.startswith(('/', '\\')) or '..' in parts or (parts and ':' in parts[0]):
+        raise ValueError(f"unsafe path in {what}: {name}")
+    return parts
+
+def inside(path: str, root: str) -> bool:
+    """Whether path is root or below it; both must already be real paths"""
+    return path == root or path.startswith(root + os.sep)
+
+def _check_link(member: tarfile.TarInfo, parent: str, root: str, what: str):
+    """A symlink must resolve inside root now, and must not come to point elsewhere later.
+
+    Links extracted earlier are followed by realpath, so chains of relative
+    links are caught. A '..' is only allowed after directories that already
+    exist: below a name that a later member could still create as a link,
+    it would climb from wherever that link points.
+    """
+    linkname = member.linkname.replace('\\', '/')
+    components = linkname.split('/')
+    if os.path.isabs(linkname) or (components and ':' in components[0]):
+        raise ValueError(f"unsafe link in {what}: {member.name} -> {member.linkname}")
+    for index, component in enumerate(components):
+        if component == '..' and not os.path.isdir(os.path.join(parent, *components[:index])):
+            raise ValueError(f"unsafe link in {what}: {member.name} -> {member.linkname}")
+    if not inside(os.path.realpath(os.path.join(parent, linkname)), root):
+        raise ValueError(f"unsafe link in {what}: {member.name} -> {member.linkname}")
+
+def extract_member(tar: tarfile.TarFile, member: tarfile.TarInfo, root: str, parts: List[str],
+                   link_prefix: List[str], what: str = "archive"):
+    """Extract one member to root/parts; nothing may be written, linked or copied from outside root.
+
+    Every write goes to a directory whose real path is checked against the real
+    root first, so links extracted earlier cannot lead later members out of the
+    tree. Hardlinks name an earlier member by its full name, which must start
+    with link_prefix (the part of member names that maps to root); they are
+    extracted as copies of regular files only.
+    """
+    root = os.path.realpath(root)
+    os.makedirs(root, exist_ok=True)
+    link_parts = None
+    if member.islnk():
+        link_parts = safe_parts(member.linkname, what)
+        if len(link_parts) <= len(link_prefix) or link_parts[:len(link_prefix)] != link_prefix:
+            raise ValueError(f"unsafe link in {what}: {member.name} -> {member.linkname}")
+        link_parts = link_parts[len(link_prefix):]
+    if hasattr(tarfile, 'data_filter'):
+        # Python 3.12 (and security backports) ship the same checks as the "data" extraction filter
+        relative = member.replace(name='/'.join(parts), deep=False)
+        if link_parts is not None:
+            relative = relative.replace(linkname='/'.join(link_parts), deep=False)
+        try:
+            filtered = tarfile.data_filter(relative, root)
+        except tarfile.FilterError as e:
+            raise ValueError(f"unsafe member in {what}: {member.name}: {e}") from e
+        member = member.replace(mode=filtered.mode, deep=False)
+
+    target = os.path.join(root, *parts)
+    parent = os.path.realpath(os.path.dirname(target))
+    if not inside(parent, root):
+        raise ValueError(f"unsafe path in {what}: {member.name}")
+    os.makedirs(parent, exist_ok=True)
+    target = os.path.join(parent, os.path.basename(target))
+    # A link that later members resolved through must not be swapped for another
+    if os.path.islink(target):
+        raise ValueError(f"duplicate link in {what}: {member.name}")
+    if member.isdir():
+        os.makedirs(target, exist_ok=True)
+    elif member.isfile():
+        descriptor = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        with os.fdopen(descriptor, 'wb') as f:
+            shutil.copyfileobj(tar.extractfile(member), f)
+        os.chmod(target, member.mode & 0o755 | 0o600)
+    elif member.issym():
+        _check_link(member, parent, root, what)
+        os.symlink(member.linkname, target)
+    elif member.islnk():
+        source = os.path.join(root, *link_parts)
+        source_parent = os.path.realpath(os.path.dirname(source))
+        source = os.path.join(source_parent, os.path.basename(source))
+        if not inside(source_parent, root) or os.path.islink(source) or not os.path.isfile(source):
+            raise ValueError(f"unsafe link in {what}: {member.name} -> {member.linkname}")
+        shutil.copy2(source, target, follow_symlinks=False)
+    # Devices, fifos and other special files are skipped
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import queue
+import platform
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from colorama import Fore
+from command_runner import runner
+
+# Bump when the cached result format changes
+CACHE_VERSION = 1
+# Local results are reused while nothing they depend on changed on disk, for at most this long;
+# the TTL bounds how late an edit to a tracked file shows up as a dirty tree
+LOCAL_TTL = float(os.environ.get('TOOL_DEPLOYER_STATUS_TTL', 30))
+# Upstream heads cost a network round trip and are reused for longer
+REMOTE_TTL = float(os.environ.get('TOOL_DEPLOYER_STATUS_REMOTE_TTL', 300))
+
+# Worst first: a tool's state is the most severe problem found
+STATES = ('broken', 'drifted', 'dirty', 'outdated', 'ok')
+
+def _stat_key(path: str) -> Optional[List[int]]:
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+class StatusChecker:
+    """Health checks for installed tools, run concurrently and cached between calls.
+
+    Local checks (paths, ~/bin entry, working tree, recorded commit and dependency
+    fingerprints) are cached under a signature of stat results for the files they
+    read, so a repeated call only re-runs them for tools that changed on disk or
+    whose result is older than LOCAL_TTL. Upstream heads are looked up with one
+    batched ls-remote per repository and cached for REMOTE_TTL.
+    """
+
+    def __init__(self, config, tool_manager, jobs: int = 8, use_cache: bool = True, remote: bool = True):
+        self.config = config
+        self.tool_manager = tool_manager
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.remote = remote
+        self.cache_file = os.path.join(tool_manager.cache_dir, "status.json")
+
+    def _load_cache(self) -> Dict:
+        if not self.use_cache:
+            return {'tools': {}, 'remotes': {}}
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get('version') == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {'tools': {}, 'remotes': {}}
+
+    def _save_cache(self, cache: Dict):
+        cache['version'] = CACHE_VERSION
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temporary = f"{self.cache_file}.{os.getpid()}"
+            with open(temporary, 'w') as f:
+                json.dump(cache, f)
+            os.replace(temporary, self.cache_file)
+        except OSError as e:
+            self.config.print(f"Could not write status cache: {e}", Fore.YELLOW)
+
+    def _link_path(self, name: str, info: Dict) -> str:
+        link = os.path.join(self.tool_manager.bin_dir, name)
+        if info.get('venv') and platform.system() == "Windows":
+            link += ".cmd"
+        return link
+
+    def _dependency_manager(self, info: Dict):
+        from dependency_manager import DependencyManager
+        venvs = self.tool_manager.venvs if info.get('venv') else None
+        return DependencyManager(self.config, venvs=venvs, venv_dir=info.get('venv'))
+
+    def signature(self, name: str, info: Dict) -> List:
+        """Stat results of everything the local checks read, plus the tool's record"""
+        path = info['path']
+        git_dir = os.path.join(path, '.git')
+        watched = [path, os.path.realpath(path), os.path.join(git_dir, 'HEAD'), os.path.join(git_dir, 'index'),
+                   info.get('executable') or '', self._link_path(name, info)]
+        from dependency_manager import DependencyManager
+        managers = DependencyManager(self.config).package_managers
+        files = sorted({file for manager in managers.values() for file in manager['fingerprint_files']})
+        watched += [os.path.join(path, file) for file in files]
+        if info.get('venv'):
+            watched.append(os.path.join(info['venv'], 'pyvenv.cfg'))
+        record = [info.get(field) for field in ('commit', 'branch', 'executable', 'deps', 'venv')]
+        return [json.dumps(record, sort_keys=True)] + [_stat_key(file) for file in watched]
+
+    def check_local(self, name: str, info: Dict) -> Dict:
+        """Run the checks that need no network access"""
+        result = {'name': name, 'path': info['path'], 'problems': [], 'recorded': info.get('commit'),
+                  'commit': None, 'dirty': None, 'link': None, 'drift': [], 'checked_at': datetime.now().isoformat()}
+        problems = result['problems']
+        path = info['path']
+        if not os.path.isdir(path):
+            problems.append(f"checkout missing: {path}")
+            result['link'] = self._check_link(name, info)
+            return result
+
+        executable = info.get('executable')
+        if not executable or not os.path.isfile(executable):
+            problems.append(f"executable missing: {executable}")
+        elif not os.access(executable, os.X_OK) and platform.system() != "Windows":
+            problems.append(f"executable not runnable: {executable}")
+        result['link'] = self._check_link(name, info)
+        if result['link'] != 'ok':
+            problems.append(f"~/bin entry {result['link']}")
+
+        if os.path.exists(os.path.join(path, '.git')):
+            head, porcelain = runner.run_many([
+                {'argv': ['git', 'rev-parse', 'HEAD'], 'cwd': path},
+                # Untracked files are left out: installers add node_modules, venvs and caches
+                # Without optional locks git does not rewrite .git/index, which is part of the signature
+                {'argv': ['git', '--no-optional-locks', 'status', '--porcelain', '--untracked-files=no'], 'cwd': path},
+            ])
+            result['commit'] = head.stdout.strip() if head.ok else None
+            if porcelain.ok:
+                result['dirty'] = len([line for line in porcelain.stdout.splitlines() if line.strip()])
+            else:
+                problems.append(f"git status failed: {porcelain.describe()}")
+            if result['commit'] and info.get('commit') and result['commit'] != info['commit']:
+                problems.append(f"checkout is at {result['commit'][:12]}, recorded {info['commit'][:12]}")
+        elif info.get('archive'):
+            # Archive installs have no git metadata; the release is what was downloaded
+            result['commit'] = info.get('commit')
+
+        dep_manager = self._dependency_manager(info)
+        recorded = info.get('deps') or {}
+        for manager in dep_manager.detect_package_managers(path):
+            if recorded.get(manager) != dep_manager.fingerprint(path, manager):
+                result['drift'].append(manager)
+        return result
+
+    def _check_link(self, name: str, info: Dict) -> str:
+        link = self._link_path(name, info)
+        if not os.path.lexists(link):
+            return 'missing'
+        if os.path.islink(link):
+            if not os.path.exists(link):
+                return 'dangling'
+            executable = info.get('executable')
+            if executable and os.path.realpath(link) != os.path.realpath(executable):
+                return 'mismatch'
+        return 'ok'
+
+    def _cached_heads(self, tools: Dict[str, Dict], cache: Dict) -> Tuple[Dict[str, Optional[str]], Dict[str, Dict]]:
+        """Upstream heads still fresh in the cache, and the tools following a branch whose head must be looked up"""
+        now = time.time()
+        remotes = cache.setdefault('remotes', {})
+        heads, missing = {}, {}
+        for name, info in tools.items():
+            if not info.get('branch'):
+                continue
+            cached = remotes.get(f"{info.get('url') or info['path']} {info['branch']}")
+            if cached and now - cached['checked'] < REMOTE_TTL:
+                heads[name] = cached['head']
+            else:
+                missing[name] = info
+        return heads, missing
+
+    def _lookup_heads(self, missing: Dict[str, Dict], cache: Dict, on_head: Callable[[str, Optional[str]], None]):
+        """One batched ls-remote for the tools without a cached head, passing each head to on_head as it arrives"""
+        now = time.time()
+        remotes = cache.setdefault('remotes', {})
+
+        def found(name: str, head: Optional[str]):
+            info = missing[name]
+            if head:
+                remotes[f"{info.get('url') or info['path']} {info['branch']}"] = {'head': head, 'checked': now}
+            on_head(name, head)
+        self.tool_manager.remote_heads(missing, on_head=found)
+
+    def _behind(self, path: str, commit: str, remote: str) -> Optional[int]:
+        """Commits between the checkout and upstream, if the upstream commit is already known locally"""
+        result = runner.run(['git', 'rev-list', '--count', f"{commit}..{remote}"], cwd=path)
+        return int(result.stdout.strip()) if result.ok and result.stdout.strip().isdigit() else None
+
+    def _finish(self, result: Dict, info: Dict, heads: Dict[str, Optional[str]]):
+        """Add the upstream comparison and the overall state to a local result"""
+        result.setdefault('problems', [])
+        if not info.get('branch'):
+            result['upstream'] = 'pinned' if info.get('commit') else 'unknown'
+        elif not self.remote:
+            result['upstream'] = 'unchecked'
+        else:
+            remote = heads.get(result['name'])
+            result['remote'] = remote
+            commit = result.get('commit') or info.get('commit')
+            if not remote or not commit:
+                result['upstream'] = 'unknown'
+            elif remote == commit:
+                result['upstream'] = 'current'
+            else:
+                result['upstream'] = 'behind'
+                result['behind'] = self._behind(info['path'], commit, remote)
+        if result['problems']:
+            result['state'] = 'broken'
+        elif result.get('drift'):
+            result['state'] = 'drifted'
+        elif result.get('dirty'):
+            result['state'] = 'dirty'
+        elif result['upstream'] == 'behind':
+            result['state'] = 'outdated'
+        else:
+            result['state'] = 'ok'
+
+    def run(self, names: Optional[List[str]] = None, on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Check the named tools (default: all) and return their results, passing each to on_result as it is ready"""
+        tools = {tool['name']: tool for tool in self.tool_manager.list_tools()
+                 if names is None or tool['name'] in names}
+        cache = self._load_cache()
+        cached_tools = cache.setdefault('tools', {})
+        now = time.time()
+        from concurrent.futures import ThreadPoolExecutor
+
+        def local(name: str) -> Tuple[Dict, bool]:
+            info = tools[name]
+            signature = self.signature(name, info)
+            entry = cached_tools.get(name)
+            if entry and entry['signature'] == signature and now - entry['checked'] < LOCAL_TTL:
+                return dict(entry['result']), True
+            result = self.check_local(name, info)
+            cached_tools[name] = {'signature': signature, 'checked': time.time(), 'result': result}
+            return dict(result), False
+
+        # Each tool is reported once its local checks and its own upstream lookup are done,
+        # so slow remotes only hold back the tools that follow them
+        events = queue.Queue()
+        results, waiting = [], {}
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            heads, missing = self._cached_heads(tools, cache) if self.remote else ({}, {})
+            if missing:
+                # The upstream lookups run next to the local checks
+                lookup = executor.submit(self._lookup_heads, missing, cache,
+                                         lambda name, head: events.put(('head', name, head)))
+                lookup.add_done_callback(lambda future: events.put(('lookup', None, future)))
+            for name in tools:
+                executor.submit(local, name).add_done_callback(
+                    lambda future, name=name: events.put(('local', name, future)))
+            while len(results) < len(tools):
+                kind, name, value = events.get()
+                if kind == 'lookup':
+                    value.result()
+                    # Tools whose lookup never reported are compared against no upstream
+                    finished = [(name, waiting.pop(name)) for name in list(missing) if name in waiting]
+                    missing.clear()
+                elif kind == 'head':
+                    heads[name] = value
+                    missing.pop(name, None)
+                    finished = [(name, waiting.pop(name))] if name in waiting else []
+                else:
+                    result, cached = value.result()
+                    result['cached'] = cached
+                    if name in missing:
+                        waiting[name] = result
+                        continue
+                    finished = [(name, result)]
+                for name, result in finished:
+                    self._finish(result, tools[name], heads)
+                    results.append(result)
+                    if on_result:
+                        on_result(result)
+
+        # Forget tools that are no longer installed and upstream heads that expired
+        if names is None:
+            cache['tools'] = {name: entry for name, entry in cached_tools.items() if name in tools}
+        cache['remotes'] = {key: entry for key, entry in cache.get('remotes', {}).items()
+                            if time.time() - entry['checked'] < REMOTE_TTL}
+        self._save_cache(cache)
+        return sorted(results, key=lambda result: result['name'])
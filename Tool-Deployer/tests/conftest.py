@@ -0,0 +1,39 @@
+import os
+import sys
+import pytest
+
+# The deployer's modules live flat in the directory above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class RecordingConfig:
+    """Stands in for the CLI's Config and keeps what would have been printed"""
+
+    def __init__(self):
+        self.messages = []
+        self.quiet = False
+        self.verbose = False
+
+    def print(self, message, color=None):
+        self.messages.append(message)
+
+@pytest.fixture
+def config():
+    return RecordingConfig()
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """An empty home directory, so ~/tools, ~/bin and the caches below them stay inside tmp_path"""
+    import trash
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    # Cleanup runs in the test instead of a detached process that outlives tmp_path
+    monkeypatch.setattr(trash, "BACKGROUND_GC", False)
+    return home
+
+@pytest.fixture
+def deployer(home, monkeypatch):
+    """The CLI module with its output silenced"""
+    import tool_deployer
+    monkeypatch.setattr(tool_deployer.config, "quiet", True)
+    return tool_deployer
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import pytest
+from tool_manager import ToolManager
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+def _repo(root, name):
+    repo = os.path.join(root, "origin", name)
+    os.makedirs(repo)
+    with open(os.path.join(repo, f"{name}.py"), 'w') as f:
+        f.write("#!/usr/bin/env python3\nprint('hello')\n")
+    _git('init', '-q', '-b', 'main', cwd=repo)
+    _git('add', '.', cwd=repo)
+    _git('commit', '-qm', 'init', cwd=repo)
+    return repo
+
+def _manifest(tmp_path, data):
+    path = tmp_path / "tools.json"
+    path.write_text(json.dumps(data))
+    return str(path)
+
+def test_manifest_entries_take_command_line_defaults(deployer, tmp_path):
+    specs = deployer.load_manifest(_manifest(tmp_path, {'tools': [
+        "https://github.com/owner/first.git",
+        {'url': "https://github.com/owner/second", 'name': "renamed", 'ref': "v1", 'depth': 5, 'venv': False},
+    ]}), default_clone_options={'depth': 1}, default_venv=True)
+    assert [spec['name'] for spec in specs] == ["first", "renamed"]
+    assert specs[0]['venv'] and not specs[1]['venv']
+    assert specs[0]['clone_options']['depth'] == 1 and specs[1]['clone_options']['depth'] == 5
+    assert specs[1]['ref'] == "v1"
+
+@pytest.mark.parametrize("data, message", [
+    ({'tools': [{'name': "nourl"}]}, "missing a 'url'"),
+    (["https://github.com/a/tool", "https://github.com/b/tool"], "reuses the tool name 'tool'"),
+    ({'tool': "https://github.com/a/tool"}, "must be a list"),
+])
+def test_invalid_manifests_are_rejected(deployer, tmp_path, data, message):
+    with pytest.raises(ValueError, match=message):
+        deployer.load_manifest(_manifest(tmp_path, data))
+
+def test_one_failing_repository_does_not_stop_the_batch(deployer, tmp_path):
+    specs = deployer.load_manifest(_manifest(tmp_path, [
+        _repo(str(tmp_path), "alpha"),
+        {'url': str(tmp_path / "origin" / "missing"), 'name': "missing"},
+        _repo(str(tmp_path), "beta"),
+    ]))
+    tool_manager = ToolManager(deployer.config)
+    assert deployer.deploy_all(tool_manager, specs, jobs=3, use_cache=False) == 1
+
+    assert sorted(tool['name'] for tool in tool_manager.list_tools()) == ["alpha", "beta"]
+    for name in ("alpha", "beta"):
+        link = os.path.join(tool_manager.bin_dir, name)
+        assert os.path.realpath(link) == os.path.realpath(tool_manager.get_tool(name)['executable'])
+        assert subprocess.run([link], capture_output=True, text=True).stdout == "hello\n"
+    assert not os.path.exists(os.path.join(tool_manager.install_dir, "missing"))
+
+    # Installed tools are skipped unless reinstalling
+    assert deployer.deploy_tool(tool_manager, specs[0]) == ("skipped", f"already installed in "
+                                                            f"{os.path.join(tool_manager.install_dir, 'alpha')}")
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _suite():
+    spec = importlib.util.spec_from_file_location("suite", os.path.join(ROOT, "benchmarks", "suite.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_regressions_beyond_the_threshold_are_reported():
+    suite = _suite()
+    baseline = {"install[1]": 1.0, "list[1]": 0.01, "update_noop[1]": 1.0}
+    results = {"install[1]": 1.3, "list[1]": 0.04, "update_noop[1]": 1.2, "new[1]": 5.0}
+    # list is under the noise floor and new has no baseline
+    assert suite.compare(results, baseline, 0.25) == ["install[1]: 1.300s vs 1.000s baseline (+30%)"]
+    assert suite.compare(results, baseline, 0.5) == []
+
+def test_fixtures_and_stubs_work_offline(tmp_path):
+    suite = _suite()
+    urls = suite.create_fixtures(str(tmp_path))
+    assert sorted(urls) == sorted(suite.FIXTURES)
+    count = lambda url: subprocess.run(["git", "-C", url[len("file://"):], "rev-list", "--count", "main"],
+                                       capture_output=True, text=True, check=True).stdout.strip()
+    assert count(urls["small"]) == "2" and count(urls["history"]) == "501"
+    suite.advance_fixtures(urls, 1)
+    assert count(urls["small"]) == "3"
+
+    stubs = suite.create_stubs(str(tmp_path))
+    pip = subprocess.run([os.path.join(stubs, "pip"), "show", "requests"], capture_output=True, text=True)
+    assert pip.stdout == "Name: requests\nVersion: 1.0.0\n"
+
+def test_full_run_writes_every_metric(tmp_path, monkeypatch):
+    suite = _suite()
+    # The suite points HOME and PATH at its temporary directory; monkeypatch restores them afterwards
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", os.environ["PATH"])
+    import tool_deployer
+    monkeypatch.setattr(tool_deployer.config, "quiet", True)
+    output = str(tmp_path / "results.json")
+    monkeypatch.setattr(sys, "argv", ["suite.py", "--scales", "1", "--jobs", "2", "--output", output])
+    assert suite.main() == 0
+
+    with open(output) as f:
+        report = json.load(f)
+    metrics = {"install[1]", "list[1]", "update_noop[1]", "update_changed[1]", "verify[1]", "uninstall[1]"}
+    assert metrics <= set(report["results"])
+    assert all(f"clone_repo[{kind}]" in report["results"] for kind in suite.FIXTURES)
+    assert report["meta"]["scales"] == [1]
@@ -0,0 +1,102 @@
+import os
+import sys
+import shutil
+import subprocess
+import importlib.util
+import bytecode
+from bytecode import BytecodeCompiler
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+def _write(root, relative, text):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+def _repo(root):
+    os.makedirs(root)
+    _git('init', '-q', '-b', 'main', cwd=root)
+    _write(root, "tool.py", "import pkg.mod\n")
+    _write(root, "pkg/__init__.py", "")
+    _write(root, "pkg/mod.py", "VALUE = 1\n")
+    _write(root, "tests/test_tool.py", "def test(): pass\n")
+    _write(root, "docs/conf.py", "project = 'tool'\n")
+    _git('add', '-A', cwd=root)
+    _git('commit', '-qm', "v1", cwd=root)
+    return root
+
+def _flags(pyc):
+    with open(pyc, 'rb') as f:
+        return int.from_bytes(f.read(8)[4:8], 'little')
+
+def _cfile(root, relative):
+    return importlib.util.cache_from_source(os.path.join(root, relative))
+
+def test_compile_tool_writes_checked_hash_pycs_for_runtime_code_only(config, tmp_path):
+    repo = _repo(str(tmp_path / "tool"))
+    record = BytecodeCompiler(config).compile_tool(repo)
+    assert record == {'commit': _git('rev-parse', 'HEAD', cwd=repo),
+                      'python': sys.implementation.cache_tag}
+    for relative in ("tool.py", "pkg/__init__.py", "pkg/mod.py"):
+        # Hash-based and checked: survives mtime changes from pulls and clones
+        assert _flags(_cfile(repo, relative)) == 0b11
+    assert not os.path.exists(os.path.join(repo, "tests", "__pycache__"))
+    assert not os.path.exists(os.path.join(repo, "docs", "__pycache__"))
+    assert "Compiled 3 Python files" in config.messages[-1]
+
+def test_new_release_links_unchanged_pycs_and_compiles_only_changed_files(config, tmp_path):
+    compiler = BytecodeCompiler(config)
+    old = _repo(str(tmp_path / "old"))
+    record = compiler.compile_tool(old)
+    new = str(tmp_path / "new")
+    shutil.copytree(old, new, ignore=shutil.ignore_patterns("__pycache__"))
+    _write(new, "pkg/mod.py", "VALUE = 2\n")
+    _git('commit', '-qam', "v2", cwd=new)
+
+    assert compiler.compile_tool(new, record, base=old)['commit'] == _git('rev-parse', 'HEAD', cwd=new)
+    assert os.path.samefile(_cfile(new, "tool.py"), _cfile(old, "tool.py"))
+    assert not os.path.samefile(_cfile(new, "pkg/mod.py"), _cfile(old, "pkg/mod.py"))
+    assert "Compiled 1 Python files" in config.messages[-1] and "reused 2 unchanged" in config.messages[-1]
+
+def test_record_for_another_interpreter_recompiles_everything(config, tmp_path):
+    compiler = BytecodeCompiler(config)
+    repo = _repo(str(tmp_path / "tool"))
+    record = dict(compiler.compile_tool(repo), python="cpython-00")
+    compiler.compile_tool(repo, record, base=repo)
+    assert "Compiled 3 Python files" in config.messages[-1]
+
+def test_syntax_errors_are_reported_without_failing(config, tmp_path):
+    repo = _repo(str(tmp_path / "tool"))
+    _write(repo, "broken.py", "def (\n")
+    assert BytecodeCompiler(config).compile_tool(repo) is not None
+    assert "1 could not be compiled" in config.messages[-1]
+    assert os.path.exists(_cfile(repo, "tool.py"))
+
+def test_nothing_to_compile_or_disabled_returns_none(config, tmp_path, monkeypatch):
+    compiler = BytecodeCompiler(config)
+    empty = str(tmp_path / "scripts")
+    _write(empty, "run.sh", "#!/bin/sh\n")
+    assert compiler.compile_tool(empty) is None
+    repo = _repo(str(tmp_path / "tool"))
+    monkeypatch.setattr(bytecode, 'PRECOMPILE', False)
+    assert compiler.compile_tool(repo) is None
+    assert not os.path.exists(_cfile(repo, "tool.py"))
+
+def test_compile_packages_uses_unchecked_pycs_and_marks_entries(config, tmp_path):
+    entry = str(tmp_path / "store" / "pkg-1.0")
+    module = _write(entry, "site/pkg/__init__.py", "")
+    _write(entry, "site/pkg/_vendor/six.py", "")
+    _write(entry, "site/pkg/tests/test_pkg.py", "")
+    compiler = BytecodeCompiler(config)
+    compiler.compile_packages([entry])
+    assert _flags(importlib.util.cache_from_source(module)) == 0b01
+    assert os.path.exists(_cfile(entry, "site/pkg/_vendor/six.py"))
+    assert not os.path.exists(os.path.join(entry, "site", "pkg", "tests", "__pycache__"))
+    assert os.path.exists(os.path.join(entry, f".bytecode-{sys.implementation.cache_tag}"))
+    printed = len(config.messages)
+    compiler.compile_packages([entry])
+    assert len(config.messages) == printed
@@ -0,0 +1,93 @@
+import sys
+import time
+import asyncio
+import pytest
+from command_runner import CommandRunner, CommandError, backoff_delay
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(0.2)"]
+
+def test_more_commands_than_slots_all_finish():
+    runner = CommandRunner(max_processes=2)
+    start = time.perf_counter()
+    results = runner.run_many([{'argv': SLEEP, 'timeout': 30} for _ in range(3)])
+    elapsed = time.perf_counter() - start
+    assert [result.ok for result in results] == [True, True, True]
+    # Two run at once and the third waits for a slot
+    assert 0.4 <= elapsed < 10
+
+def test_cancelled_waiter_gives_its_slot_back():
+    runner = CommandRunner(max_processes=1)
+
+    async def scenario():
+        holder = asyncio.ensure_future(runner.run_async(SLEEP, timeout=30))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(runner.run_async(SLEEP, timeout=30))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        assert (await holder).ok
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        # The slot is free again: this would hang if the cancelled waiter had kept one
+        return await asyncio.wait_for(runner.run_async(SLEEP, timeout=30), 10)
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 20)).ok
+    assert runner._slots.acquire(blocking=False)
+    runner._slots.release()
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+def test_timeouts_kill_the_whole_process_group(tmp_path):
+    marker = tmp_path / "child-survived"
+    # The child outlives its parent's timeout unless the whole group is killed
+    code = (f"import subprocess, sys; subprocess.Popen([sys.executable, '-c', "
+            f"\"import time; time.sleep(1); open({str(marker)!r}, 'w').close()\"]); import time; time.sleep(30)")
+    result = CommandRunner().run(_python(code), timeout=0.5)
+    assert result.timed_out and result.returncode is None and not result.ok
+    assert "timed out after" in result.describe()
+    time.sleep(1.5)
+    assert not marker.exists()
+
+def test_transient_failures_are_retried_with_backoff(tmp_path, monkeypatch):
+    import command_runner
+    delays = []
+    monkeypatch.setattr(command_runner, "backoff_delay", lambda attempt: delays.append(attempt) or 0)
+    counter = tmp_path / "attempts"
+    code = (f"import sys; n = open({str(counter)!r}, 'a+').write('x'); "
+            f"sys.exit(0 if len(open({str(counter)!r}).read()) == 3 else "
+            f"sys.stderr.write('fatal: unable to access: Could not resolve host: github.com\\n') or 128)")
+    result = CommandRunner().run(_python(code), retries=3)
+    assert result.ok and result.attempts == 3 and delays == [1, 2]
+
+def test_permanent_failures_are_not_retried(monkeypatch):
+    import command_runner
+    monkeypatch.setattr(command_runner, "backoff_delay", lambda attempt: 0)
+    code = "import sys; sys.stderr.write('hint: something\\nfatal: repository not found\\nhint: more\\n'); sys.exit(128)"
+    result = CommandRunner().run(_python(code), retries=3)
+    assert result.attempts == 1 and result.returncode == 128
+    assert result.describe().endswith("exited with 128: fatal: repository not found")
+    with pytest.raises(CommandError) as error:
+        CommandRunner().run(_python(code), check=True)
+    assert error.value.result.returncode == 128 and error.value.returncode == 128
+
+def test_arguments_reach_the_program_without_a_shell():
+    argv = _python("import sys; print(sys.argv[1:]); print(sys.stdin.read())") + ["$HOME", "a; rm -rf /", "*"]
+    result = CommandRunner().run(argv, input="from stdin")
+    assert result.stdout == "['$HOME', 'a; rm -rf /', '*']\nfrom stdin\n"
+
+def test_missing_programs_and_streamed_output():
+    missing = CommandRunner().run(["definitely-not-a-real-program-xyz"])
+    assert missing.error and missing.returncode is None and not missing.transient
+    chunks, lines = [], []
+    result = CommandRunner().run(_python("import sys; sys.stdout.write('a' * 3000000); sys.stderr.write('done\\n')"),
+                                 stdout_sink=chunks.append, on_output=lambda stream, line: lines.append((stream, line)))
+    assert result.ok and result.stdout == "" and len(b"".join(chunks)) == 3000000
+    assert lines == [('stderr', "done\n")]
+
+def test_backoff_delays_grow_and_stay_under_the_cap():
+    for attempt in range(1, 10):
+        delay = backoff_delay(attempt, base=1.0, cap=8.0)
+        full = min(8.0, 2 ** (attempt - 1))
+        assert full / 2 <= delay <= full
@@ -0,0 +1,90 @@
+import os
+import hashlib
+from dedupe import Deduplicator, hash_file
+
+SIZE = 4096
+
+def _write(root, relative, data):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def _deduplicator(config, tmp_path):
+    return Deduplicator(config, str(tmp_path / "cache" / "dedupe.db"), mode='hardlink', min_size=SIZE)
+
+def test_hash_file_matches_sha256(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    assert hash_file(_write(str(tmp_path), "blob", data)) == hashlib.sha256(data).hexdigest()
+
+def test_identical_files_are_linked_and_only_same_sized_files_hashed(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    shared = os.urandom(SIZE * 2)
+    first = _write(a, "lib/data.bin", shared)
+    second = _write(b, "data.bin", shared)
+    other = _write(b, "other.bin", os.urandom(SIZE * 2)[:-1] + b"x")
+    unique = _write(b, "unique.bin", os.urandom(SIZE * 3))
+    small = [_write(root, "small.bin", b"tiny") for root in (a, b)]
+
+    report = _deduplicator(config, tmp_path).run([a, b])
+    assert os.path.samefile(first, second)
+    assert not os.path.samefile(first, other) and os.stat(unique).st_nlink == 1
+    assert not os.path.samefile(*small)
+    assert (report.scanned, report.hashed, report.linked, report.reclaimed) == (4, 3, 1, SIZE * 2)
+    assert not report.errors
+
+def test_second_run_reuses_the_index_instead_of_hashing(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    data = os.urandom(SIZE)
+    _write(a, "data.bin", data)
+    changed = _write(b, "data.bin", data)
+    deduplicator = _deduplicator(config, tmp_path)
+    deduplicator.run([a, b])
+    assert deduplicator.run([a, b]).hashed == 0
+    # A file replaced by an update no longer matches its indexed inode, so only it is read again
+    os.replace(_write(b, "new.tmp", os.urandom(SIZE)), changed)
+    report = deduplicator.run([a, b])
+    assert report.hashed == 1 and report.linked == 0
+    assert os.stat(changed).st_nlink == 1
+
+def test_dry_run_reports_without_linking_or_indexing(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    data = os.urandom(SIZE)
+    paths = [_write(root, "data.bin", data) for root in (a, b)]
+    deduplicator = _deduplicator(config, tmp_path)
+    report = deduplicator.run([a, b], dry_run=True)
+    assert report.linked == 1 and report.reclaimed == SIZE
+    assert not os.path.samefile(*paths)
+    assert deduplicator._load_index() == {}
+
+def test_partial_run_links_against_files_indexed_in_other_tools(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    data = os.urandom(SIZE)
+    existing = _write(a, "data.bin", data)
+    deduplicator = _deduplicator(config, tmp_path)
+    deduplicator.run([a])
+    installed = _write(b, "copy.bin", data)
+    report = deduplicator.run([b], full=False)
+    assert os.path.samefile(existing, installed)
+    assert report.scanned == 1 and report.linked == 1
+    # The partial run keeps the other tool's entries in the index
+    assert set(deduplicator._load_index()) == {existing, installed}
+
+def test_repository_internals_and_mutable_files_are_left_alone(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    data = os.urandom(SIZE)
+    paths = [_write(root, ".git/objects/pack.bin", data) for root in (a, b)]
+    databases = [_write(root, "state.sqlite", data) for root in (a, b)]
+    report = _deduplicator(config, tmp_path).run([a, b])
+    assert report.scanned == 0
+    assert not os.path.samefile(*paths) and not os.path.samefile(*databases)
+
+def test_files_with_different_modes_are_not_merged(config, tmp_path):
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    data = os.urandom(SIZE)
+    script, plain = _write(a, "run", data), _write(b, "run", data)
+    os.chmod(script, 0o755)
+    os.chmod(plain, 0o644)
+    report = _deduplicator(config, tmp_path).run([a, b])
+    assert report.hashed == 0 and not os.path.samefile(script, plain)
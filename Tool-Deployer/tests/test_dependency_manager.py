@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import pytest
+from command_runner import runner
+from dependency_manager import DependencyManager
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+class SleepingVenvs:
+    """Stands in for the venv manager: its pip step hangs until it is killed"""
+
+    def __init__(self):
+        self.result = None
+
+    def python_path(self, venv_dir):
+        return sys.executable
+
+    def install_requirements(self, tool_dir, venv_dir, on_start=None):
+        self.result = runner.run(SLEEP, on_start=on_start, timeout=60)
+        return self.result.ok
+
+def _manager(config, command, venvs=None, venv_dir=None, name='failing'):
+    manager = DependencyManager(config, venvs=venvs, venv_dir=venv_dir)
+    # A second runtime, so it is installed next to pip rather than after it
+    manager.package_managers[name] = {'files': [], 'fingerprint_files': [], 'runtime': name, 'install_cmd': command}
+    return manager
+
+def test_a_failing_manager_cancels_the_venv_install(tmp_path, config):
+    venvs = SleepingVenvs()
+    manager = _manager(config, [sys.executable, "-c", "import sys, time; time.sleep(0.5); sys.exit(3)"],
+                       venvs=venvs, venv_dir=str(tmp_path / "venv"))
+    start = time.monotonic()
+    success, fingerprints = manager.install_changed(str(tmp_path), ['pip', 'failing'])
+    assert time.monotonic() - start < 10
+    assert not success and fingerprints == {}
+    assert venvs.result.returncode is not None and venvs.result.returncode < 0
+    assert any(message.startswith("pip: cancelled") for message in config.messages)
+    assert any(message.startswith("failing: failed") for message in config.messages)
+
+def test_a_failing_manager_cancels_the_running_installer(tmp_path, config):
+    manager = _manager(config, SLEEP)
+    manager.package_managers['quick'] = {'files': [], 'fingerprint_files': [], 'runtime': 'quick',
+                                         'install_cmd': [sys.executable, "-c", "import sys; sys.exit(1)"]}
+    start = time.monotonic()
+    success, _ = manager.install_changed(str(tmp_path), ['failing', 'quick'])
+    assert time.monotonic() - start < 10
+    assert not success
+    assert any(message.startswith("failing: cancelled") for message in config.messages)
+
+def _distribution(site_packages, name, version):
+    info = os.path.join(site_packages, f"{name}-{version}.dist-info")
+    os.makedirs(info)
+    with open(os.path.join(info, "METADATA"), 'w') as f:
+        f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+
+@pytest.fixture
+def venv_python(tmp_path):
+    """A virtualenv layout with two distributions, without a real interpreter"""
+    site_packages = tmp_path / "venv" / "lib" / "python3.11" / "site-packages"
+    site_packages.mkdir(parents=True)
+    _distribution(str(site_packages), "Foo_Bar", "1.2.0")
+    _distribution(str(site_packages), "requests", "2.31.0")
+    python = tmp_path / "venv" / "bin" / "python"
+    python.parent.mkdir()
+    python.write_text("")
+    return str(python), str(site_packages)
+
+def test_pip_versions_are_read_without_starting_pip(venv_python, tmp_path, config, monkeypatch):
+    python, _ = venv_python
+    monkeypatch.setattr(runner, "run", lambda *args, **kwargs: pytest.fail("started a process"))
+    manager = DependencyManager(config, python=python)
+    assert manager.installed_pip_packages() == {"foo-bar": "1.2.0", "requests": "2.31.0"}
+    assert manager.check_package_version('pip', "foo.bar") == "1.2.0"
+    assert manager.check_package_version('pip', "missing") is None
+
+    (tmp_path / "requirements.txt").write_text("foo-bar>=1.0\nrequests==2.0 ; python_version >= '3'\n"
+                                               "missing\nold; python_version < '3'\n")
+    assert manager.verify_dependencies(str(tmp_path)) == {'pip': [("foo-bar", ">=1.0", True),
+                                                                  ("requests", "==2.0", False)]}
+
+def test_pip_snapshot_is_rebuilt_when_site_packages_changes(venv_python, config):
+    python, site_packages = venv_python
+    manager = DependencyManager(config, python=python)
+    first = manager.installed_pip_packages()
+    assert DependencyManager(config, python=python).installed_pip_packages() is first
+
+    _distribution(site_packages, "rich", "13.0.0")
+    stat = os.stat(site_packages)
+    os.utime(site_packages, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert manager.installed_pip_packages()["rich"] == "13.0.0"
+
+@pytest.mark.parametrize("current, required, manager, expected", [
+    ("1.2.0", ">=1.0,<2", 'pip', True),
+    ("2.0.0rc1", ">=2.0.0rc1", 'pip', True),
+    ("1.2.0", "1.3", 'pip', False),
+    ("1.2.0", "", 'pip', True),
+    ("4.17.21", "^4.17.0", 'npm', True),
+    ("5.0.0", "^4.17.0", 'npm', False),
+    ("1.0.0", "github:owner/repo", 'yarn', True),
+])
+def test_version_comparison(config, current, required, manager, expected):
+    assert DependencyManager(config).compare_versions(current, required, manager) is expected
+
+def test_installs_are_skipped_while_the_dependency_files_are_unchanged(tmp_path, config):
+    manager = _manager(config, [sys.executable, "-c", "open('installs', 'a').write('x')"], name='counting')
+    manager.package_managers['counting'].update({'files': ['deps.txt'], 'fingerprint_files': ['deps.txt']})
+    (tmp_path / "deps.txt").write_text("one\n")
+    installs = lambda: len((tmp_path / "installs").read_text())
+
+    success, recorded = manager.install_changed(str(tmp_path), ['counting'])
+    assert success and installs() == 1
+    assert manager.install_changed(str(tmp_path), ['counting'], recorded) == (True, recorded)
+    assert installs() == 1
+    assert manager.install_changed(str(tmp_path), ['counting'], recorded, force=True)[0] and installs() == 2
+
+    (tmp_path / "deps.txt").write_text("two\n")
+    success, changed = manager.install_changed(str(tmp_path), ['counting'], recorded)
+    assert success and installs() == 3 and changed != recorded
+
+def test_only_the_shared_python_environment_outlives_a_checkout(home, config):
+    from tool_manager import ToolManager
+    tool_manager = ToolManager(config)
+    info = {'deps': {'pip': "a", 'npm': "b"}}
+    assert tool_manager.reusable_fingerprints(info, venv=False) == {'pip': "a"}
+    assert tool_manager.reusable_fingerprints(info, venv=True) == {}
+    assert tool_manager.reusable_fingerprints(None, venv=False) == {}
+
+def test_runtimes_install_side_by_side_with_prefixed_output(tmp_path, config):
+    manager = DependencyManager(config)
+    manager.package_managers = {}
+    for name, runtime in (('first', 'a'), ('second', 'b'), ('third', 'a')):
+        # Each installer records when it ran, so overlaps show which ones ran together
+        script = (f"import time; start = time.time(); time.sleep(0.5); print('{name} done'); "
+                  f"open('{name}', 'w').write(f'{{start}} {{time.time()}}')")
+        manager.package_managers[name] = {'files': [], 'fingerprint_files': [], 'runtime': runtime,
+                                          'install_cmd': [sys.executable, "-c", script]}
+    success, fingerprints = manager.install_changed(str(tmp_path), ['first', 'second', 'third'])
+    assert success and sorted(fingerprints) == ['first', 'second', 'third']
+
+    spans = {name: [float(value) for value in (tmp_path / name).read_text().split()] for name in fingerprints}
+    overlap = lambda a, b: spans[a][0] < spans[b][1] and spans[b][0] < spans[a][1]
+    assert overlap('first', 'second') or overlap('third', 'second')
+    # Managers of one runtime share its install location, so they run in order
+    assert spans['first'][1] <= spans['third'][0]
+    for name in fingerprints:
+        assert f"[{name}] {name} done" in config.messages
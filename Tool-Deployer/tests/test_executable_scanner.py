@@ -0,0 +1,60 @@
+import os
+from executable_scanner import scan_executables
+from tool_deployer import select_executable
+
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+
+def _release(tmp_path):
+    """A tool deployed as releases/<commit>, with a generic entry point next to the named one"""
+    release = tmp_path / "recon-kit" / "releases" / COMMIT
+    release.mkdir(parents=True)
+    for name in ("main.py", "recon_kit.py", "helpers.py"):
+        (release / name).write_text("#!/usr/bin/env python3\nprint('hi')\n")
+    return str(release)
+
+def test_tool_name_wins_in_a_release_directory(tmp_path):
+    release = _release(tmp_path)
+    best = scan_executables(release, tool_name="recon-kit")[0][1]
+    assert os.path.basename(best) == "recon_kit.py"
+    # The directory name is the commit, so without the tool name the generic main.py wins
+    assert os.path.basename(scan_executables(release)[0][1]) == "main.py"
+
+def test_non_interactive_install_picks_the_named_entry_point(tmp_path):
+    release = _release(tmp_path)
+    assert os.path.basename(select_executable(release, tool_name="recon-kit")) == "recon_kit.py"
+
+def _write(root, path, content="#!/bin/sh\n"):
+    full = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'w') as f:
+        f.write(content)
+    return full
+
+def test_declared_entry_points_rank_first(tmp_path):
+    root = str(tmp_path / "tool")
+    cli = _write(root, "src/pkg/cli.py", "def main():\n    pass\n")
+    _write(root, "pyproject.toml", '[project]\nname = "pkg"\n\n[project.scripts]\npkg = "pkg.cli:main"\n')
+    server = _write(root, "server.js", "console.log(1)\n")
+    _write(root, "package.json", '{"bin": {"serve": "./server.js"}}')
+    _write(root, "tool.py")
+    assert [path for _, path in scan_executables(root)[:2]] == [cli, server]
+
+def test_heavy_and_unrelated_files_are_skipped(tmp_path):
+    root = str(tmp_path / "tool")
+    for path in ("node_modules/dep/cli.js", "tests/run.py", ".git/hooks/pre-commit", "docs/build.sh",
+                 "setup.py", "__init__.py", "data.txt"):
+        _write(root, path)
+    _write(root, "README", "Usage: tool.py\n")
+    scripts = [_write(root, "tool.py"), _write(root, "bin/helper"), _write(root, "lib/deep/inner/util.sh")]
+    os.chmod(scripts[1], 0o755)
+    assert sorted(path for _, path in scan_executables(root)) == sorted(scripts)
+    # Entry points in bin/ keep their score, deeper scripts lose some per level
+    scores = {path: score for score, path in scan_executables(root)}
+    assert scores[scripts[1]] > scores[scripts[2]]
+
+def test_scan_stops_after_max_entries(tmp_path):
+    root = str(tmp_path / "tool")
+    for index in range(30):
+        _write(root, f"script{index:02}.sh")
+    assert len(scan_executables(root, max_entries=10)) == 10
+    assert len(scan_executables(root, max_depth=0)) == 30
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import pytest
+from git_utils import clone_commands, rewrite_url, make_clone_options, update_commands
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+@pytest.fixture
+def git_env(monkeypatch, tmp_path):
+    # Submodules cloned over the file transport need this since git 2.38.1
+    monkeypatch.setenv('GIT_CONFIG_COUNT', '1')
+    monkeypatch.setenv('GIT_CONFIG_KEY_0', 'protocol.file.allow')
+    monkeypatch.setenv('GIT_CONFIG_VALUE_0', 'always')
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+def _repo(path, files):
+    os.makedirs(path)
+    _git('init', '-q', '-b', 'main', cwd=path)
+    for name, content in files.items():
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(content)
+    _git('add', '.', cwd=path)
+    _git('commit', '-qm', 'initial', cwd=path)
+
+def test_mirror_rewrite_does_not_capture_submodules_sharing_the_prefix(tmp_path, git_env):
+    upstream = tmp_path / "upstream"
+    core, tool = str(upstream / "tool-core.git"), str(upstream / "tool")
+    _repo(core, {"core.txt": "core"})
+    _repo(tool, {"tool.py": "print('tool')\n"})
+    _git('submodule', 'add', '-q', f"file://{core}", 'core', cwd=tool)
+    _git('commit', '-qm', 'add core', cwd=tool)
+    mirror = str(tmp_path / "mirror.git")
+    _git('clone', '-q', '--mirror', tool, mirror)
+
+    # The tool's URL is a prefix of its submodule's URL
+    checkout = str(tmp_path / "checkout")
+    options = make_clone_options(submodules=True, submodule_jobs=2)
+    for command in rewrite_url(clone_commands(f"file://{tool}", checkout, options), f"file://{tool}", mirror):
+        subprocess.run(command, check=True, capture_output=True)
+    assert open(os.path.join(checkout, "core", "core.txt")).read() == "core"
+    assert _git('remote', 'get-url', 'origin', cwd=checkout) == f"file://{tool}"
+
+def test_submodule_commands_are_not_rewritten():
+    commands = clone_commands("https://example.invalid/tool", "/tmp/tool", make_clone_options(depth=1, submodules=True))
+    rewritten = rewrite_url(commands, "https://example.invalid/tool", "/cache/mirror.git")
+    assert not any('--recurse-submodules' in command for command in commands)
+    assert rewritten[0][1:3] == ['-c', 'url./cache/mirror.git.insteadOf=https://example.invalid/tool']
+    assert rewritten[-1] == commands[-1] and 'submodule' in commands[-1] and commands[-1][-2:] == ['--depth', '1']
+
+def _run(commands):
+    for command in commands:
+        subprocess.run(command, check=True, capture_output=True)
+
+@pytest.fixture
+def history(tmp_path, git_env):
+    """A repository with three commits touching src/ and docs/"""
+    repo = str(tmp_path / "history")
+    _repo(repo, {"README": "one"})
+    shas = [_git('rev-parse', 'HEAD', cwd=repo)]
+    for index in (2, 3):
+        for folder in ("src", "docs"):
+            os.makedirs(os.path.join(repo, folder), exist_ok=True)
+            with open(os.path.join(repo, folder, f"{index}.txt"), 'w') as f:
+                f.write(str(index))
+        _git('add', '.', cwd=repo)
+        _git('commit', '-qm', str(index), cwd=repo)
+        shas.append(_git('rev-parse', 'HEAD', cwd=repo))
+    return repo, shas
+
+def test_shallow_clone_keeps_only_the_requested_depth(tmp_path, history):
+    repo, shas = history
+    checkout = str(tmp_path / "shallow")
+    _run(clone_commands(f"file://{repo}", checkout, make_clone_options(depth=1)))
+    assert _git('rev-list', '--count', 'HEAD', cwd=checkout) == "1"
+    assert _git('rev-parse', 'HEAD', cwd=checkout) == shas[-1]
+
+def test_shallow_clone_of_a_commit_fetches_that_commit(tmp_path, history):
+    repo, shas = history
+    checkout = str(tmp_path / "pinned")
+    _run(clone_commands(f"file://{repo}", checkout, make_clone_options(depth=1), ref=shas[1]))
+    assert _git('rev-parse', 'HEAD', cwd=checkout) == shas[1]
+
+def test_sparse_clone_checks_out_only_the_listed_paths(tmp_path, history):
+    repo, _ = history
+    checkout = str(tmp_path / "sparse")
+    _run(clone_commands(f"file://{repo}", checkout, make_clone_options(filter_spec="blob:none", sparse=["/src/"])))
+    assert os.path.isfile(os.path.join(checkout, "src", "3.txt"))
+    assert not os.path.exists(os.path.join(checkout, "docs"))
+    assert _git('config', 'remote.origin.partialclonefilter', cwd=checkout) == "blob:none"
+
+def test_updates_of_shallow_clones_fetch_at_the_recorded_depth(tmp_path, history):
+    repo, _ = history
+    checkout = str(tmp_path / "shallow")
+    options = make_clone_options(depth=1)
+    _run(clone_commands(f"file://{repo}", checkout, options, ref="main"))
+    with open(os.path.join(repo, "README"), 'w') as f:
+        f.write("four")
+    _git('commit', '-qam', '4', cwd=repo)
+    for command in update_commands(options):
+        subprocess.run(command, cwd=checkout, check=True, capture_output=True)
+    assert _git('rev-parse', 'HEAD', cwd=checkout) == _git('rev-parse', 'HEAD', cwd=repo)
+    assert _git('rev-list', '--count', 'HEAD', cwd=checkout) == "1"
+    assert update_commands() == [['git', 'pull']]
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import py_compile
+
+from integrity import IntegrityChecker
+
+
+def _tree(root):
+    os.makedirs(root)
+    for name in ("compiled.py", "plain.py"):
+        with open(os.path.join(root, name), "w") as f:
+            f.write(f"NAME = {name!r}\n")
+    py_compile.compile(os.path.join(root, "compiled.py"), doraise=True,
+                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+
+
+def _verify(checker, root, full=False):
+    (report,) = checker.verify({"tool": root}, full=full)
+    return report
+
+
+def test_unchanged_tree_verifies(tmp_path, config):
+    root = str(tmp_path / "tool")
+    _tree(root)
+    checker = IntegrityChecker(config, str(tmp_path / "integrity.db"), jobs=2)
+    recorded = checker.record("tool", root, root)
+
+    report = _verify(checker, root)
+    assert report.state == "ok"
+    assert report.manifest == recorded.manifest
+    assert report.hashed == 0
+
+
+def test_pycs_written_at_runtime_are_not_added_files(tmp_path, config):
+    root = str(tmp_path / "tool")
+    _tree(root)
+    checker = IntegrityChecker(config, str(tmp_path / "integrity.db"))
+    checker.record("tool", root, root)
+
+    # plain.py was not precompiled, so importing it writes a new pyc
+    subprocess.run([sys.executable, "-c", "import compiled, plain"], cwd=root, check=True,
+                   env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""})
+    assert any(name.startswith("plain.") for name in os.listdir(os.path.join(root, "__pycache__")))
+
+    report = _verify(checker, root)
+    assert report.state == "ok", report
+
+
+def test_edits_removals_and_tampered_pycs_are_reported(tmp_path, config):
+    root = str(tmp_path / "tool")
+    _tree(root)
+    checker = IntegrityChecker(config, str(tmp_path / "integrity.db"))
+    checker.record("tool", root, root)
+    pyc = next(os.path.join("__pycache__", name) for name in os.listdir(os.path.join(root, "__pycache__")))
+
+    with open(os.path.join(root, "plain.py"), "a") as f:
+        f.write("EXTRA = 1\n")
+    with open(os.path.join(root, pyc), "ab") as f:
+        f.write(b"\0")
+    os.remove(os.path.join(root, "compiled.py"))
+    with open(os.path.join(root, "dropped.sh"), "w") as f:
+        f.write("#!/bin/sh\n")
+    os.chmod(os.path.join(root, "dropped.sh"), 0o755)
+
+    report = _verify(checker, root)
+    assert report.state == "changed"
+    assert report.modified == sorted(["plain.py", pyc])
+    assert report.removed == ["compiled.py"]
+    assert report.added == ["dropped.sh"]
+
+
+def test_mode_change_is_a_modification(tmp_path, config):
+    root = str(tmp_path / "tool")
+    _tree(root)
+    checker = IntegrityChecker(config, str(tmp_path / "integrity.db"))
+    checker.record("tool", root, root)
+
+    os.chmod(os.path.join(root, "plain.py"), 0o755)
+    assert _verify(checker, root).modified == ["plain.py"]
+
+
+def test_unrecorded_and_forgotten_tools(tmp_path, config):
+    root = str(tmp_path / "tool")
+    _tree(root)
+    checker = IntegrityChecker(config, str(tmp_path / "integrity.db"))
+    assert _verify(checker, root).state == "unrecorded"
+
+    checker.record("tool", root, root)
+    checker.forget("tool")
+    assert _verify(checker, root).state == "unrecorded"
@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+import pytest
+from command_runner import CommandError
+from mirror_cache import MirrorCache, parse_size, format_size
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+def _commit(repo, name, content="x"):
+    with open(os.path.join(repo, name), 'w') as f:
+        f.write(content)
+    _git('add', '.', cwd=repo)
+    _git('commit', '-qm', name, cwd=repo)
+    return _git('rev-parse', 'HEAD', cwd=repo)
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = str(tmp_path / "origin")
+    os.makedirs(repo)
+    _git('init', '-q', '-b', 'main', cwd=repo)
+    _commit(repo, "tool.py")
+    return repo
+
+@pytest.fixture
+def cache(tmp_path, config):
+    return MirrorCache(config, str(tmp_path / "mirrors"), max_size=parse_size("1G"))
+
+def test_sync_creates_then_fetches_into_the_mirror(cache, origin):
+    mirror = cache.sync(origin)
+    assert mirror == cache.mirror_path(origin)
+    assert _git('rev-parse', 'main', cwd=mirror) == _git('rev-parse', 'HEAD', cwd=origin)
+    head = _commit(origin, "more.py")
+    assert cache.sync(origin) == mirror
+    assert _git('rev-parse', 'main', cwd=mirror) == head
+
+def test_failed_fetch_is_not_served_from_the_stale_mirror(cache, origin):
+    cache.sync(origin)
+    shutil.rmtree(origin)
+    with pytest.raises(CommandError):
+        cache.sync(origin)
+
+def test_eviction_uses_sizes_recorded_at_sync(cache, origin, monkeypatch):
+    cache.sync(origin)
+    walks = []
+    measure = cache._directory_size
+    monkeypatch.setattr(cache, '_directory_size', lambda path: walks.append(path) or measure(path))
+    assert cache.evict() == []
+    assert [size for _, size, _ in cache.entries()] == [measure(cache.mirror_path(origin))]
+    assert walks == []
+
+def test_least_recently_used_unleased_mirrors_are_evicted(tmp_path, cache, origin):
+    other = str(tmp_path / "other")
+    shutil.copytree(origin, other)
+    first, second = cache.sync(origin), cache.sync(other)
+    os.utime(first, (1, 1))
+    with cache.lease(origin):
+        # The least recently used mirror is in use, so the other one goes
+        assert [path for path, _ in cache.evict(max_size=0)] == [second]
+    assert [path for path, _ in cache.evict(max_size=0)] == [first]
+    assert cache.entries() == []
+    assert cache._load_sizes() == {}
+
+def test_size_parsing_and_formatting():
+    assert parse_size("10G") == 10 * 1024 ** 3
+    assert parse_size("500mb") == 500 * 1024 ** 2
+    assert parse_size("1024") == 1024
+    assert format_size(512) == "512 B"
+    assert format_size(3 * 1024 ** 2) == "3.0 MiB"
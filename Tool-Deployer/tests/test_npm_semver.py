@@ -0,0 +1,73 @@
+import pytest
+from npm_semver import satisfies, parse_version
+
+@pytest.mark.parametrize("version, spec, expected", [
+    ("1.2.3", "^1.2.0", True),
+    ("2.0.0", "^1.2.0", False),
+    ("0.2.5", "^0.2.3", True),
+    ("0.3.0", "^0.2.3", False),
+    ("0.0.4", "^0.0.3", False),
+    ("1.2.9", "~1.2.3", True),
+    ("1.3.0", "~1.2.3", False),
+    ("1.9.0", "~1", True),
+    ("1.4.0", "1.x", True),
+    ("2.0.0", "1.x", False),
+    ("5.0.0", "*", True),
+    ("5.0.0", "", True),
+    ("1.2.3", "=1.2.3", True),
+    ("1.2.3", "v1.2.3", True),
+    ("1.2.3", ">= 1.2", True),
+    ("1.1.9", ">=1.2", False),
+    ("1.3.0", ">1.2", True),
+    ("1.2.9", ">1.2", False),
+    ("1.2.9", "<=1.2", True),
+    ("1.3.0", "<=1.2", False),
+    ("1.2.3", ">=1.0.0 <1.2.3", False),
+])
+def test_ranges(version, spec, expected):
+    assert satisfies(version, spec) is expected
+
+@pytest.mark.parametrize("version, spec, expected", [
+    ("1.5.0", "1.2.3 - 2.3.4", True),
+    ("2.3.4", "1.2.3 - 2.3.4", True),
+    ("2.3.5", "1.2.3 - 2.3.4", False),
+    ("2.3.9", "1.2.3 - 2.3", True),
+    ("2.4.0", "1.2.3 - 2.3", False),
+    ("1.2.2", "1.2.3 - 2", False),
+])
+def test_hyphen_ranges(version, spec, expected):
+    assert satisfies(version, spec) is expected
+
+@pytest.mark.parametrize("version, spec, expected", [
+    ("1.0.0", "^1.0.0 || ^3.0.0", True),
+    ("3.1.0", "^1.0.0 || ^3.0.0", True),
+    ("2.0.0", "^1.0.0 || ^3.0.0", False),
+    ("0.9.0", "<1.0.0 || >=2.0.0", True),
+])
+def test_alternatives(version, spec, expected):
+    assert satisfies(version, spec) is expected
+
+@pytest.mark.parametrize("version, spec, expected", [
+    # Prereleases only match ranges naming a prerelease of the same version
+    ("1.2.3-beta.2", "^1.2.3-beta.1", True),
+    ("1.2.3-alpha", "^1.2.3-beta.1", False),
+    ("1.3.0-beta.1", "^1.2.3-beta.1", False),
+    ("1.3.0-beta.1", "^1.2.0", False),
+    ("2.0.0-rc.1", "<2.0.0", False),
+    ("1.2.3", "^1.2.3-beta.1", True),
+])
+def test_prereleases(version, spec, expected):
+    assert satisfies(version, spec) is expected
+
+def test_prerelease_ordering():
+    assert parse_version("1.0.0-alpha") < parse_version("1.0.0-alpha.1") < parse_version("1.0.0-beta")
+    assert parse_version("1.0.0-beta.2") < parse_version("1.0.0-beta.11") < parse_version("1.0.0")
+
+@pytest.mark.parametrize("version, spec", [
+    ("1.0.0", "latest"),
+    ("1.0.0", "file:../local"),
+    ("1.0.0", "git+https://github.com/owner/repo.git"),
+    ("not-a-version", "^1.0.0"),
+])
+def test_non_semver_is_unknown(version, spec):
+    assert satisfies(version, spec) is None
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from profiler import Profiler, command_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.span("clone", url="x") as fields:
+        fields['status'] = "ok"
+    profiler.record("git clone", "subprocess", 0.0)
+    assert profiler.summary() == []
+
+def test_spans_are_tagged_with_their_tool_across_threads(tmp_path):
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span("deploy alpha", "tool", tool="alpha") as fields:
+        with profiler.span("clone"):
+            pass
+        tool = profiler.current_tool()
+
+        def helper():
+            with profiler.bind_tool(tool), profiler.span("install pip"):
+                pass
+        thread = threading.Thread(target=helper, name="installer")
+        thread.start()
+        thread.join()
+        fields['status'] = "installed"
+    with profiler.span("ensure_path"):
+        pass
+
+    path = str(tmp_path / "trace.json")
+    profiler.write(path)
+    with open(path) as f:
+        trace = json.load(f)
+    spans = {event['name']: event for event in trace['traceEvents'] if event['ph'] == "X"}
+    assert {name: event['args'].get('tool') for name, event in spans.items()} == {
+        "deploy alpha": "alpha", "clone": "alpha", "install pip": "alpha", "ensure_path": None}
+    assert spans["deploy alpha"]['args']['status'] == "installed"
+    assert spans["install pip"]['tid'] != spans["clone"]['tid']
+    names = {event['args']['name'] for event in trace['traceEvents'] if event['ph'] == "M"}
+    assert "installer" in names
+    assert {(row[0], row[1], row[2]) for row in profiler.summary()} == {
+        ("tool", "deploy alpha", 1), ("phase", "clone", 1), ("phase", "install pip", 1), ("phase", "ensure_path", 1)}
+
+@pytest.mark.parametrize("command, name", [
+    (['git', '-C', '/tmp/tool', 'fetch', '--depth', '1', 'origin'], "git fetch"),
+    (['git', '-c', 'url.a.insteadOf=b', 'clone', 'b', '/tmp/x'], "git clone"),
+    (['/usr/bin/python3', '-m', 'pip', 'install', '-r', 'requirements.txt'], "pip install"),
+    (['/usr/bin/python3', '/opt/tool/setup.py'], "python3"),
+    ("npm install --no-audit", "npm install"),
+    ([], "subprocess"),
+])
+def test_command_names(command, name):
+    assert command_name(command) == name
+
+def test_profile_option_writes_a_trace_of_an_install(tmp_path):
+    repo = tmp_path / "origin" / "alpha"
+    repo.mkdir(parents=True)
+    (repo / "alpha.py").write_text("#!/usr/bin/env python3\n")
+    git = ['git', '-c', 'user.name=t', '-c', 'user.email=t@t']
+    subprocess.run(git + ['init', '-q', '-b', 'main'], cwd=repo, check=True)
+    subprocess.run(git + ['add', '.'], cwd=repo, check=True)
+    subprocess.run(git + ['commit', '-qm', 'init'], cwd=repo, check=True)
+    manifest = tmp_path / "tools.json"
+    manifest.write_text(json.dumps([str(repo)]))
+    trace = tmp_path / "trace.json"
+
+    env = dict(os.environ, HOME=str(tmp_path), TOOL_DEPLOYER_BACKGROUND_GC="0")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "tool_deployer.py"), "--no-banner", "--profile",
+                             str(trace), "install", "--manifest", str(manifest)], env=env, capture_output=True,
+                            text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert f"Profile written to {trace}" in result.stdout
+    events = [event for event in json.loads(trace.read_text())['traceEvents'] if event['ph'] == "X"]
+    deploy = next(event for event in events if event['name'] == "deploy alpha")
+    assert deploy['args']['status'] == "installed"
+    clone = next(event for event in events if event['name'] == "git clone")
+    assert clone['cat'] == "subprocess" and clone['args']['tool'] == "alpha" and clone['args']['exit_code'] == 0
+    assert deploy['ts'] <= clone['ts'] and clone['ts'] + clone['dur'] <= deploy['ts'] + deploy['dur']
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import pytest
+from releases import RELEASES_DIRNAME, INCOMING_PREFIX
+from tool_manager import ToolManager
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+def _commit(repo, version):
+    with open(os.path.join(repo, "tool.py"), 'w') as f:
+        f.write(f"#!/usr/bin/env python3\nprint({version!r})\n")
+    _git('add', '-A', cwd=repo)
+    _git('commit', '-qm', version, cwd=repo)
+    return _git('rev-parse', 'HEAD', cwd=repo)
+
+@pytest.fixture
+def tool(deployer, tmp_path):
+    """A tool installed from a local repository at v1"""
+    repo = str(tmp_path / "origin" / "tool")
+    os.makedirs(repo)
+    _git('init', '-q', '-b', 'main', cwd=repo)
+    _commit(repo, "v1")
+    tool_manager = ToolManager(deployer.config)
+    assert deployer.deploy_tool(tool_manager, {'url': repo, 'name': "tool"}, use_cache=False)[0] == "installed"
+    return tool_manager, repo
+
+def _run(tool_manager):
+    return subprocess.run([os.path.join(tool_manager.bin_dir, "tool")], capture_output=True, text=True).stdout.strip()
+
+def _releases(tool_manager):
+    return sorted(os.listdir(os.path.join(tool_manager.install_dir, "tool", RELEASES_DIRNAME)))
+
+def test_updates_switch_releases_and_rollback_switches_back(tool):
+    tool_manager, repo = tool
+    v2 = _commit(repo, "v2")
+    assert tool_manager.update_tool("tool", use_cache=False)
+    assert _run(tool_manager) == "v2" and tool_manager.get_tool("tool")['commit'] == v2
+    assert len(_releases(tool_manager)) == 2
+
+    assert tool_manager.rollback("tool")
+    assert _run(tool_manager) == "v1"
+    assert not tool_manager.rollback("tool")
+    # A prefix of the release id selects it
+    assert tool_manager.rollback("tool", v2[:8])
+    assert _run(tool_manager) == "v2"
+
+def test_update_switches_back_to_a_kept_release_without_cloning(tool, monkeypatch):
+    tool_manager, repo = tool
+    _commit(repo, "v2")
+    tool_manager.update_tool("tool", use_cache=False)
+    tool_manager.rollback("tool")
+    monkeypatch.setattr(tool_manager.releases, "incoming", lambda root: pytest.fail("cloned a kept release"))
+    assert tool_manager.update_tool("tool", use_cache=False)
+    assert _run(tool_manager) == "v2"
+
+def test_old_releases_are_pruned(tool, monkeypatch):
+    tool_manager, repo = tool
+    monkeypatch.setattr(tool_manager.releases, "keep", 2)
+    commits = []
+    for index in range(2, 5):
+        commits.append(_commit(repo, f"v{index}"))
+        assert tool_manager.update_tool("tool", use_cache=False)
+    assert _releases(tool_manager) == sorted(commits[-2:])
+    assert [entry['id'] for entry in tool_manager.get_tool("tool")['releases']] == commits[-2:]
+
+def test_failed_update_leaves_the_active_release_serving(tool):
+    tool_manager, repo = tool
+    before = _releases(tool_manager)
+    # Without an entry point the new release cannot be prepared
+    os.remove(os.path.join(repo, "tool.py"))
+    with open(os.path.join(repo, "README"), 'w') as f:
+        f.write("gone\n")
+    _git('add', '-A', cwd=repo)
+    _git('commit', '-qm', 'remove the tool', cwd=repo)
+    assert not tool_manager.update_tool("tool", use_cache=False)
+    assert _run(tool_manager) == "v1"
+    assert _releases(tool_manager) == before
+
+def test_install_that_cannot_be_linked_is_rolled_back(deployer, tool):
+    tool_manager, repo = tool
+    _commit(repo, "v2")
+    # A directory in the way of the ~/bin link makes linking fail after activation
+    blocked = os.path.join(tool_manager.bin_dir, "other")
+    os.makedirs(os.path.join(blocked, "keep"))
+    status, message = deployer.deploy_tool(tool_manager, {'url': repo, 'name': "other"}, use_cache=False)
+    assert (status, message) == ("failed", "could not create symlink")
+    assert not os.path.exists(os.path.join(tool_manager.install_dir, "other", "current"))
+    assert tool_manager.get_tool("other") is None
+
+    os.rename(os.path.join(tool_manager.bin_dir, "tool"), os.path.join(tool_manager.bin_dir, "tool.old"))
+    os.makedirs(os.path.join(tool_manager.bin_dir, "tool", "keep"))
+    status, _ = deployer.deploy_tool(tool_manager, {'url': repo, 'name': "tool"}, reinstall=True, use_cache=False)
+    assert status == "failed"
+    root = os.path.join(tool_manager.install_dir, "tool")
+    assert tool_manager.releases.active(root) == tool_manager.get_tool("tool")['releases'][-1]['id']
+    assert not any(name.startswith(INCOMING_PREFIX) for name in _releases(tool_manager))
+    assert len(_releases(tool_manager)) == 1
@@ -0,0 +1,64 @@
+import pytest
+from requirements_index import RequirementEntry, parse_requirements, read_requirements, find_conflict
+
+def test_parse_requirements_follows_pip_file_format():
+    parsed = parse_requirements(
+        "# tools\n"
+        "Requests[socks]>=2.28 ; python_version >= '3.6'  # http\n"
+        "numpy==1.26.* \\\n"
+        "    --hash=sha256:abc\n"
+        "\n"
+        "-r common.txt\n"
+        "--requirement=extra.txt\n"
+        "-c constraints.txt\n"
+        "-e .\n"
+        "--index-url https://example.invalid/simple\n"
+        "pkg @ https://example.invalid/pkg.tar.gz#sha256=abc\n"
+        "not a requirement!\n"
+    )
+    requirements = {entry['name']: entry for entry in parsed['requirements']}
+    assert sorted(requirements) == ['numpy', 'pkg', 'requests']
+    assert requirements['requests']['specifier'] == '>=2.28'
+    assert requirements['requests']['extras'] == ['socks']
+    assert requirements['requests']['marker'] == 'python_version >= "3.6"'
+    assert requirements['requests']['line'] == 2
+    assert requirements['numpy']['specifier'] == '==1.26.*'
+    assert requirements['numpy']['line'] == 3
+    assert requirements['pkg']['url'] == 'https://example.invalid/pkg.tar.gz#sha256=abc'
+    assert parsed['includes'] == ['common.txt', 'extra.txt']
+    assert [error['line'] for error in parsed['errors']] == [12]
+
+def test_read_requirements_follows_includes_once(tmp_path):
+    (tmp_path / "requirements.txt").write_text("-r base.txt\nrich\n")
+    (tmp_path / "base.txt").write_text("-r requirements.txt\nclick>=8\n")
+    names = [entry['name'] for entry in read_requirements(str(tmp_path / "requirements.txt"))]
+    assert sorted(names) == ['click', 'rich']
+
+def _entries(*specifiers, url=None):
+    return [RequirementEntry(tool=f"tool{index}", name="pkg", requirement=f"pkg{specifier}", specifier=specifier, url=url)
+            for index, specifier in enumerate(specifiers)]
+
+@pytest.mark.parametrize("specifiers", [
+    (">=1.0", "<2.0"),
+    ("==1.4.*", ">=1.4.2"),
+    ("~=2.1", "!=2.3"),
+    (">=1.0", ""),
+    ("==1.0", "==1.0.0"),
+])
+def test_compatible_requirements(specifiers):
+    assert find_conflict(_entries(*specifiers)) is None
+
+@pytest.mark.parametrize("specifiers", [
+    ("<1.0", ">=2.0"),
+    ("==1.4.*", "==1.5.*"),
+    ("==2.0", "!=2.0"),
+    (">1.0", "<=1.0"),
+    ("===foo", "===bar"),
+])
+def test_conflicting_requirements(specifiers):
+    assert find_conflict(_entries(*specifiers))
+
+def test_different_urls_conflict():
+    entries = _entries("", "")
+    entries[0].url, entries[1].url = "https://a.invalid/pkg.whl", "https://b.invalid/pkg.whl"
+    assert find_conflict(entries).startswith("different URLs")
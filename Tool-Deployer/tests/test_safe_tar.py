@@ -0,0 +1,125 @@
+import io
+import os
+import json
+import tarfile
+import pytest
+from archive import ArchiveSource
+from bundle import ToolBundle, METADATA_FILE, BUNDLE_FORMAT
+from safe_tar import safe_parts
+
+def _add(tar, name, kind="file", data=b"", linkname=""):
+    info = tarfile.TarInfo(name)
+    info.mode = 0o755 if kind == "dir" else 0o644
+    if kind == "dir":
+        info.type = tarfile.DIRTYPE
+    elif kind == "sym":
+        info.type, info.linkname = tarfile.SYMTYPE, linkname
+    elif kind == "lnk":
+        info.type, info.linkname = tarfile.LNKTYPE, linkname
+    else:
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+        return
+    tar.addfile(info)
+
+@pytest.fixture(params=["data_filter", "fallback"])
+def checks(request, monkeypatch):
+    """Run every case with tarfile's data filter and with only the extractor's own checks"""
+    if request.param == "fallback":
+        monkeypatch.delattr(tarfile, "data_filter", raising=False)
+    elif not hasattr(tarfile, "data_filter"):
+        pytest.skip("tarfile has no data filter")
+    return request.param
+
+def _unpack_bundle(tmp_path, members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        _add(tar, METADATA_FILE, data=json.dumps({"format": BUNDLE_FORMAT, "tools": {"t": {}}}).encode())
+        for name, kind, arg in members:
+            _add(tar, name, kind, **({"data": arg} if kind == "file" else {"linkname": arg}))
+    buffer.seek(0)
+    staging = tmp_path / "stage" / "bundle"
+    ToolBundle(None, None).unpack(buffer, str(staging))
+    return staging / "t" / "files"
+
+def _fetch_archive(tmp_path, members, config):
+    path = tmp_path / "snapshot.tar.gz"
+    with tarfile.open(str(path), mode="w:gz") as tar:
+        _add(tar, "repo-main", "dir")
+        for name, kind, arg in members:
+            _add(tar, f"repo-main/{name}", kind, **({"data": arg} if kind == "file" else {"linkname": arg}))
+    destination = tmp_path / "stage" / "archive"
+    ArchiveSource(config, path.as_uri()).fetch("https://github.com/owner/repo.git", str(destination))
+    return destination
+
+@pytest.fixture(params=["bundle", "archive"])
+def extract(request, tmp_path, config, checks):
+    """Extract (name, kind, data or link) members below a tool root with either format"""
+    if request.param == "bundle":
+        return lambda members: _unpack_bundle(tmp_path, [(f"tools/t/files/{name}", kind,
+                                                          f"tools/t/files/{arg}" if kind == "lnk" else arg)
+                                                         for name, kind, arg in members])
+    return lambda members: _fetch_archive(tmp_path, [(name, kind, f"repo-main/{arg}" if kind == "lnk" else arg)
+                                                     for name, kind, arg in members], config)
+
+def _escaped(tmp_path):
+    return sorted(path.name for path in tmp_path.iterdir() if path.name not in ("stage", "snapshot.tar.gz"))
+
+def test_regular_tree(extract, tmp_path):
+    root = extract([
+        ("bin/tool", "sym", "../lib/tool.py"),
+        ("lib/tool.py", "file", b"print('tool')\n"),
+        ("lib/copy.py", "lnk", "lib/tool.py"),
+        ("lib/self", "sym", "."),
+    ])
+    assert os.readlink(str(root / "bin" / "tool")) == "../lib/tool.py"
+    assert (root / "bin" / "tool").read_bytes() == b"print('tool')\n"
+    assert (root / "lib" / "copy.py").read_bytes() == b"print('tool')\n"
+    assert not (root / "lib" / "copy.py").is_symlink()
+
+@pytest.mark.parametrize("members", [
+    # A chain of relative links, each harmless as text
+    [("s/deeper/x", "sym", ".."), ("e", "sym", "s/deeper/x/../../../escaped"), ("e/pwned", "file", b"x")],
+    [("sub/deeper/x", "sym", ".."), ("e", "sym", "sub/deeper/x/../../../../etc/passwd")],
+    # A link whose '..' only climbs out once a later member turns 'a' into a link
+    [("e", "sym", "a/../../escaped"), ("a", "sym", ".")],
+    [("e", "sym", "a/../x"), ("a", "sym", "."), ("e/pwned", "file", b"x")],
+    [("out", "sym", "../.."), ("out/pwned", "file", b"x")],
+    [("abs", "sym", "/etc"), ("abs/pwned", "file", b"x")],
+    # Replacing a link that later members resolved through
+    [("d", "sym", "inner"), ("d", "sym", "../..")],
+])
+def test_links_cannot_lead_outside(extract, tmp_path, members):
+    with pytest.raises(ValueError):
+        extract(members)
+    assert _escaped(tmp_path) == []
+
+@pytest.mark.parametrize("name", ["../escaped", "a/../../escaped"])
+def test_member_names_cannot_leave(extract, tmp_path, name):
+    with pytest.raises(ValueError):
+        extract([(name, "file", b"x")])
+    assert _escaped(tmp_path) == []
+
+@pytest.mark.parametrize("name", ["/etc/passwd", "\\server\\share", "C:/Windows", "a/../b", ".."])
+def test_unsafe_member_names(name):
+    with pytest.raises(ValueError):
+        safe_parts(name)
+
+def test_member_names_are_normalized():
+    assert safe_parts("./repo-main//lib/./tool.py") == ["repo-main", "lib", "tool.py"]
+
+def test_hardlinks_cannot_copy_through_symlinks(extract, tmp_path):
+    secret = tmp_path / "secret"
+    secret.write_text("secret")
+    with pytest.raises(ValueError):
+        extract([("ln", "sym", "f"), ("f", "file", b"f"), ("h", "lnk", "ln")])
+    with pytest.raises(ValueError):
+        extract([("dir", "sym", "."), ("h", "lnk", "dir/../secret")])
+
+def test_bundle_hardlinks_stay_within_their_tool(tmp_path, checks):
+    with pytest.raises(ValueError):
+        _unpack_bundle(tmp_path, [
+            ("tools/u/files/secret", "file", b"secret"),
+            ("tools/t/files/copy", "lnk", "tools/u/files/secret"),
+        ])
+    assert not (tmp_path / "stage" / "bundle" / "t" / "files" / "copy").exists()
@@ -0,0 +1,66 @@
+import os
+import threading
+import pytest
+from status import StatusChecker
+
+FAST, SLOW, STALE = "a" * 40, "b" * 40, "c" * 40
+
+class FakeToolManager:
+    """Three tools: one pinned, and two following branches whose upstream lookups finish at different times"""
+
+    def __init__(self, root):
+        self.cache_dir = os.path.join(root, ".cache")
+        self.bin_dir = os.path.join(root, "bin")
+        self.tools = []
+        for name, branch, commit in (("pinned", None, STALE), ("fast", "main", FAST), ("slow", "main", STALE)):
+            path = os.path.join(root, name)
+            os.makedirs(path)
+            self.tools.append({'name': name, 'path': path, 'url': f"https://example.com/{name}.git",
+                               'branch': branch, 'commit': commit, 'executable': None, 'deps': {}})
+        self.release_slow = threading.Event()
+        self.lookups = 0
+
+    def list_tools(self):
+        return self.tools
+
+    def remote_heads(self, infos, on_head=None):
+        self.lookups += 1
+        assert sorted(infos) == ["fast", "slow"]
+        on_head("fast", FAST)
+        assert self.release_slow.wait(10), "the slow lookup was never released"
+        on_head("slow", SLOW)
+        return {"fast": FAST, "slow": SLOW}
+
+@pytest.fixture
+def manager(tmp_path):
+    return FakeToolManager(str(tmp_path))
+
+def test_results_stream_before_the_slowest_lookup(manager, config):
+    streamed = []
+
+    def on_result(result):
+        streamed.append(result['name'])
+        # The slow repository only answers once everything else has been reported
+        if {"pinned", "fast"} <= set(streamed):
+            manager.release_slow.set()
+
+    results = StatusChecker(config, manager, jobs=4).run(on_result=on_result)
+    assert streamed[-1] == "slow"
+    assert sorted(streamed) == ["fast", "pinned", "slow"]
+    upstream = {result['name']: result['upstream'] for result in results}
+    assert upstream == {"pinned": "pinned", "fast": "current", "slow": "behind"}
+    assert [result['remote'] for result in results if result['name'] != "pinned"] == [FAST, SLOW]
+
+def test_upstream_heads_are_reused_from_the_cache(manager, config):
+    manager.release_slow.set()
+    StatusChecker(config, manager).run()
+    results = StatusChecker(config, manager).run()
+    assert manager.lookups == 1
+    assert all(result['cached'] for result in results)
+    assert {result['name']: result.get('remote') for result in results} == {"pinned": None, "fast": FAST, "slow": SLOW}
+
+def test_offline_skips_the_lookup(manager, config):
+    results = StatusChecker(config, manager, remote=False).run()
+    assert manager.lookups == 0
+    assert {result['name']: result['upstream'] for result in results} == {
+        "pinned": "pinned", "fast": "unchecked", "slow": "unchecked"}
@@ -0,0 +1,54 @@
+import json
+import pytest
+from tool_registry import ToolRegistry, MigrationError
+
+def _registry(tmp_path, legacy, warnings=None):
+    legacy_file = tmp_path / ".tools.json"
+    if legacy is not None:
+        legacy_file.write_text(legacy if isinstance(legacy, str) else json.dumps(legacy))
+    warn = warnings.append if warnings is not None else None
+    return ToolRegistry(str(tmp_path / ".tools.db"), legacy_file=str(legacy_file), warn=warn), legacy_file
+
+def test_migrates_legacy_json_once(tmp_path):
+    registry, legacy_file = _registry(tmp_path, {
+        "alpha": {"path": "/tools/alpha", "url": "https://github.com/o/alpha.git", "deps": {"pip": "abc"}},
+        "beta": {"path": "/tools/beta", "executable": "/tools/beta/run.py"},
+    })
+    assert sorted(registry.all()) == ["alpha", "beta"]
+    assert registry.get("alpha")["deps"] == {"pip": "abc"}
+    assert not legacy_file.exists()
+    assert (tmp_path / ".tools.json.migrated").exists()
+
+    # A new legacy file appearing later is not imported a second time
+    legacy_file.write_text(json.dumps({"gamma": {"path": "/tools/gamma"}}))
+    again, _ = _registry(tmp_path, None)
+    assert sorted(again.all()) == ["alpha", "beta"]
+
+@pytest.mark.parametrize("content", ['{"alpha": {"path": "/tools/al', '', '["alpha"]'])
+def test_unreadable_legacy_file_is_left_in_place(tmp_path, content):
+    registry, legacy_file = _registry(tmp_path, content)
+    with pytest.raises(MigrationError):
+        registry.all()
+    assert legacy_file.read_text() == content
+    assert not (tmp_path / ".tools.json.migrated").exists()
+
+    # Once the file is fixed, the migration runs
+    legacy_file.write_text(json.dumps({"alpha": {"path": "/tools/alpha"}}))
+    fixed, _ = _registry(tmp_path, None)
+    assert list(fixed.all()) == ["alpha"]
+
+def test_entries_without_a_path_are_skipped(tmp_path):
+    warnings = []
+    registry, _ = _registry(tmp_path, {"alpha": {"path": "/tools/alpha"}, "beta": {"url": "u"}, "gamma": None},
+                            warnings)
+    assert list(registry.all()) == ["alpha"]
+    assert len(warnings) == 2 and "beta" in warnings[0] and "gamma" in warnings[1]
+
+def test_update_and_delete(tmp_path):
+    registry, _ = _registry(tmp_path, None)
+    registry.put("alpha", {"path": "/tools/alpha", "commit": "a"})
+    assert registry.update("alpha", {"commit": "b"})
+    assert registry.get("alpha") == {"path": "/tools/alpha", "commit": "b"}
+    assert not registry.update("missing", {"commit": "c"})
+    assert registry.delete("alpha")
+    assert not registry.delete("alpha")
@@ -0,0 +1,63 @@
+import os
+import stat
+import pytest
+from trash import Trash, delete_tree
+
+def _tree(root):
+    os.makedirs(os.path.join(root, "a", "b", "c"))
+    for directory in ["", "a", "a/b", "a/b/c"]:
+        with open(os.path.join(root, directory, "file.txt"), "w") as f:
+            f.write(directory)
+
+def test_discard_renames_and_collect_deletes(tmp_path, config):
+    trash = Trash(config, str(tmp_path / ".trash"))
+    tool = str(tmp_path / "tool")
+    _tree(tool)
+    moved = trash.discard(tool)
+    assert not os.path.exists(tool)
+    assert os.path.dirname(moved) == str(tmp_path / ".trash") and os.path.isdir(moved)
+    assert trash.discarded
+
+    removed, errors = trash.collect(jobs=4)
+    assert (removed, errors) == (1, [])
+    assert trash.entries() == []
+
+def test_collect_without_trash(tmp_path, config):
+    assert Trash(config, str(tmp_path / ".trash")).collect() == (0, [])
+
+def test_delete_tree_does_not_follow_symlinks(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("keep")
+    tree = str(tmp_path / "tree")
+    _tree(tree)
+    os.symlink(str(outside), os.path.join(tree, "a", "link"))
+    os.symlink(str(outside / "keep.txt"), os.path.join(tree, "file-link"))
+    delete_tree(tree)
+    assert not os.path.lexists(tree)
+    assert (outside / "keep.txt").read_text() == "keep"
+
+def test_delete_tree_handles_read_only_files_and_missing_paths(tmp_path):
+    tree = str(tmp_path / "tree")
+    _tree(tree)
+    read_only = os.path.join(tree, "a", "file.txt")
+    os.chmod(read_only, stat.S_IREAD)
+    delete_tree(tree)
+    assert not os.path.lexists(tree)
+    # Another collector may already have deleted it
+    delete_tree(tree)
+
+@pytest.mark.skipif(os.name != 'posix' or os.geteuid() == 0, reason="needs directory permissions to apply")
+def test_delete_tree_reports_failures(tmp_path):
+    tree = str(tmp_path / "tree")
+    _tree(tree)
+    locked = os.path.join(tree, "a")
+    os.chmod(locked, stat.S_IREAD | stat.S_IEXEC)
+    try:
+        errors = []
+        delete_tree(tree, errors)
+        assert errors
+        with pytest.raises(OSError):
+            delete_tree(tree)
+    finally:
+        os.chmod(locked, stat.S_IRWXU)
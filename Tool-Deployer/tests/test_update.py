@@ -0,0 +1,66 @@
+import os
+import subprocess
+import pytest
+from command_runner import runner
+from tool_manager import ToolManager
+
+def _git(*args, cwd=None):
+    return subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@t', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+def _commit(repo, message):
+    with open(os.path.join(repo, "tool.py"), 'w') as f:
+        f.write(f"#!/usr/bin/env python3\nprint({message!r})\n")
+    _git('add', '.', cwd=repo)
+    _git('commit', '-qm', message, cwd=repo)
+    return _git('rev-parse', 'HEAD', cwd=repo)
+
+@pytest.fixture
+def installed(deployer, tmp_path):
+    """Three installed tools: two following main and one pinned to a commit"""
+    tool_manager = ToolManager(deployer.config)
+    origins = {}
+    for name in ("moving", "still", "pinned"):
+        repo = str(tmp_path / "origin" / name)
+        os.makedirs(repo)
+        _git('init', '-q', '-b', 'main', cwd=repo)
+        commit = _commit(repo, "v1")
+        origins[name] = repo
+        spec = {'url': repo, 'name': name, 'executable': "tool.py", 'ref': commit if name == "pinned" else None}
+        assert deployer.deploy_tool(tool_manager, spec, use_cache=False)[0] == "installed"
+    return tool_manager, origins
+
+def test_only_tools_whose_upstream_moved_are_fetched(installed, monkeypatch):
+    tool_manager, origins = installed
+    head = _commit(origins["moving"], "v2")
+    _commit(origins["pinned"], "v2")
+    commands = []
+    run = runner.run
+
+    def recording_run(argv, **options):
+        commands.append(list(argv))
+        return run(argv, **options)
+    monkeypatch.setattr(runner, "run", recording_run)
+
+    statuses = tool_manager.update_tools(["moving", "still", "pinned"], jobs=3, use_cache=False)
+    assert statuses == {"moving": "updated", "still": "up-to-date", "pinned": "pinned"}
+    clones = [command for command in commands if 'clone' in command]
+    assert len(clones) == 1 and origins["moving"] in clones[0]
+
+    info = tool_manager.get_tool("moving")
+    assert info['commit'] == head
+    link = os.path.join(tool_manager.bin_dir, "moving")
+    assert subprocess.run([link], capture_output=True, text=True).stdout == "v2\n"
+
+def test_precomputed_remotes_skip_the_ls_remote(installed, monkeypatch):
+    tool_manager, _ = installed
+    monkeypatch.setattr(tool_manager, "remote_head", lambda info: pytest.fail("looked up upstream again"))
+    remotes = {"still": tool_manager.get_tool("still")['commit']}
+    assert tool_manager.update_tools(["still"], use_cache=False, remotes=remotes) == {"still": "up-to-date"}
+
+def test_failures_are_reported_per_tool(installed):
+    tool_manager, origins = installed
+    _commit(origins["moving"], "v2")
+    os.rename(origins["still"], origins["still"] + ".gone")
+    statuses = tool_manager.update_tools(["moving", "still", "unknown"], use_cache=False)
+    assert statuses == {"moving": "updated", "still": "failed", "unknown": "failed"}
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import zipfile
+import pytest
+import bytecode
+from command_runner import runner
+from venv_manager import VenvManager, file_sha256
+
+def _wheel(directory, name, version, module, console_script=None):
+    """A minimal pure-Python wheel holding one module"""
+    path = os.path.join(directory, f"{name}-{version}-py3-none-any.whl")
+    dist_info = f"{name}-{version}.dist-info"
+    with zipfile.ZipFile(path, 'w') as wheel:
+        wheel.writestr(f"{module}.py", f"def main():\n    print('{name} {version}')\n")
+        wheel.writestr(f"{dist_info}/METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+        wheel.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\n")
+        wheel.writestr(f"{dist_info}/RECORD", f"{module}.py,,\n{dist_info}/METADATA,,\n{dist_info}/RECORD,,\n")
+        if console_script:
+            wheel.writestr(f"{dist_info}/entry_points.txt", f"[console_scripts]\n{console_script} = {module}:main\n")
+    return path
+
+@pytest.fixture
+def venvs(tmp_path, config):
+    return VenvManager(config, str(tmp_path / "store"))
+
+def _stored(venvs, wheel):
+    """Put a wheel in the store the way _populate does, and return what resolve would report for it"""
+    key = file_sha256(wheel)
+    os.makedirs(venvs.packages_dir, exist_ok=True)
+    venvs._unpack(wheel, key)
+    name = os.path.basename(wheel).split("-")[0]
+    return {'metadata': {'name': name},
+            'download_info': {'url': f"file://{wheel}", 'archive_info': {'hashes': {'sha256': key}}}}
+
+def test_tools_share_hardlinked_packages_from_the_store(tmp_path, venvs, monkeypatch):
+    item = _stored(venvs, _wheel(str(tmp_path), "greet", "1.0", "greet", console_script="greet"))
+    tools = [str(tmp_path / name) for name in ("one", "two")]
+    for tool in tools:
+        os.makedirs(tool)
+        venvs.create(tool)
+    monkeypatch.setattr(venvs, "resolve", lambda tool_dir, on_start=None: [item])
+    # Everything is in the store already, so nothing is fetched
+    monkeypatch.setattr(runner, "run", lambda *args, **kwargs: pytest.fail("ran pip"))
+    for tool in tools:
+        assert venvs.install_requirements(tool, venvs.venv_path(tool))
+
+    linked = [os.path.join(venvs.site_packages(venvs.venv_path(tool)), "greet.py") for tool in tools]
+    stored = os.path.join(venvs.packages_dir, item['download_info']['archive_info']['hashes']['sha256'],
+                          "site", "greet.py")
+    assert os.stat(linked[0]).st_ino == os.stat(linked[1]).st_ino == os.stat(stored).st_ino
+    script = os.path.join(venvs.bin_path(venvs.venv_path(tools[0])), "greet")
+    monkeypatch.undo()
+    assert subprocess.run([script], capture_output=True, text=True).stdout == "greet 1.0\n"
+
+def test_upgrades_remove_the_files_of_the_old_version(tmp_path, venvs, monkeypatch):
+    old = _stored(venvs, _wheel(str(tmp_path), "greet", "1.0", "greet_old"))
+    new = _stored(venvs, _wheel(str(tmp_path), "greet", "2.0", "greet_new"))
+    monkeypatch.setattr(bytecode, "PRECOMPILE", True)
+    tool = str(tmp_path / "tool")
+    venv = venvs.venv_path(tool)
+    site_packages = venvs.site_packages(venv)
+    for item in (old, new):
+        monkeypatch.setattr(venvs, "resolve", lambda tool_dir, on_start=None, item=item: [item])
+        assert venvs.install_requirements(tool, venv)
+    assert sorted(os.listdir(site_packages)) == ["__pycache__", "greet-2.0.dist-info", "greet_new.py"]
+    assert [name.split(".")[0] for name in os.listdir(os.path.join(site_packages, "__pycache__"))] == ["greet_new"]
+
+def test_store_keys(venvs):
+    wheel = {'download_info': {'url': "https://files/x-1.0-py3-none-any.whl",
+                               'archive_info': {'hashes': {'sha256': "ab"}}}}
+    sdist = {'download_info': {'url': "https://files/x-1.0.tar.gz", 'archive_info': {'hashes': {'sha256': "ab"}}}}
+    assert venvs._store_key(wheel) == "ab"
+    # Wheels built from sdists only fit the interpreter that built them
+    assert venvs._store_key(sdist) == f"ab-{venvs.python_tag}"
+    assert venvs._store_key({'download_info': {'url': "git+https://x", 'vcs_info': {}}}) is None
@@ -0,0 +1,104 @@
+import time
+import pytest
+import watcher
+from watcher import RateBudget, UpdateWatcher, parse_duration
+
+class FakeRegistry:
+    def __init__(self, tools):
+        self.tools = tools
+
+    def all(self):
+        return {name: dict(info) for name, info in self.tools.items()}
+
+    def update(self, name, fields):
+        self.tools[name].update(fields)
+
+class FakeTrash:
+    discarded = False
+
+class FakeToolManager:
+    """Tools on branches of their own repositories, plus one pinned tool; upstream heads are set per tool"""
+
+    def __init__(self, names, shared=()):
+        self.registry = FakeRegistry({
+            name: {'url': f"https://example.com/{'shared' if name in shared else name}.git", 'path': f"/tools/{name}",
+                   'branch': "main", 'commit': "a" * 40} for name in names})
+        self.registry.tools['pinned'] = {'url': "https://example.com/pinned.git", 'path': "/tools/pinned",
+                                         'branch': None, 'commit': "a" * 40}
+        self.trash = FakeTrash()
+        self.heads = {name: "a" * 40 for name in names}
+        self.lookups, self.updates = [], []
+        self.update_status = 'updated'
+
+    def remote_heads(self, infos):
+        self.lookups.append(sorted(infos))
+        return {name: self.heads[name] for name in infos}
+
+    def update_tools(self, names, jobs=4, use_cache=True, remotes=None):
+        self.updates.append(sorted(names))
+        for name in names:
+            if self.update_status == 'updated':
+                self.registry.tools[name]['commit'] = remotes[name]
+        return {name: self.update_status for name in names}
+
+def test_parse_duration():
+    assert [parse_duration(value) for value in ("90", "30m", "6h", "1d", "1.5s")] == [90, 1800, 21600, 86400, 1.5]
+
+def test_budget_refills_at_the_configured_rate():
+    budget = RateBudget(rate=60, burst=5)
+    assert budget.available() == 5
+    budget.charge(7)
+    assert budget.available() == 0
+    assert 2.9 < budget.wait_time() <= 3.0
+    # Ten seconds later ten tokens came back, but the bucket holds at most five
+    budget.updated -= 10
+    assert budget.available() == 5
+
+def test_checks_stay_within_the_budget_and_share_lookups(config):
+    tool_manager = FakeToolManager(["a", "b", "c", "d"], shared=("a", "b"))
+    watch = UpdateWatcher(config, tool_manager, rate=60)
+    tools = watch.watched()
+    assert sorted(tools) == ["a", "b", "c", "d"]
+    watch.check(watch.due(tools, time.time()), tools, allowed=2)
+    # a and b share one repository and so one request; the budget leaves no room for d
+    assert tool_manager.lookups == [["a", "b", "c"]]
+    assert 'watch' not in tool_manager.registry.tools["d"]
+
+def test_intervals_stretch_while_unchanged_and_reset_on_updates(config, monkeypatch):
+    monkeypatch.setattr(watcher.random, "uniform", lambda low, high: 1.0)
+    tool_manager = FakeToolManager(["tool"])
+    watch = UpdateWatcher(config, tool_manager, interval=100, max_interval=200, rate=600)
+    intervals = []
+    for _ in range(3):
+        tools = watch.watched()
+        watch.check(["tool"], tools, allowed=10)
+        intervals.append(tool_manager.registry.tools["tool"]['watch']['interval'])
+    assert intervals == [150, 200, 200] and tool_manager.updates == []
+
+    tool_manager.heads["tool"] = "b" * 40
+    watch.check(["tool"], watch.watched(), allowed=10)
+    state = tool_manager.registry.tools["tool"]['watch']
+    assert tool_manager.updates == [["tool"]] and state['interval'] == 100 and state['remote'] == "b" * 40
+    assert time.time() + 99 < state['next_check'] <= time.time() + 100
+
+def test_failures_back_off_and_the_schedule_survives_a_restart(config, monkeypatch):
+    monkeypatch.setattr(watcher, "backoff_delay", lambda failures, base, cap: base * failures)
+    tool_manager = FakeToolManager(["tool"])
+    tool_manager.heads["tool"] = None
+    watch = UpdateWatcher(config, tool_manager, rate=600)
+    assert watch.run(once=True) == 1
+    state = tool_manager.registry.tools["tool"]['watch']
+    assert state['failures'] == 1 and state['error'] == "could not reach upstream"
+    assert state['next_check'] == pytest.approx(time.time() + watcher.RETRY_BASE, abs=5)
+
+    # A new watcher reads the schedule back, so nothing is due yet
+    restarted = UpdateWatcher(config, tool_manager, rate=600)
+    assert restarted.due(restarted.watched(), time.time()) == []
+    assert restarted.run(once=True) == 0 and len(tool_manager.lookups) == 1
+
+    tool_manager.heads["tool"] = "b" * 40
+    tool_manager.update_status = 'failed'
+    tool_manager.registry.tools["tool"]['watch']['next_check'] = 0
+    assert restarted.run(once=True) == 1
+    state = tool_manager.registry.tools["tool"]['watch']
+    assert state['failures'] == 2 and state['error'] == "update failed"
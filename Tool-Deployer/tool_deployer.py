@@ -1,12 +1,14 @@
-import os, sys, subprocess, re, time, platform
-from tqdm import tqdm
+import os, sys, re, platform, json, shlex, shutil, stat, time
 from colorama import init, Fore, Style
 import argparse
-from dependency_manager import DependencyManager
 from tool_manager import ToolManager
+from tool_registry import MigrationError
+from profiler import profiler
+from command_runner import runner, CommandError, NETWORK_TIMEOUT
 
-# Initialize colorama
-init()
+# Heavier modules (tqdm, dependency_manager, git_utils, executable_scanner, mirror_cache,
+# concurrent.futures) are imported inside the commands that use them, so quick commands
+# such as list, uninstall and --help start fast.
 
 # Define the static ASCII banner
 banner = r"""
@@ -35,6 +37,7 @@ class Config:
         """Create a progress bar if not in quiet mode"""
         if self.quiet:
             return iterable
+        from tqdm import tqdm
         return tqdm(iterable, desc=desc, disable=self.quiet)
 
 # Global configuration
@@ -51,41 +54,97 @@ def show_banner():
 INSTALL_DIR = os.path.expanduser("~/tools")
 BIN_DIR = os.path.expanduser("~/bin")
 
-def run_command(command, cwd=None, check=True, retries=3):
-    """Run a system command with retries for network operations."""
-    for attempt in config.progress(range(retries), desc="Attempting command"):
-        try:
-            subprocess.run(command, shell=True, check=check, cwd=cwd)
-            return  # Command succeeded, exit the loop
-        except subprocess.CalledProcessError as e:
-            config.print(f"Attempt {attempt + 1} failed: {e}", Fore.YELLOW)
-            if attempt < retries - 1:
-                config.print("Retrying...", Fore.YELLOW)
-                time.sleep(2)  # Short delay before retry
-            else:
-                config.print(f"Command failed after {retries} attempts: {command}", Fore.RED)
-                sys.exit(1)
+def run_command(command, cwd=None, check=True, retries=3, timeout=NETWORK_TIMEOUT):
+    """Run a command (an argv list) with retries for transient network failures.
+
+    Returns the CommandResult; with check, a failure raises CommandError instead.
+    """
+    argv = shlex.split(command) if isinstance(command, str) else command
+    result = runner.run(argv, cwd=cwd, retries=retries, timeout=timeout, echo=not config.quiet)
+    if not result.ok:
+        config.print(f"Command failed after {result.attempts} attempt(s): {result.describe()}", Fore.RED)
+        if check:
+            raise CommandError(result)
+    return result
+
+def clone_repo(repo_url, install_dir, clone_options=None, ref=None, mirrors=None, source=None):
+    """Clone a GitHub repository using the requested clone strategy and ref.
+
+    When a MirrorCache is given, the repository is fetched into its local mirror
+    first and cloned from there, so repeated installs only transfer new objects.
+    A source (a local repository or git bundle) replaces the network entirely;
+    the checkout's origin still points at repo_url.
+    """
+    from contextlib import ExitStack
+    from git_utils import clone_commands, rewrite_url
+    commands = clone_commands(repo_url, install_dir, clone_options, ref)
+    # The mirror stays leased until the clone is done, so other workers cannot evict it
+    with ExitStack() as leases:
+        if source:
+            commands = rewrite_url(commands, repo_url, source)
+        elif mirrors:
+            try:
+                with profiler.span("mirror_sync", url=repo_url):
+                    mirror = leases.enter_context(mirrors.lease(repo_url))
+                commands = rewrite_url(commands, repo_url, mirrors.clone_source(mirror, clone_options))
+            except (CommandError, OSError) as e:
+                config.print(f"Mirror cache unavailable, cloning directly: {e}", Fore.YELLOW)
+
+        config.print(f"Cloning repository {repo_url} into {install_dir}...", Fore.CYAN)
+        with profiler.span("clone", url=repo_url):
+            for command in commands:
+                run_command(command)
+
+def download_archive(repo_url, install_dir, ref=None, sha256=None, template=None):
+    """Download a repository snapshot as a tarball instead of cloning it.
+
+    Returns the record ToolManager.install_tool stores for archive installs: the
+    URL template, the tarball's SHA-256 and the commit and branch it came from.
+    """
+    from archive import ArchiveSource
+    source = ArchiveSource(config, template)
+    with profiler.span("resolve_ref", url=repo_url):
+        commit, branch = source.resolve(repo_url, ref)
+    with profiler.span("download", url=repo_url):
+        fetched = source.fetch(repo_url, install_dir, ref, commit, sha256)
+    return {**fetched, 'branch': branch}
+
+def fetch_release(tool_manager, repo_url, install_path, release, spec, mirrors=None):
+    """Fill a new release with a clone, or with a tarball for archive installs, and seal it.
 
-def clone_repo(repo_url, install_dir):
-    """Clone a GitHub repository."""
-    config.print(f"Cloning repository {repo_url} into {install_dir}...", Fore.CYAN)
-    run_command(f"git clone {repo_url} {install_dir}")
+    Returns the sealed release and the archive record (None for clones).
+    """
+    if spec.get("archive"):
+        archive = download_archive(repo_url, release, spec.get("ref"), spec.get("sha256"), spec.get("archive_url"))
+        return tool_manager.releases.seal(install_path, release, archive["commit"] or archive["sha256"]), archive
+    clone_repo(repo_url, release, clone_options=spec.get("clone_options"), ref=spec.get("ref"),
+               mirrors=mirrors, source=spec.get("source"))
+    return tool_manager.releases.seal(install_path, release), None
 
-def handle_dependencies(tool_dir):
-    """Handle dependencies using the DependencyManager"""
-    dep_manager = DependencyManager(config)
+def handle_dependencies(tool_dir, venvs=None, recorded=None, force=False):
+    """Handle dependencies using the DependencyManager.
+
+    When a VenvManager is given, Python dependencies go into the tool's own
+    virtual environment instead of the active interpreter. Managers whose
+    dependency files match the recorded fingerprints are skipped unless forced.
+    Returns the fingerprints to record, or None if an installation failed.
+    """
+    from dependency_manager import DependencyManager
+    venv_dir = venvs.create(tool_dir) if venvs else None
+    dep_manager = DependencyManager(config, venvs=venvs, venv_dir=venv_dir)
     
     # Detect package managers
     managers = dep_manager.detect_package_managers(tool_dir)
     if not managers:
         config.print("No package managers detected.", Fore.YELLOW)
-        return False
+        return {}
     
     config.print(f"Detected package managers: {', '.join(managers)}", Fore.GREEN)
     
     # Verify dependencies
     config.print("Verifying dependencies...", Fore.CYAN)
-    results = dep_manager.verify_dependencies(tool_dir)
+    with profiler.span("verify_dependencies", managers=managers):
+        results = dep_manager.verify_dependencies(tool_dir)
     
     # Display dependency status
     for manager, deps in results.items():
@@ -97,40 +156,37 @@ def handle_dependencies(tool_dir):
                 config.print(f"{status} {package} (required: {required_version})", status_color)
     
     # Install dependencies
-    for manager in managers:
-        if not dep_manager.install_dependencies(tool_dir, manager):
-            config.print(f"Failed to install dependencies using {manager}", Fore.RED)
-            return False
-    
-    return True
+    with profiler.span("install_dependencies", managers=managers):
+        success, fingerprints = dep_manager.install_changed(tool_dir, managers, recorded, force)
+    return fingerprints if success else None
 
-def make_executable(path):
+def make_executable(path, checkout=True):
     """Ensure a file has executable permissions."""
     if not os.access(path, os.X_OK):
         config.print(f"Making {path} executable...", Fore.CYAN)
-        run_command(f"chmod +x {path}")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        # Keep the mode change from showing up as a local edit that blocks later pulls
+        if checkout:
+            runner.run(["git", "-C", os.path.dirname(path), "config", "core.fileMode", "false"])
+
+def precompile(tool_manager, release, previous):
+    """Compile a new checkout to bytecode, reusing the active release's pycs for unchanged files."""
+    base = os.path.realpath(previous["path"]) if previous and os.path.exists(previous["path"]) else None
+    return tool_manager.precompile(release, (previous or {}).get("bytecode"), base)
 
-def detect_executables(tool_dir):
-    """Detect potential executables in the tool directory."""
-    executables = []
+def detect_executables(tool_dir, tool_name=None):
+    """Detect potential executables in the tool directory, best candidates first."""
+    from executable_scanner import scan_executables
     config.print("Scanning for executables...", Fore.CYAN)
-    for root, _, files in config.progress(os.walk(tool_dir), desc="Scanning files"):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if (
-                file.endswith((".py", ".sh", ".js")) and
-                "sample" not in file.lower() and
-                not file.startswith(".git")
-            ):
-                executables.append(file_path)
-    return executables
+    with profiler.span("detect_executables"):
+        return [path for _, path in scan_executables(tool_dir, tool_name=tool_name)]
 
 def ensure_path_in_environment(bin_dir):
     """Ensure the bin directory is in the PATH, adapting for different OSes."""
     system = platform.system()
     if system == "Windows":
         config.print(f"Adding {bin_dir} to PATH on Windows...", Fore.CYAN)
-        run_command(f'setx PATH "%PATH%;{bin_dir}"', check=False)
+        run_command(["setx", "PATH", f"{os.environ.get('PATH', '')};{bin_dir}"], check=False, retries=0)
         config.print(f"\nRestart your terminal to apply the changes.", Fore.YELLOW)
     else:  # For Linux/macOS
         if bin_dir not in os.environ["PATH"].split(":"):
@@ -146,7 +202,7 @@ def create_symlink(executable, symlink_path):
     system = platform.system()
     if system == "Windows":
         config.print(f"Copying {executable} to {symlink_path} on Windows...", Fore.CYAN)
-        run_command(f'copy "{executable}" "{symlink_path}"', check=False)
+        shutil.copy2(executable, symlink_path)
     else:
         config.print(f"Creating symlink for {executable} at {symlink_path}...", Fore.CYAN)
         if os.path.exists(symlink_path):
@@ -154,6 +210,16 @@ def create_symlink(executable, symlink_path):
         os.symlink(executable, symlink_path)
         config.print(f"Symlink created: {symlink_path}", Fore.GREEN)
 
+def default_tool_name(repo_url):
+    """Derive the default tool name from a repository URL."""
+    return repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+
+def link_executable(tool_manager, executable_path, link_path, venv_dir=None):
+    """Expose the executable in the bin directory, through a venv launcher if needed."""
+    if venv_dir:
+        return tool_manager.create_launcher(executable_path, link_path, venv_dir)
+    return tool_manager.create_symlink(executable_path, link_path)
+
 def is_valid_url(url):
     """Validate the GitHub repository URL."""
     return re.match(r'https:\/\/github\.com\/[a-zA-Z0-9_.-]+\/[a-zA-Z0-9_.-]+(\.git)?$', url)
@@ -175,6 +241,10 @@ def parse_arguments(args=None):
     parser.add_argument("-q", "--quiet", action="store_true", help="Run in quiet mode (no output)")
     parser.add_argument("--no-color", action="store_true", help="Disable colored output")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--no-banner", action="store_true",
+                        help="Do not print the banner (it is skipped automatically when output is not a terminal)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Record timing spans and write them as a Chrome/Perfetto trace to FILE")
     
     # Add subcommands
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
@@ -182,22 +252,341 @@ def parse_arguments(args=None):
     # Install command
     install_parser = subparsers.add_parser("install", help="Install a new tool")
     install_parser.add_argument("url", nargs="?", help="GitHub repository URL")
+    install_parser.add_argument("--manifest", help="YAML or JSON file listing tools to install non-interactively")
+    install_parser.add_argument("-j", "--jobs", type=int, default=4, help="Number of tools to install in parallel with --manifest (default: 4)")
+    install_parser.add_argument("--reinstall", action="store_true", help="Reinstall tools from the manifest that are already installed")
+    install_parser.add_argument("--depth", type=int, help="Create a shallow clone with the given history depth (e.g. 1)")
+    install_parser.add_argument("--filter", dest="filter_spec", help="Partial clone filter passed to git (e.g. blob:none)")
+    install_parser.add_argument("--sparse", action="append", metavar="PATH", help="Only check out the given path (repeatable)")
+    install_parser.add_argument("--recurse-submodules", action="store_true", help="Clone submodules as well")
+    install_parser.add_argument("--submodule-jobs", type=int, help="Number of submodules fetched in parallel (default: 4)")
+    install_parser.add_argument("--no-cache", action="store_true", help="Clone directly without using the local mirror cache")
+    install_parser.add_argument("--venv", action="store_true", help="Install Python dependencies into a per-tool virtual environment")
+    install_parser.add_argument("--force-deps", action="store_true", help="Reinstall dependencies even if their manifests are unchanged")
+    install_parser.add_argument("--ref", help="Branch, tag or commit to install (default: the remote HEAD)")
+    install_parser.add_argument("--archive", action="store_true",
+                                help="Download a tarball snapshot over HTTP(S) instead of cloning with git")
+    install_parser.add_argument("--sha256", help="Expected SHA-256 of the tarball with --archive")
+    install_parser.add_argument("--archive-url", metavar="TEMPLATE",
+                                help="Tarball URL template with {owner}, {repo}, {ref} and {commit} "
+                                     "(default: $TOOL_DEPLOYER_ARCHIVE_URL or GitHub's codeload)")
     
     # List command
     subparsers.add_parser("list", help="List installed tools")
     
+    # Status command
+    status_parser = subparsers.add_parser("status", help="Check the health of installed tools")
+    status_parser.add_argument("names", nargs="*", metavar="name", help="Only check these tools (default: all)")
+    status_parser.add_argument("--json", action="store_true", help="Stream one JSON object per tool as checks finish")
+    status_parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of tools checked in parallel (default: 8)")
+    status_parser.add_argument("--refresh", action="store_true", help="Ignore cached results")
+    status_parser.add_argument("--offline", action="store_true", help="Do not look up upstream commits")
+
     # Uninstall command
     uninstall_parser = subparsers.add_parser("uninstall", help="Uninstall a tool")
     uninstall_parser.add_argument("name", help="Name of the tool to uninstall")
     
+    # Rollback command
+    rollback_parser = subparsers.add_parser("rollback", help="Switch a tool back to its previous release")
+    rollback_parser.add_argument("name", help="Name of the tool to roll back")
+    rollback_parser.add_argument("--to", metavar="RELEASE", help="Commit (or prefix) of a kept release to switch to")
+
+    # Gc command
+    gc_parser = subparsers.add_parser("gc", help="Delete uninstalled tool directories left in the trash")
+    gc_parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of subtrees deleted in parallel (default: 8)")
+
     # Update command
     update_parser = subparsers.add_parser("update", help="Update an installed tool")
-    update_parser.add_argument("name", help="Name of the tool to update")
+    update_parser.add_argument("names", nargs="*", metavar="name", help="Name of the tool(s) to update")
+    update_parser.add_argument("--all", action="store_true", help="Update every installed tool")
+    update_parser.add_argument("-j", "--jobs", type=int, default=4, help="Number of tools updated in parallel (default: 4)")
+    update_parser.add_argument("--force", action="store_true", help="Fetch even if the upstream commit has not changed")
+    update_parser.add_argument("--force-deps", action="store_true", help="Reinstall dependencies even if their manifests are unchanged")
+    update_parser.add_argument("--no-cache", action="store_true", help="Fetch directly without using the local mirror cache")
+
+    # Dedupe command
+    dedupe_parser = subparsers.add_parser("dedupe", help="Replace identical files across tools with links to one copy")
+    dedupe_parser.add_argument("names", nargs="*", metavar="name", help="Only deduplicate these tools (default: all)")
+    dedupe_parser.add_argument("--dry-run", action="store_true", help="Report the space that could be reclaimed without linking")
+    dedupe_parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of files hashed in parallel (default: 8)")
+    dedupe_parser.add_argument("--min-size", default="16K", help="Ignore files smaller than this, e.g. 4K or 1M (default: 16K)")
+    dedupe_parser.add_argument("--mode", choices=["auto", "reflink", "hardlink"], default="auto",
+                               help="Link type: reflinks where supported, falling back to hardlinks (default: auto)")
+
+    # Verify-integrity command
+    verify_parser = subparsers.add_parser("verify-integrity",
+                                          help="Check installed tool trees against the file hashes recorded at deploy time")
+    verify_parser.add_argument("names", nargs="*", metavar="name", help="Only check these tools (default: all)")
+    verify_parser.add_argument("--json", action="store_true", help="Print one JSON object per tool with every changed path")
+    verify_parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of files hashed in parallel (default: 8)")
+    verify_parser.add_argument("--full", action="store_true", help="Re-hash every file instead of trusting unchanged stat results")
+    verify_parser.add_argument("--accept", action="store_true",
+                               help="Record the current trees as the new baseline, e.g. after reviewing a change")
+
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Keep installed tools up to date in the foreground")
+    watch_parser.add_argument("names", nargs="*", metavar="name", help="Only watch these tools (default: all)")
+    watch_parser.add_argument("--interval", default="1h",
+                              help="Check interval after a change, e.g. 30m or 2h; it stretches while a tool stays unchanged (default: 1h)")
+    watch_parser.add_argument("--max-interval", default="1d", help="Longest interval between checks of a tool (default: 1d)")
+    watch_parser.add_argument("--rate", type=float, default=30, help="Git requests allowed per minute (default: 30)")
+    watch_parser.add_argument("-j", "--jobs", type=int, default=4, help="Number of tools updated in parallel (default: 4)")
+    watch_parser.add_argument("--once", action="store_true", help="Check the tools that are due and exit, e.g. from cron")
+    watch_parser.add_argument("--no-cache", action="store_true", help="Fetch directly without using the local mirror cache")
+
+    # Cache command
+    cache_parser = subparsers.add_parser("cache", help="Manage the local repository mirror cache")
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command", help="Cache command to execute")
+    prune_parser = cache_subparsers.add_parser("prune", help="Evict least recently used mirrors")
+    prune_parser.add_argument("--max-size", help="Shrink the cache to this size, e.g. 500M or 5G (default: configured limit)")
+    prune_parser.add_argument("--all", action="store_true", help="Remove every cached mirror")
+
+    # Deps command
+    deps_parser = subparsers.add_parser("deps", help="Query Python requirements across installed tools")
+    deps_subparsers = deps_parser.add_subparsers(dest="deps_command", help="Deps command to execute")
+    who_needs_parser = deps_subparsers.add_parser("who-needs", help="List the tools that require a package")
+    who_needs_parser.add_argument("package", help="Package name")
+    deps_subparsers.add_parser("conflicts", help="Report requirements that cannot be met together in the shared environment")
+    merged_parser = deps_subparsers.add_parser("merged", help="Print the merged requirements of tools sharing the environment")
+    merged_parser.add_argument("-o", "--output", help="Write the merged requirements to a file")
+    merged_parser.add_argument("--install", action="store_true", help="Install the merged requirements in one pip run")
+
+    # Bundle command
+    bundle_parser = subparsers.add_parser("bundle", help="Export or import tools for offline deployment")
+    bundle_subparsers = bundle_parser.add_subparsers(dest="bundle_command", help="Bundle command to execute")
+    export_parser = bundle_subparsers.add_parser("export", help="Write installed tools and their dependencies to an archive")
+    export_parser.add_argument("names", nargs="*", metavar="name", help="Name of the tool(s) to export")
+    export_parser.add_argument("--all", action="store_true", help="Export every installed tool")
+    export_parser.add_argument("-o", "--output", required=True, help="Archive to write (.tar or .tar.gz), or - for stdout")
+    import_parser = bundle_subparsers.add_parser("import", help="Install tools from an archive without network access")
+    import_parser.add_argument("archive", help="Archive to read, or - for stdin")
+    import_parser.add_argument("names", nargs="*", metavar="name", help="Only import these tools (default: all)")
+    import_parser.add_argument("-j", "--jobs", type=int, default=4, help="Number of tools installed in parallel (default: 4)")
+    import_parser.add_argument("--reinstall", action="store_true", help="Replace tools that are already installed")
     
     return parser.parse_args(args)
 
+def clone_options_from_args(args):
+    """Build the clone strategy selected on the command line."""
+    from git_utils import make_clone_options
+    return make_clone_options(
+        depth=args.depth,
+        filter_spec=args.filter_spec,
+        sparse=args.sparse,
+        submodules=args.recurse_submodules,
+        submodule_jobs=args.submodule_jobs
+    )
+
+def load_manifest(manifest_path, default_clone_options=None, default_venv=False, default_archive=False,
+                  archive_url=None):
+    """Load tool entries ({url, name, executable, ref}) from a YAML or JSON manifest.
+
+    Entries may also set depth, filter, sparse, submodules, venv, archive,
+    sha256 and archive_url; anything not set falls back to the options given on
+    the command line.
+    """
+    from git_utils import make_clone_options
+    with open(manifest_path, 'r') as f:
+        content = f.read()
+
+    if manifest_path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML manifests. Install it with 'pip install pyyaml'.")
+        data = yaml.safe_load(content)
+    else:
+        data = json.loads(content)
+
+    # Accept either a bare list or a mapping with a 'tools' key
+    if isinstance(data, dict):
+        data = data.get("tools")
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a list of tools or a mapping with a 'tools' list.")
+
+    specs = []
+    seen = set()
+    for idx, entry in enumerate(data, 1):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict) or not entry.get("url"):
+            raise ValueError(f"Manifest entry {idx} is missing a 'url'.")
+        name = entry.get("name") or default_tool_name(entry["url"])
+        if name in seen:
+            raise ValueError(f"Manifest entry {idx} reuses the tool name '{name}'.")
+        seen.add(name)
+        clone_options = dict(default_clone_options or {})
+        clone_options.update(make_clone_options(
+            depth=entry.get("depth"),
+            filter_spec=entry.get("filter"),
+            sparse=entry.get("sparse"),
+            submodules=bool(entry.get("submodules")),
+            submodule_jobs=entry.get("submodule_jobs")
+        ))
+        specs.append({
+            "url": entry["url"],
+            "name": name,
+            "executable": entry.get("executable"),
+            "ref": entry.get("ref"),
+            "clone_options": clone_options,
+            "venv": bool(entry.get("venv", default_venv)),
+            "archive": bool(entry.get("archive", default_archive)),
+            "sha256": entry.get("sha256"),
+            "archive_url": entry.get("archive_url") or archive_url,
+        })
+    return specs
+
+def select_executable(install_path, executable=None, tool_name=None):
+    """Resolve the executable for a non-interactive install.
+
+    An explicit executable is taken relative to the tool directory; otherwise
+    the highest ranked detected candidate is used.
+    """
+    if executable:
+        executable_path = os.path.join(install_path, executable)
+        if not os.path.isfile(executable_path):
+            raise ValueError(f"executable '{executable}' not found in repository")
+        return executable_path
+
+    executables = detect_executables(install_path, tool_name)
+    if not executables:
+        raise ValueError("no executable detected in repository")
+    if len(executables) > 1:
+        config.print(f"Selected {os.path.relpath(executables[0], install_path)} out of {len(executables)} candidates.", Fore.CYAN)
+    return executables[0]
+
+def deploy_tool(tool_manager, spec, reinstall=False, use_cache=True, force_deps=False):
+    """Install a single tool without prompting. Returns a (status, message) tuple."""
+    name = spec["name"]
+    install_path = os.path.join(tool_manager.install_dir, name)
+
+    with profiler.span(f"deploy {name}", "tool", tool=name, url=spec["url"]) as fields:
+        status, message = _deploy_tool(tool_manager, spec, install_path, reinstall, use_cache, force_deps)
+        fields["status"] = status
+    return status, message
+
+def _deploy_tool(tool_manager, spec, install_path, reinstall, use_cache, force_deps):
+    name = spec["name"]
+    layout = tool_manager.releases
+    release = None
+    try:
+        if os.path.exists(install_path):
+            if not reinstall:
+                return "skipped", f"already installed in {install_path}"
+            # Earlier releases stay available for rollback; flat checkouts are replaced
+            if not layout.uses_releases(install_path):
+                tool_manager.trash.discard(install_path)
+
+        release = layout.incoming(install_path)
+        release, archive = fetch_release(tool_manager, spec["url"], install_path, release, spec,
+                                         tool_manager.mirrors if use_cache else None)
+        if spec.get("overlay"):
+            place_overlay(spec["overlay"], release)
+
+        venvs = tool_manager.venvs if spec.get("venv") else None
+        previous = tool_manager.get_tool(name)
+        fingerprints = handle_dependencies(release, venvs, tool_manager.reusable_fingerprints(previous, bool(venvs)),
+                                           force_deps)
+        if fingerprints is None:
+            layout.discard(install_path, release)
+            return "failed", "dependency installation failed"
+
+        executable_path = select_executable(release, spec.get("executable"), name)
+        make_executable(executable_path, checkout=archive is None)
+        bytecode = precompile(tool_manager, release, previous)
+        previous_active = layout.active(install_path)
+        current = layout.activate(install_path, release)
+        relative = os.path.relpath(executable_path, release)
+        executable_path = os.path.join(current, relative)
+        venv_dir = venvs.venv_path(current) if venvs else None
+        symlink_path = os.path.join(tool_manager.bin_dir, name)
+        if not link_executable(tool_manager, executable_path, symlink_path, venv_dir):
+            # The launcher reads the executable through 'current', so the link can only be made after activation
+            layout.deactivate(install_path, release, previous_active)
+            return "failed", "could not create symlink"
+        history = layout.record((previous or {}).get("releases"), os.path.basename(release),
+                                deps=fingerprints, executable=relative, bytecode=bytecode,
+                                sha256=archive["sha256"] if archive else None)
+        tool_manager.install_tool(name, current, executable_path, url=spec["url"],
+                                  ref=spec.get("ref"), clone_options=spec.get("clone_options"),
+                                  venv=venv_dir, deps=fingerprints, bytecode=bytecode, archive=archive,
+                                  releases=layout.prune(install_path, history) if layout.supported else None)
+        return "installed", executable_path
+    except CommandError as e:
+        _discard_failed(layout, install_path, release)
+        return "failed", f"command failed: {e}"
+    except Exception as e:
+        _discard_failed(layout, install_path, release)
+        return "failed", str(e)
+
+def _discard_failed(layout, install_path, release):
+    """Clean up a release that was never activated, so a retry starts from scratch"""
+    if release and os.path.exists(release) and os.path.basename(layout.active(install_path) or "") != os.path.basename(release):
+        layout.discard(install_path, release)
+
+def place_overlay(overlay_dir, install_path):
+    """Move files shipped next to a repository (such as node_modules) into its checkout, merging directories"""
+    if not os.path.isdir(overlay_dir):
+        return
+    for entry in os.listdir(overlay_dir):
+        source = os.path.join(overlay_dir, entry)
+        target = os.path.join(install_path, entry)
+        if os.path.isdir(source) and not os.path.islink(source) and os.path.isdir(target):
+            place_overlay(source, target)
+        else:
+            os.replace(source, target)
+
+def handle_batch_install(args):
+    """Install every tool listed in a manifest using a bounded worker pool"""
+    try:
+        specs = load_manifest(args.manifest, clone_options_from_args(args), args.venv, args.archive, args.archive_url)
+    except (OSError, ValueError) as e:
+        config.print(f"Failed to load manifest {args.manifest}: {e}", Fore.RED)
+        sys.exit(1)
+
+    if not specs:
+        config.print("Manifest does not list any tools.", Fore.YELLOW)
+        return
+
+    if deploy_all(ToolManager(config), specs, args.jobs, args.reinstall, not args.no_cache, args.force_deps):
+        sys.exit(1)
+
+def deploy_all(tool_manager, specs, jobs, reinstall=False, use_cache=True, force_deps=False):
+    """Deploy specs on a bounded worker pool and print a summary; returns the number of failures"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    jobs = max(1, jobs)
+    config.print(f"Installing {len(specs)} tools with {jobs} parallel jobs...", Fore.CYAN)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(deploy_tool, tool_manager, spec, reinstall, use_cache, force_deps): spec["name"]
+            for spec in specs
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    # Print the per-tool summary in manifest order
+    status_colors = {"installed": Fore.GREEN, "skipped": Fore.YELLOW, "failed": Fore.RED}
+    config.print("\nInstallation Summary:", Fore.CYAN)
+    for spec in specs:
+        status, message = results[spec["name"]]
+        config.print(f"  {spec['name']}: {status} ({message})", status_colors[status])
+
+    counts = {status: sum(1 for s, _ in results.values() if s == status) for status in status_colors}
+    config.print(f"\n{counts['installed']} installed, {counts['skipped']} skipped, {counts['failed']} failed.", Fore.CYAN)
+
+    if counts["installed"]:
+        tool_manager.ensure_path_in_environment()
+    tool_manager.trash.collect_in_background()
+    return counts["failed"]
+
 def handle_install(args):
     """Handle the install command"""
+    if args.manifest:
+        handle_batch_install(args)
+        return
+
     # Get GitHub repo URL
     repo_url = args.url
     if not repo_url:
@@ -208,18 +597,18 @@ def handle_install(args):
             config.print("Invalid GitHub URL. Please enter a valid URL, e.g., 'https://github.com/user/repo.git'", Fore.RED)
 
     # Get default tool name from repo URL
-    default_tool_name = repo_url.split("/")[-1].replace(".git", "")
+    default_name = default_tool_name(repo_url)
     
     # Get tool name with empty input using default
     tool_name = get_user_input(
-        f"Enter a name for the tool (default: {default_tool_name}) (or type 'Cancel' to exit):",
+        f"Enter a name for the tool (default: {default_name}) (or type 'Cancel' to exit):",
         allow_cancel=True,
         allow_empty=True  # Allow empty input to use default
     )
     
     # Use default name if input is empty
     if not tool_name:
-        tool_name = default_tool_name
+        tool_name = default_name
         config.print(f"Using default name: {tool_name}", Fore.CYAN)
     
     tool_manager = ToolManager(config)
@@ -231,27 +620,47 @@ def handle_install(args):
         if reinstall != "y":
             config.print("Exiting...", Fore.YELLOW)
             return
-        run_command(f"rm -rf {install_path}")
+        # Earlier releases stay available for rollback; flat checkouts are replaced
+        if not tool_manager.releases.uses_releases(install_path):
+            tool_manager.trash.discard(install_path)
+            tool_manager.trash.collect_in_background()
 
-    # Clone repository
+    # Clone (or download) the repository into a new release next to any active one
+    layout = tool_manager.releases
+    clone_options = clone_options_from_args(args)
+    spec = {"clone_options": clone_options, "ref": args.ref, "archive": args.archive, "sha256": args.sha256,
+            "archive_url": args.archive_url}
+    release = None
     try:
-        clone_repo(repo_url, install_path)
+        release = layout.incoming(install_path)
+        release, archive = fetch_release(tool_manager, repo_url, install_path, release, spec,
+                                         None if args.no_cache else tool_manager.mirrors)
     except Exception as e:
-        config.print(f"Error during cloning: {e}", Fore.RED)
+        config.print(f"Error during {'download' if args.archive else 'cloning'}: {e}", Fore.RED)
+        _discard_failed(layout, install_path, release)
         sys.exit(1)
 
     # Handle dependencies
-    handle_dependencies(install_path)
+    venvs = tool_manager.venvs if args.venv else None
+    previous = tool_manager.get_tool(tool_name)
+    fingerprints = handle_dependencies(release, venvs, tool_manager.reusable_fingerprints(previous, bool(venvs)),
+                                       args.force_deps)
+    if fingerprints is None:
+        config.print(f"Dependency installation failed; {tool_name} was not installed.", Fore.RED)
+        layout.discard(install_path, release)
+        sys.exit(1)
 
     # Detect executables
-    executables = detect_executables(install_path)
+    executables = detect_executables(release, tool_name)
     if executables:
         while True:
             try:
                 config.print("Detected potential executables:", Fore.GREEN)
                 for idx, exe in enumerate(executables, 1):
-                    config.print(f"{idx}. {os.path.basename(exe)}", Fore.CYAN)
-                choice = int(get_user_input("Enter the number of the executable to use (or type 'Cancel' to exit):")) - 1
+                    config.print(f"{idx}. {os.path.relpath(exe, release)}", Fore.CYAN)
+                choice = get_user_input("Enter the number of the executable to use (default: 1) (or type 'Cancel' to exit):",
+                                        allow_empty=True)
+                choice = int(choice or 1) - 1
                 if 0 <= choice < len(executables):
                     executable_path = executables[choice]
                     break
@@ -261,16 +670,30 @@ def handle_install(args):
                 config.print("Invalid choice. Please enter a number corresponding to one of the executables.", Fore.RED)
     else:
         config.print("No executable detected in the repository.", Fore.RED)
+        _discard_failed(layout, install_path, release)
         return
 
     if executable_path:
-        make_executable(executable_path)
+        make_executable(executable_path, checkout=archive is None)
+        bytecode = precompile(tool_manager, release, previous)
+        previous_active = layout.active(install_path)
+        current = layout.activate(install_path, release)
+        relative = os.path.relpath(executable_path, release)
+        executable_path = os.path.join(current, relative)
+        venv_dir = venvs.venv_path(current) if venvs else None
         symlink_path = os.path.join(tool_manager.bin_dir, tool_name)
-        if tool_manager.create_symlink(executable_path, symlink_path):
-            tool_manager.install_tool(tool_name, install_path, executable_path)
+        if link_executable(tool_manager, executable_path, symlink_path, venv_dir):
+            history = layout.record((previous or {}).get("releases"), os.path.basename(release),
+                                    deps=fingerprints, executable=relative, bytecode=bytecode,
+                                    sha256=archive["sha256"] if archive else None)
+            tool_manager.install_tool(tool_name, current, executable_path, url=repo_url, ref=args.ref,
+                                      clone_options=clone_options, venv=venv_dir, deps=fingerprints,
+                                      bytecode=bytecode, archive=archive,
+                                      releases=layout.prune(install_path, history) if layout.supported else None)
             config.print(f"{tool_name} is now installed. You can run it using '{tool_name}' if {tool_manager.bin_dir} is in your PATH.", Fore.GREEN)
         else:
             config.print(f"Failed to create symlink for {tool_name}.", Fore.RED)
+            layout.deactivate(install_path, release, previous_active)
     else:
         config.print(f"No valid executable was selected. {tool_name} is installed in {install_path}.", Fore.YELLOW)
 
@@ -294,44 +717,420 @@ def handle_list():
         config.print(f"  Installed: {tool['installed_at']}", Fore.WHITE)
         config.print(f"  Last Updated: {tool['last_updated']}", Fore.WHITE)
 
+def handle_status(args):
+    """Handle the status command"""
+    from status import StatusChecker
+    tool_manager = ToolManager(config)
+    unknown = [name for name in args.names if not tool_manager.get_tool(name)]
+    if unknown:
+        config.print(f"Not installed: {', '.join(unknown)}", Fore.RED)
+        sys.exit(1)
+    checker = StatusChecker(config, tool_manager, jobs=args.jobs, use_cache=not args.refresh, remote=not args.offline)
+
+    def emit(result):
+        sys.stdout.write(json.dumps(result, sort_keys=True) + "\n")
+        sys.stdout.flush()
+
+    results = checker.run(args.names or None, on_result=emit if args.json else None)
+    if not args.json:
+        if not results:
+            config.print("No tools installed.", Fore.YELLOW)
+            return
+        state_colors = {"ok": Fore.GREEN, "outdated": Fore.CYAN, "dirty": Fore.YELLOW, "drifted": Fore.YELLOW,
+                        "broken": Fore.RED}
+        width = max(len(result["name"]) for result in results) + 2
+        config.print(f"{'Tool':<{width}} {'State':<9} {'Commit':<13} {'Upstream':<12} {'Dirty':>5}  {'Deps':<10} Link",
+                     Fore.CYAN)
+        for result in results:
+            upstream = result["upstream"]
+            if upstream == "behind" and result.get("behind") is not None:
+                upstream = f"behind {result['behind']}"
+            dirty = "-" if result["dirty"] is None else str(result["dirty"])
+            config.print(f"{result['name']:<{width}} {result['state']:<9} {(result['commit'] or '-')[:12]:<13} "
+                         f"{upstream:<12} {dirty:>5}  {','.join(result['drift']) or 'ok':<10} {result['link']}",
+                         state_colors[result["state"]])
+            for problem in result["problems"]:
+                config.print(f"{'':<{width}} {problem}", Fore.RED)
+        counts = {state: sum(result["state"] == state for result in results) for state in state_colors}
+        config.print("\n" + ", ".join(f"{count} {state}" for state, count in counts.items() if count), Fore.CYAN)
+    if any(result["state"] == "broken" for result in results):
+        sys.exit(1)
+
 def handle_uninstall(args):
     """Handle the uninstall command"""
     tool_manager = ToolManager(config)
     if tool_manager.uninstall_tool(args.name):
         config.print(f"Successfully uninstalled {args.name}", Fore.GREEN)
+        tool_manager.trash.collect_in_background()
     else:
         config.print(f"Failed to uninstall {args.name}", Fore.RED)
 
+def handle_rollback(args):
+    """Handle the rollback command"""
+    if not ToolManager(config).rollback(args.name, args.to):
+        sys.exit(1)
+
+def handle_gc(args):
+    """Delete uninstalled and replaced tool directories left in the trash"""
+    trash = ToolManager(config).trash
+    removed, errors = trash.collect(args.jobs)
+    for error in errors[:20]:
+        config.print(f"Could not delete {error}", Fore.RED)
+    if errors:
+        config.print(f"Removed {removed} entries; {len(errors)} files could not be deleted.", Fore.RED)
+        sys.exit(1)
+    config.print(f"Removed {removed} entries from {trash.trash_dir}", Fore.GREEN)
+
 def handle_update(args):
     """Handle the update command"""
     tool_manager = ToolManager(config)
-    if tool_manager.update_tool(args.name):
-        config.print(f"Successfully updated {args.name}", Fore.GREEN)
+    names = [tool['name'] for tool in tool_manager.list_tools()] if args.all else args.names
+    if not names:
+        config.print("Specify the tool(s) to update or use --all.", Fore.YELLOW)
+        return
+
+    if len(names) == 1:
+        if tool_manager.update_tool(names[0], use_cache=not args.no_cache, force=args.force,
+                                    force_deps=args.force_deps):
+            config.print(f"Successfully updated {names[0]}", Fore.GREEN)
+        else:
+            config.print(f"Failed to update {names[0]}", Fore.RED)
+        return
+
+    results = tool_manager.update_tools(names, jobs=args.jobs, use_cache=not args.no_cache, force=args.force,
+                                        force_deps=args.force_deps)
+
+    status_colors = {"updated": Fore.GREEN, "up-to-date": Fore.WHITE, "pinned": Fore.YELLOW, "failed": Fore.RED}
+    config.print("\nUpdate Summary:", Fore.CYAN)
+    for name in names:
+        config.print(f"  {name}: {results[name]}", status_colors[results[name]])
+    counts = {status: list(results.values()).count(status) for status in status_colors}
+    config.print(f"\n{counts['updated']} updated, {counts['up-to-date']} up to date, "
+                 f"{counts['pinned']} pinned, {counts['failed']} failed.", Fore.CYAN)
+    if counts["failed"]:
+        sys.exit(1)
+
+def handle_dedupe(args):
+    """Handle the dedupe command"""
+    from dedupe import Deduplicator
+    from mirror_cache import parse_size, format_size
+    try:
+        min_size = parse_size(args.min_size)
+    except ValueError:
+        config.print(f"Invalid size: {args.min_size}", Fore.RED)
+        sys.exit(1)
+    tool_manager = ToolManager(config)
+    unknown = [name for name in args.names if not tool_manager.get_tool(name)]
+    if unknown:
+        config.print(f"Not installed: {', '.join(unknown)}", Fore.RED)
+        sys.exit(1)
+    roots = tool_manager.dedupe_roots(args.names or None)
+    deduplicator = Deduplicator(config, os.path.join(tool_manager.cache_dir, "dedupe.db"), mode=args.mode,
+                                min_size=max(1, min_size))
+    start = time.perf_counter()
+    report = deduplicator.run(roots, jobs=args.jobs, dry_run=args.dry_run, full=not args.names)
+    for error in report.errors[:20]:
+        config.print(f"Could not process {error}", Fore.YELLOW)
+    config.print(f"Scanned {report.scanned} files ({format_size(report.scanned_bytes)}), hashed {report.hashed} "
+                 f"({format_size(report.hashed_bytes)}) in {time.perf_counter() - start:.1f}s.", Fore.CYAN)
+    verb = "could be linked" if args.dry_run else "linked"
+    config.print(f"{report.linked} duplicate files {verb}, reclaiming {format_size(report.reclaimed)}.", Fore.GREEN)
+
+def handle_verify_integrity(args):
+    """Handle the verify-integrity command"""
+    from dataclasses import asdict
+    from integrity import IntegrityChecker
+    from mirror_cache import format_size
+    tool_manager = ToolManager(config)
+    unknown = [name for name in args.names if not tool_manager.get_tool(name)]
+    if unknown:
+        config.print(f"Not installed: {', '.join(unknown)}", Fore.RED)
+        sys.exit(1)
+    tools = tool_manager.tool_roots(args.names or None)
+    if not tools:
+        config.print("No tools installed.", Fore.YELLOW)
+        return
+    checker = IntegrityChecker(config, tool_manager.integrity_file, jobs=args.jobs)
+    if args.accept:
+        for name, root in sorted(tools.items()):
+            report = checker.record(name, root, root)
+            config.print(f"Recorded {report.files} files of {name} (manifest {report.manifest[:16]})", Fore.GREEN)
+        return
+
+    start = time.perf_counter()
+    reports = sorted(checker.verify(tools, full=args.full), key=lambda report: report.name)
+    if args.json:
+        for report in reports:
+            sys.stdout.write(json.dumps(asdict(report), sort_keys=True) + "\n")
     else:
-        config.print(f"Failed to update {args.name}", Fore.RED)
+        state_colors = {"ok": Fore.GREEN, "changed": Fore.RED, "missing": Fore.RED, "unrecorded": Fore.YELLOW}
+        limit = None if config.verbose else 20
+        for report in reports:
+            if report.state == "unrecorded":
+                summary = "no manifest recorded; run verify-integrity --accept to record one"
+            elif report.state == "ok":
+                summary = f"{report.files} files"
+            else:
+                summary = (f"{len(report.modified)} modified, {len(report.added)} added, "
+                           f"{len(report.removed)} removed")
+            config.print(f"{report.name}: {report.state} ({summary})", state_colors[report.state])
+            for flag, paths in (("M", report.modified), ("A", report.added), ("D", report.removed)):
+                for path in paths[:limit]:
+                    config.print(f"  {flag} {path}", Fore.RED)
+                if limit is not None and len(paths) > limit:
+                    config.print(f"  ... and {len(paths) - limit} more (see --verbose or --json)", Fore.RED)
+        hashed = sum(report.hashed for report in reports)
+        hashed_bytes = sum(report.hashed_bytes for report in reports)
+        config.print(f"\nChecked {sum(report.files for report in reports)} files of {len(reports)} tools, "
+                     f"hashed {hashed} ({format_size(hashed_bytes)}) in {time.perf_counter() - start:.1f}s.", Fore.CYAN)
+    if any(report.state != "ok" for report in reports):
+        sys.exit(1)
 
-def main():
-    # Parse command line arguments
-    args = parse_arguments()
-    config.quiet = args.quiet
-    config.no_color = args.no_color
-    config.verbose = args.verbose
+def handle_watch(args):
+    """Handle the watch command"""
+    from watcher import UpdateWatcher, parse_duration
+    try:
+        interval, max_interval = parse_duration(args.interval), parse_duration(args.max_interval)
+    except ValueError:
+        config.print(f"Invalid interval: {args.interval} / {args.max_interval}", Fore.RED)
+        sys.exit(1)
+    if interval <= 0 or args.rate <= 0:
+        config.print("The interval and rate must be positive.", Fore.RED)
+        sys.exit(1)
+    watcher = UpdateWatcher(config, ToolManager(config), interval=interval, max_interval=max_interval,
+                            rate=args.rate, jobs=args.jobs, use_cache=not args.no_cache, names=args.names)
+    if watcher.run(once=args.once) and args.once:
+        sys.exit(1)
 
-    # Show the fancy banner
-    show_banner()
-    
-    # Handle commands
+def handle_cache(args):
+    """Handle the cache command"""
+    if args.cache_command != "prune":
+        parse_arguments(["cache", "-h"])
+        return
+
+    from mirror_cache import parse_size, format_size
+    tool_manager = ToolManager(config)
+    mirrors = tool_manager.mirrors
+    try:
+        max_size = 0 if args.all else (parse_size(args.max_size) if args.max_size else None)
+    except ValueError:
+        config.print(f"Invalid size: {args.max_size}", Fore.RED)
+        sys.exit(1)
+
+    removed = mirrors.evict(max_size=max_size)
+    for path, size in removed:
+        config.print(f"Removed {os.path.basename(path)} ({format_size(size)})", Fore.CYAN)
+    remaining = sum(size for _, size, _ in mirrors.entries())
+    config.print(f"Pruned {len(removed)} mirrors. Cache size: {format_size(remaining)}", Fore.GREEN)
+
+def handle_deps(args):
+    """Handle the deps command"""
+    if args.deps_command not in ("who-needs", "conflicts", "merged"):
+        parse_arguments(["deps", "-h"])
+        return
+
+    from requirements_index import RequirementsIndex
+    index = RequirementsIndex(config, ToolManager(config)).build()
+
+    if args.deps_command == "who-needs":
+        entries = index.who_needs(args.package)
+        if not entries:
+            config.print(f"No installed tool requires {args.package}.", Fore.YELLOW)
+            return
+        for entry in entries:
+            where = " (venv)" if entry.venv else ""
+            config.print(f"{entry.tool}{where}: {entry.requirement}  [{entry.source}:{entry.line}]")
+        return
+
+    problems = [f"{tool}: {source}:{line}: skipped unparsable requirement ({error})"
+                for tool, source, line, error in index.errors]
+    conflicts = index.conflicts()
+    for name, entries, reason in conflicts:
+        problems.append(f"{name}: {reason}")
+        problems.extend(f"  {entry.tool}: {entry.requirement}  [{entry.source}:{entry.line}]" for entry in entries)
+
+    if args.deps_command == "conflicts":
+        for problem in problems:
+            config.print(problem, Fore.RED if conflicts else Fore.YELLOW)
+        if conflicts:
+            sys.exit(1)
+        config.print(f"No conflicts among {len(index.shared())} shared packages.", Fore.GREEN)
+        return
+
+    # Problems become comments, so the output stays a valid requirements file
+    lines = [f"# {problem}" for problem in problems] + index.merged()
+    if args.output or args.install:
+        output = args.output or os.path.join(ToolManager(config).cache_dir, "merged-requirements.txt")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+        config.print(f"Wrote {len(lines) - len(problems)} requirements to {output}", Fore.GREEN)
+        if conflicts:
+            config.print(f"Left out {len(conflicts)} conflicting packages; see deps conflicts.", Fore.YELLOW)
+    else:
+        for line in lines:
+            print(line)
+    if args.install:
+        try:
+            run_command(["pip", "install", "-r", output])
+        except CommandError:
+            sys.exit(1)
+    if conflicts:
+        sys.exit(1)
+
+def handle_bundle(args):
+    """Handle the bundle command"""
+    if args.bundle_command == "export":
+        handle_bundle_export(args)
+    elif args.bundle_command == "import":
+        handle_bundle_import(args)
+    else:
+        parse_arguments(["bundle", "-h"])
+
+def handle_bundle_export(args):
+    """Stream the selected tools into an archive"""
+    from bundle import ToolBundle, compression_for
+    tool_manager = ToolManager(config)
+    names = [tool['name'] for tool in tool_manager.list_tools()] if args.all else args.names
+    if not names:
+        config.print("Specify tool names or --all.", Fore.RED)
+        sys.exit(1)
+
+    to_stdout = args.output == "-"
+    if to_stdout:
+        # Keep progress messages out of the archive
+        config.quiet = True
+    try:
+        if to_stdout:
+            exported = ToolBundle(config, tool_manager).export(names, sys.stdout.buffer)
+        else:
+            with open(args.output, "wb") as f:
+                exported = ToolBundle(config, tool_manager).export(names, f, compression_for(args.output))
+    except (CommandError, OSError) as e:
+        config.print(f"Export failed: {e}", Fore.RED)
+        sys.exit(1)
+    if not to_stdout:
+        config.print(f"Exported {len(exported)} tools to {args.output}", Fore.GREEN)
+
+def handle_bundle_import(args):
+    """Install tools from an archive using only its contents"""
+    from bundle import ToolBundle
+    tool_manager = ToolManager(config)
+    staging_dir = os.path.join(tool_manager.cache_dir, f"import-{os.getpid()}")
+    os.makedirs(staging_dir, exist_ok=True)
+    try:
+        try:
+            if args.archive == "-":
+                metadata = ToolBundle(config, tool_manager).unpack(sys.stdin.buffer, staging_dir)
+            else:
+                with open(args.archive, "rb") as f:
+                    metadata = ToolBundle(config, tool_manager).unpack(f, staging_dir)
+        except (OSError, ValueError, EOFError) as e:
+            config.print(f"Failed to read bundle {args.archive}: {e}", Fore.RED)
+            sys.exit(1)
+
+        tools = metadata["tools"]
+        missing = [name for name in args.names if name not in tools]
+        if missing:
+            config.print(f"Not in bundle: {', '.join(missing)}", Fore.RED)
+            sys.exit(1)
+        specs = [
+            {
+                "name": name,
+                "url": tool["url"],
+                "ref": tool.get("ref"),
+                "executable": tool.get("executable"),
+                "clone_options": tool.get("clone") or {},
+                "venv": tool.get("venv", False),
+                "source": tool["source"],
+                "overlay": tool["overlay"],
+            }
+            for name, tool in tools.items() if not args.names or name in args.names
+        ]
+
+        # Dependency installers may only use what the bundle ships
+        os.environ.update({
+            "PIP_NO_INDEX": "1",
+            "PIP_FIND_LINKS": metadata["wheelhouse"],
+            "npm_config_offline": "true",
+            "YARN_ENABLE_OFFLINE_MODE": "1",
+        })
+        failed = deploy_all(tool_manager, specs, args.jobs, args.reinstall, use_cache=False)
+    finally:
+        tool_manager.trash.discard(staging_dir)
+        tool_manager.trash.collect_in_background()
+    if failed:
+        sys.exit(1)
+
+def write_profile(path):
+    """Write the trace file and print the slowest phases and commands"""
+    try:
+        profiler.write(path)
+    except OSError as e:
+        config.print(f"Failed to write profile {path}: {e}", Fore.RED)
+        return
+    rows = profiler.summary()
+    config.print(f"\nProfile written to {path}", Fore.CYAN)
+    config.print(f"{'Span':<40} {'Kind':<10} {'Count':>6} {'Total (s)':>10} {'Max (s)':>9}", Fore.CYAN)
+    for category, name, count, total, longest in rows[:25]:
+        config.print(f"{name[:40]:<40} {category:<10} {count:>6} {total:>10.3f} {longest:>9.3f}")
+
+def dispatch(args):
+    """Dispatch to the selected subcommand"""
     if args.command == "install":
         handle_install(args)
     elif args.command == "list":
         handle_list()
+    elif args.command == "status":
+        handle_status(args)
+    elif args.command == "verify-integrity":
+        handle_verify_integrity(args)
     elif args.command == "uninstall":
         handle_uninstall(args)
     elif args.command == "update":
         handle_update(args)
+    elif args.command == "rollback":
+        handle_rollback(args)
+    elif args.command == "gc":
+        handle_gc(args)
+    elif args.command == "dedupe":
+        handle_dedupe(args)
+    elif args.command == "watch":
+        handle_watch(args)
+    elif args.command == "cache":
+        handle_cache(args)
+    elif args.command == "deps":
+        handle_deps(args)
+    elif args.command == "bundle":
+        handle_bundle(args)
     else:
         # If no command specified, show help
         parse_arguments(["-h"])
 
+def main():
+    # Parse command line arguments
+    args = parse_arguments()
+    config.quiet = args.quiet
+    config.no_color = args.no_color
+    config.verbose = args.verbose
+
+    # Initialize colorama
+    init()
+
+    # Show the fancy banner on interactive terminals only
+    if not args.no_banner and sys.stdout.isatty():
+        show_banner()
+    
+    if args.profile:
+        profiler.enable()
+    try:
+        dispatch(args)
+    except MigrationError as e:
+        config.print(str(e), Fore.RED)
+        sys.exit(1)
+    finally:
+        if args.profile:
+            write_profile(args.profile)
+
 if __name__ == "__main__":
     main()
@@ -1,10 +1,16 @@
 import os
-import subprocess
+import stat
+import shutil
 import platform
-import json
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from colorama import Fore
+from tool_registry import ToolRegistry
+from trash import Trash
+from releases import ReleaseLayout, INCOMING_PREFIX
+from profiler import profiler
+from command_runner import runner, CommandError, NETWORK_TIMEOUT, LOCAL_TIMEOUT
 
 class ToolManager:
     """Manages installed tools and their operations"""
@@ -14,72 +20,151 @@ class ToolManager:
         self.install_dir = os.path.expanduser("~/tools")
         self.bin_dir = os.path.expanduser("~/bin")
         self.tools_file = os.path.join(self.install_dir, ".tools.json")
+        self.registry = ToolRegistry(os.path.join(self.install_dir, ".tools.db"), legacy_file=self.tools_file,
+                                     warn=lambda message: config.print(message, Fore.YELLOW))
+        self.cache_dir = os.path.join(self.install_dir, ".cache")
+        self.integrity_file = os.path.join(self.cache_dir, "integrity.db")
+        self.trash = Trash(config, os.path.join(self.install_dir, ".trash"))
+        self.releases = ReleaseLayout(config, self.trash)
+        self._mirrors = None
+        self._venvs = None
+        self._lazy_lock = threading.Lock()
+        self._dedupe_lock = threading.Lock()
         self.shell_configs = {
             'bash': os.path.expanduser("~/.bashrc"),
             'zsh': os.path.expanduser("~/.zshrc"),
             'fish': os.path.expanduser("~/.config/fish/config.fish")
         }
 
-    def _load_tools(self) -> Dict:
-        """Load the tools database"""
-        if os.path.exists(self.tools_file):
-            try:
-                with open(self.tools_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-        return {}
-
-    def _save_tools(self, tools: Dict):
-        """Save the tools database"""
-        os.makedirs(os.path.dirname(self.tools_file), exist_ok=True)
-        with open(self.tools_file, 'w') as f:
-            json.dump(tools, f, indent=4)
+    @property
+    def mirrors(self):
+        """The repository mirror cache, created on first use"""
+        with self._lazy_lock:
+            if self._mirrors is None:
+                from mirror_cache import MirrorCache
+                self._mirrors = MirrorCache(self.config, os.path.join(self.cache_dir, "mirrors"))
+            return self._mirrors
+
+    @property
+    def venvs(self):
+        """The per-tool virtualenv manager, created on first use"""
+        with self._lazy_lock:
+            if self._venvs is None:
+                from venv_manager import VenvManager
+                self._venvs = VenvManager(self.config, os.path.join(self.cache_dir, "store"))
+            return self._venvs
+
+    def get_tool(self, name: str) -> Optional[Dict]:
+        """Return the stored record of a tool, if installed"""
+        return self.registry.get(name)
 
     def list_tools(self) -> List[Dict]:
-        """List all installed tools"""
-        tools = self._load_tools()
+        """List all installed tools with their stored records"""
+        tools = self.registry.all()
         return [
             {
+                **info,
                 'name': name,
-                'path': info['path'],
-                'executable': info['executable'],
-                'installed_at': info['installed_at'],
                 'last_updated': info.get('last_updated', info['installed_at'])
             }
             for name, info in tools.items()
         ]
 
-    def install_tool(self, name: str, path: str, executable: str) -> bool:
-        """Install a new tool"""
-        tools = self._load_tools()
-        tools[name] = {
+    def install_tool(self, name: str, path: str, executable: str,
+                     url: Optional[str] = None, ref: Optional[str] = None,
+                     clone_options: Optional[Dict] = None, venv: Optional[str] = None,
+                     deps: Optional[Dict[str, str]] = None, releases: Optional[List[Dict]] = None,
+                     bytecode: Optional[Dict] = None, archive: Optional[Dict] = None) -> bool:
+        """Install a new tool; archive is what ArchiveSource.fetch returned for tarball installs"""
+        record = {
             'path': path,
             'executable': executable,
             'installed_at': datetime.now().isoformat()
         }
-        self._save_tools(tools)
+        if url:
+            record['url'] = url
+        if ref:
+            record['ref'] = ref
+        if clone_options:
+            record['clone'] = clone_options
+        if venv:
+            record['venv'] = venv
+        if deps:
+            record['deps'] = deps
+        if releases:
+            record['releases'] = releases
+        if bytecode:
+            record['bytecode'] = bytecode
+        if archive:
+            # There is no checkout to ask: the commit and branch come from the download
+            record['archive'] = {'url': archive['url'], 'sha256': archive['sha256']}
+            record.update({field: archive[field] for field in ('commit', 'branch') if archive.get(field)})
+        else:
+            record.update(self._checkout_state(path))
+        self.registry.put(name, record)
+        self.auto_dedupe(path)
+        self.record_integrity(name, path)
         return True
 
+    def tool_roots(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """The directory of each named tool (default: all), which holds every kept release"""
+        tools = self.registry.all()
+        return {name: os.path.realpath(self.releases.root_of(info['path']))
+                for name, info in tools.items() if names is None or name in names}
+
+    def dedupe_roots(self, names: Optional[List[str]] = None) -> List[str]:
+        """Directories holding the named tools (default: all), with every kept release"""
+        return sorted(set(self.tool_roots(names).values()))
+
+    def auto_dedupe(self, path: str):
+        """Link a freshly deployed checkout's files to identical files of other tools, if enabled"""
+        from dedupe import AUTO_DEDUPE, Deduplicator
+        if not AUTO_DEDUPE or not os.path.isdir(path):
+            return
+        from mirror_cache import format_size
+        # One run at a time, so concurrent deploys do not race on the same files
+        with self._dedupe_lock, profiler.span("dedupe"):
+            report = Deduplicator(self.config, os.path.join(self.cache_dir, "dedupe.db")).run(
+                [os.path.realpath(path)], full=False)
+        if report.linked:
+            self.config.print(f"Linked {report.linked} duplicate files, reclaimed {format_size(report.reclaimed)}",
+                              Fore.CYAN)
+
+    def record_integrity(self, name: str, fresh: Optional[str] = None):
+        """Record the manifest verify-integrity checks a tool against; fresh is the newly deployed release"""
+        from integrity import RECORD_INTEGRITY, IntegrityChecker
+        info = self.registry.get(name)
+        if not RECORD_INTEGRITY or not info:
+            return
+        import sqlite3
+        root = os.path.realpath(self.releases.root_of(info['path']))
+        with profiler.span("record_integrity"):
+            try:
+                IntegrityChecker(self.config, self.integrity_file).record(
+                    name, root, os.path.realpath(fresh) if fresh else None)
+            except (OSError, sqlite3.Error) as e:
+                self.config.print(f"Could not record the integrity manifest of {name}: {e}", Fore.YELLOW)
+
     def uninstall_tool(self, name: str) -> bool:
         """Uninstall a tool"""
-        tools = self._load_tools()
-        if name not in tools:
+        info = self.registry.get(name)
+        if not info:
             self.config.print(f"Tool {name} is not installed.", Fore.RED)
             return False
 
-        # Remove the tool directory
-        tool_path = tools[name]['path']
+        # Move the tool directory aside; it is deleted later by the trash collector
+        tool_path = self.releases.root_of(info['path'])
         if os.path.exists(tool_path):
             try:
-                subprocess.run(f"rm -rf {tool_path}", shell=True, check=True)
-            except subprocess.CalledProcessError:
-                self.config.print(f"Failed to remove tool directory: {tool_path}", Fore.RED)
+                self.trash.discard(tool_path)
+            except OSError as e:
+                self.config.print(f"Failed to remove tool directory {tool_path}: {e}", Fore.RED)
                 return False
 
         # Remove the symlink
         symlink_path = os.path.join(self.bin_dir, name)
-        if os.path.exists(symlink_path):
+        # lexists: the link dangles once the tool directory has been moved away
+        if os.path.lexists(symlink_path):
             try:
                 os.remove(symlink_path)
             except Exception as e:
@@ -87,52 +172,486 @@ class ToolManager:
                 return False
 
         # Remove from tools database
-        del tools[name]
-        self._save_tools(tools)
+        self.registry.delete(name)
+        if os.path.exists(self.integrity_file):
+            import sqlite3
+            from integrity import IntegrityChecker
+            try:
+                IntegrityChecker(self.config, self.integrity_file).forget(name)
+            except sqlite3.Error as e:
+                self.config.print(f"Could not drop the integrity manifest of {name}: {e}", Fore.YELLOW)
         return True
 
-    def update_tool(self, name: str) -> bool:
-        """Update an installed tool"""
-        tools = self._load_tools()
-        if name not in tools:
+    def _git_output(self, args: List[str], cwd: Optional[str] = None,
+                    timeout: float = LOCAL_TIMEOUT) -> Optional[str]:
+        """Run a git command and return its stripped output, or None on failure"""
+        result = runner.run(['git'] + args, cwd=cwd, timeout=timeout)
+        if not result.ok:
+            return None
+        return result.stdout.strip() or None
+
+    def _checkout_state(self, path: str) -> Dict:
+        """Record the deployed commit and tracked branch of a checkout"""
+        state = {}
+        commit, branch = runner.run_many([
+            {'argv': ['git', 'rev-parse', 'HEAD'], 'cwd': path},
+            {'argv': ['git', 'symbolic-ref', '--quiet', '--short', 'HEAD'], 'cwd': path},
+        ])
+        if commit.ok and commit.stdout.strip():
+            state['commit'] = commit.stdout.strip()
+        if branch.ok and branch.stdout.strip():
+            state['branch'] = branch.stdout.strip()
+        return state
+
+    def remote_head(self, info: Dict) -> Optional[str]:
+        """Look up the upstream commit of a tool's branch with git ls-remote"""
+        url = info.get('url') or self._git_output(['remote', 'get-url', 'origin'], cwd=info['path'])
+        if not url or not info.get('branch'):
+            return None
+        # ls-remote only transfers refs, so the default quick-command timeout applies
+        output = self._git_output(['ls-remote', url, f"refs/heads/{info['branch']}"])
+        return output.split()[0] if output else None
+
+    def remote_heads(self, infos: Dict[str, Dict],
+                     on_head: Optional[Callable[[str, Optional[str]], None]] = None) -> Dict[str, Optional[str]]:
+        """Look up the upstream commits of several tools concurrently.
+
+        Tools following the same repository and branch share one ls-remote; a
+        tool maps to None when its lookup failed or it follows no branch.
+        on_head(name, head) is called for each tool as soon as its lookup ends.
+        """
+        import asyncio
+        targets: Dict[Tuple[str, str], List[str]] = {}
+        for name, info in infos.items():
+            url = info.get('url') or self._git_output(['remote', 'get-url', 'origin'], cwd=info['path'])
+            if url and info.get('branch'):
+                targets.setdefault((url, info['branch']), []).append(name)
+        heads: Dict[str, Optional[str]] = dict.fromkeys(infos)
+        if on_head:
+            for name in infos.keys() - {name for names in targets.values() for name in names}:
+                on_head(name, None)
+
+        async def lookup(url: str, branch: str):
+            result = await runner.run_async(['git', 'ls-remote', url, f"refs/heads/{branch}"])
+            output = result.stdout.split() if result.ok else []
+            for name in targets[(url, branch)]:
+                heads[name] = output[0] if output else None
+                if on_head:
+                    on_head(name, heads[name])
+
+        async def lookup_all():
+            await asyncio.gather(*(lookup(url, branch) for url, branch in targets))
+        asyncio.run(lookup_all())
+        return heads
+
+    def precompile(self, path: str, record: Optional[Dict] = None, base: Optional[str] = None) -> Optional[Dict]:
+        """Compile a tool's Python code to bytecode and return the record to store; failing only costs the speedup"""
+        from bytecode import BytecodeCompiler
+        with profiler.span("precompile"):
+            try:
+                return BytecodeCompiler(self.config).compile_tool(path, record, base)
+            except OSError as e:
+                self.config.print(f"Could not precompile {path}: {e}", Fore.YELLOW)
+                return None
+
+    def _update_dependencies(self, name: str, info: Dict, force: bool = False) -> Optional[Dict[str, str]]:
+        """Re-run dependency installation for managers whose files changed"""
+        from dependency_manager import DependencyManager
+        dep_manager = DependencyManager(self.config, venvs=self.venvs if info.get('venv') else None,
+                                        venv_dir=info.get('venv'))
+        managers = dep_manager.detect_package_managers(info['path'])
+        with profiler.span("install_dependencies", managers=managers):
+            success, fingerprints = dep_manager.install_changed(info['path'], managers, info.get('deps'), force)
+        if not success:
+            self.config.print(f"Failed to update dependencies of {name}", Fore.RED)
+            return None
+        return fingerprints
+
+    def _update(self, name: str, use_cache: bool = True, force: bool = False, force_deps: bool = False,
+                remote: Optional[str] = None) -> str:
+        """Update a tool and return 'updated', 'up-to-date', 'pinned' or 'failed'.
+
+        remote is the upstream commit if the caller has just looked it up.
+        """
+        with profiler.span(f"update {name}", "tool", tool=name) as fields:
+            fields['status'] = self._update_checkout(name, use_cache, force, force_deps, remote)
+        if fields['status'] == 'updated':
+            self.auto_dedupe(self.registry.get(name)['path'])
+        return fields['status']
+
+    def _update_checkout(self, name: str, use_cache: bool, force: bool, force_deps: bool,
+                         remote: Optional[str] = None) -> str:
+        info = self.registry.get(name)
+        if not info:
             self.config.print(f"Tool {name} is not installed.", Fore.RED)
-            return False
+            return 'failed'
 
-        tool_path = tools[name]['path']
+        tool_path = info['path']
         if not os.path.exists(tool_path):
             self.config.print(f"Tool directory not found: {tool_path}", Fore.RED)
-            return False
+            return 'failed'
+
+        if info.get('commit') and not info.get('branch'):
+            self.config.print(f"{name} is pinned to {info.get('ref') or info['commit'][:12]}, skipping.", Fore.YELLOW)
+            return 'pinned'
+
+        # Skip the fetch entirely when upstream has not moved since the last deploy
+        if remote is None and not force:
+            with profiler.span("remote_head"):
+                remote = self.remote_head(info)
+        unchanged = remote is not None and remote == info.get('commit')
+        if unchanged:
+            self.config.print(f"{name} is already up to date.", Fore.GREEN)
+            if not force_deps:
+                return 'up-to-date'
+            fingerprints = self._update_dependencies(name, info, force=True)
+            if fingerprints is None:
+                return 'failed'
+            self.registry.update(name, {'deps': fingerprints})
+            self.record_integrity(name, tool_path)
+            return 'up-to-date'
+
+        if info.get('archive'):
+            return self._update_archive(name, info, force_deps, remote)
+        if self.releases.uses_releases(self.releases.root_of(tool_path)):
+            return self._update_release(name, info, use_cache, force_deps, remote)
+
+        from contextlib import ExitStack
+        from git_utils import update_commands, rewrite_url
+        clone_options = info.get('clone')
+        commands = update_commands(clone_options)
+        url = info.get('url')
+        with ExitStack() as leases:
+            if use_cache and url:
+                try:
+                    with profiler.span("mirror_sync", url=url):
+                        mirror = leases.enter_context(self.mirrors.lease(url))
+                    commands = rewrite_url(commands, url, self.mirrors.clone_source(mirror, clone_options))
+                except (CommandError, OSError) as e:
+                    self.config.print(f"Mirror cache unavailable, fetching directly: {e}", Fore.YELLOW)
+
+            try:
+                # Update the git repository, preserving its shallow/partial clone strategy
+                with profiler.span("pull"):
+                    for command in commands:
+                        runner.run(command, cwd=tool_path, check=True, retries=3, timeout=NETWORK_TIMEOUT)
+            except CommandError as e:
+                self.config.print(f"Failed to update tool: {e}", Fore.RED)
+                return 'failed'
 
+        # Only reinstall dependencies whose manifests changed in the pull
+        fingerprints = self._update_dependencies(name, info, force=force_deps)
+        if fingerprints is None:
+            return 'failed'
+
+        # Record the new commit, dependency fingerprints and the last_updated timestamp
+        fields = self._checkout_state(tool_path)
+        fields['deps'] = fingerprints
+        fields['bytecode'] = self.precompile(tool_path, info.get('bytecode'), tool_path)
+        fields['last_updated'] = datetime.now().isoformat()
+        self.registry.update(name, fields)
+        self.record_integrity(name, tool_path)
+        return 'updated'
+
+    def _update_release(self, name: str, info: Dict, use_cache: bool, force_deps: bool,
+                        remote: Optional[str] = None) -> str:
+        """Prepare the upstream revision as a new release next to the active one and switch to it.
+
+        The active release keeps serving until the new one has its dependencies
+        and executable in place; any failure leaves it untouched. If upstream
+        points at a release that is still kept (e.g. after a rollback), that
+        release is switched back to directly.
+        """
+        from contextlib import ExitStack
+        from git_utils import clone_commands, rewrite_url
+        root = self.releases.root_of(info['path'])
+        if not force_deps and self._switch_to_kept(name, info, root, remote):
+            return 'updated'
+
+        url = info.get('url') or self._git_output(['remote', 'get-url', 'origin'], cwd=info['path'])
+        if not url:
+            self.config.print(f"No remote URL recorded for {name}", Fore.RED)
+            return 'failed'
+        clone_options = info.get('clone')
+        incoming = self.releases.incoming(root)
+        release = incoming
         try:
-            # Update the git repository
-            subprocess.run("git pull", shell=True, cwd=tool_path, check=True)
-            
-            # Update the last_updated timestamp
-            tools[name]['last_updated'] = datetime.now().isoformat()
-            self._save_tools(tools)
-            
-            return True
-        except subprocess.CalledProcessError as e:
-            self.config.print(f"Failed to update tool: {e}", Fore.RED)
+            commands = clone_commands(url, incoming, clone_options, info.get('ref'))
+            with ExitStack() as leases:
+                if use_cache:
+                    try:
+                        with profiler.span("mirror_sync", url=url):
+                            mirror = leases.enter_context(self.mirrors.lease(url))
+                        commands = rewrite_url(commands, url, self.mirrors.clone_source(mirror, clone_options))
+                    except (CommandError, OSError) as e:
+                        self.config.print(f"Mirror cache unavailable, fetching directly: {e}", Fore.YELLOW)
+                with profiler.span("clone", url=url):
+                    for command in commands:
+                        runner.run(command, check=True, retries=3, timeout=NETWORK_TIMEOUT)
+
+            commit = self._git_output(['rev-parse', 'HEAD'], cwd=incoming)
+            if commit == self.releases.active_commit(root) and not force_deps:
+                self.trash.discard(incoming)
+                self.config.print(f"{name} is already up to date.", Fore.GREEN)
+                return 'up-to-date'
+            release = self.releases.seal(root, incoming)
+            prepared = self._prepare_release(name, info, release, force_deps)
+        except (CommandError, OSError, ValueError) as e:
+            self.config.print(f"Failed to prepare a new release of {name}: {e}", Fore.RED)
+            self.releases.discard(root, release)
+            return 'failed'
+        if prepared is None:
+            self.releases.discard(root, release)
+            return 'failed'
+        return self._activate_release(name, info, root, release, *prepared)
+
+    def _update_archive(self, name: str, info: Dict, force_deps: bool, remote: Optional[str] = None) -> str:
+        """Download the upstream tarball of an archive-mode tool into a new release and switch to it.
+
+        Without a known upstream commit (e.g. ls-remote failed) the tarball is
+        downloaded anyway, and its checksum tells whether anything changed.
+        """
+        from archive import ArchiveSource
+        root = self.releases.root_of(info['path'])
+        archive = info['archive']
+        releases = self.releases.uses_releases(root)
+        if releases and not force_deps and self._switch_to_kept(name, info, root, remote):
+            return 'updated'
+        # Flat checkouts (Windows) are downloaded next to the tool and swapped in
+        incoming = self.releases.incoming(root) if releases else f"{root}{INCOMING_PREFIX}{os.urandom(6).hex()}"
+        release = incoming
+        try:
+            with profiler.span("download", url=info['url']):
+                fetched = ArchiveSource(self.config, archive.get('url')).fetch(
+                    info['url'], incoming, info.get('branch') or info.get('ref'), remote)
+            release_id = fetched['commit'] or fetched['sha256']
+            unchanged = fetched['sha256'] == archive.get('sha256') or release_id == self.releases.active_commit(root)
+            if unchanged and not force_deps:
+                self.trash.discard(incoming)
+                self.config.print(f"{name} is already up to date.", Fore.GREEN)
+                return 'up-to-date'
+            if not releases:
+                self.trash.discard(root)
+                os.rename(incoming, root)
+                return self._update_flat_archive(name, info, fetched, force_deps)
+            release = self.releases.seal(root, incoming, release_id)
+            prepared = self._prepare_release(name, info, release, force_deps)
+        except (CommandError, OSError, ValueError) as e:
+            self.config.print(f"Failed to download a new release of {name}: {e}", Fore.RED)
+            if os.path.lexists(release):
+                if releases:
+                    self.releases.discard(root, release)
+                else:
+                    self.trash.discard(release)
+            return 'failed'
+        if prepared is None:
+            self.releases.discard(root, release)
+            return 'failed'
+        return self._activate_release(name, info, root, release, *prepared, fetched=fetched)
+
+    def _update_flat_archive(self, name: str, info: Dict, fetched: Dict, force_deps: bool) -> str:
+        """Finish an archive update that replaced a flat tool directory in place"""
+        fingerprints = self._update_dependencies(name, info, force=force_deps)
+        if fingerprints is None:
+            return 'failed'
+        self.registry.update(name, {
+            'commit': fetched['commit'], 'archive': {**info['archive'], 'sha256': fetched['sha256']},
+            'deps': fingerprints, 'bytecode': self.precompile(info['path']),
+            'last_updated': datetime.now().isoformat(),
+        })
+        self.record_integrity(name, info['path'])
+        return 'updated'
+
+    def _switch_to_kept(self, name: str, info: Dict, root: str, remote: Optional[str]) -> bool:
+        """Switch back to a kept release of the upstream commit (e.g. after a rollback), if there is one"""
+        kept = next((entry for entry in reversed(info.get('releases') or []) if entry['id'] == remote), None)
+        if not kept or not os.path.isdir(self.releases.release_path(root, kept['id'])):
+            return False
+        current = self.releases.activate(root, self.releases.release_path(root, kept['id']))
+        self.registry.update(name, self._activated_fields(name, info, current, kept['executable'], kept.get('deps'),
+                                                          kept.get('bytecode'), kept.get('sha256')))
+        self.record_integrity(name)
+        self.config.print(f"{name} switched back to kept release {kept['id'][:12]}", Fore.GREEN)
+        return True
+
+    def _prepare_release(self, name: str, info: Dict, release: str,
+                         force_deps: bool) -> Optional[Tuple[str, Dict[str, str], Optional[Dict]]]:
+        """Give a new release its executable, dependencies and bytecode; None if dependencies failed"""
+        executable = self._release_executable(name, info, release)
+        venv_dir = None
+        if info.get('venv'):
+            venv_dir = self.venvs.create(release)
+        recorded = self.reusable_fingerprints(info, bool(info.get('venv')))
+        fingerprints = self._install_release_dependencies(name, info, release, venv_dir, recorded, force_deps)
+        if fingerprints is None:
+            return None
+        # Bytecode of files the update did not touch is linked from the active release
+        bytecode = self.precompile(release, info.get('bytecode'), os.path.realpath(info['path']))
+        return executable, fingerprints, bytecode
+
+    def _activate_release(self, name: str, info: Dict, root: str, release: str, executable: str,
+                          fingerprints: Dict[str, str], bytecode: Optional[Dict],
+                          fetched: Optional[Dict] = None) -> str:
+        """Switch to a prepared release and record it; fetched describes an archive download"""
+        sha256 = fetched['sha256'] if fetched else None
+        with profiler.span("activate"):
+            current = self.releases.activate(root, release)
+        relative = os.path.relpath(executable, release)
+        fields = self._activated_fields(name, info, current, relative, fingerprints, bytecode, sha256)
+        fields['releases'] = self.releases.prune(root, self.releases.record(
+            info.get('releases'), os.path.basename(release), deps=fingerprints, executable=relative,
+            bytecode=bytecode, sha256=sha256))
+        self.registry.update(name, fields)
+        self.record_integrity(name, release)
+        self.trash.collect_in_background()
+        self.config.print(f"{name} switched to release {os.path.basename(release)[:12]}", Fore.GREEN)
+        return 'updated'
+
+    def reusable_fingerprints(self, info: Optional[Dict], venv: bool) -> Dict[str, str]:
+        """Dependency fingerprints that still hold for a fresh checkout of a tool.
+
+        A new release starts without node_modules or venv packages; only the
+        shared Python environment outlives the checkout.
+        """
+        if not info or venv:
+            return {}
+        return {manager: value for manager, value in (info.get('deps') or {}).items() if manager == 'pip'}
+
+    def _release_executable(self, name: str, info: Dict, release: str) -> str:
+        """Find the recorded entry point in a new release, falling back to the best detected candidate"""
+        executable = os.path.join(release, os.path.relpath(info['executable'], info['path']))
+        if not os.path.isfile(executable):
+            from executable_scanner import scan_executables
+            candidates = scan_executables(release, tool_name=name)
+            if not candidates:
+                raise ValueError(f"{os.path.relpath(executable, release)} is gone and no executable was detected")
+            executable = candidates[0][1]
+            self.config.print(f"{name}: entry point moved, using {os.path.relpath(executable, release)}", Fore.YELLOW)
+        if not os.access(executable, os.X_OK):
+            os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+            if not info.get('archive'):
+                runner.run(['git', 'config', 'core.fileMode', 'false'], cwd=release)
+        return executable
+
+    def _install_release_dependencies(self, name: str, info: Dict, release: str, venv_dir: Optional[str],
+                                      recorded: Dict[str, str], force: bool) -> Optional[Dict[str, str]]:
+        from dependency_manager import DependencyManager
+        dep_manager = DependencyManager(self.config, venvs=self.venvs if venv_dir else None, venv_dir=venv_dir)
+        managers = dep_manager.detect_package_managers(release)
+        with profiler.span("install_dependencies", managers=managers):
+            success, fingerprints = dep_manager.install_changed(release, managers, recorded, force)
+        if not success:
+            self.config.print(f"Failed to install dependencies of {name}; keeping the active release", Fore.RED)
+            return None
+        return fingerprints
+
+    def _activated_fields(self, name: str, info: Dict, current: str, relative: str,
+                          fingerprints: Optional[Dict[str, str]], bytecode: Optional[Dict] = None,
+                          sha256: Optional[str] = None) -> Dict:
+        """Registry fields after switching releases; relinks ~/bin if the entry point moved.
+
+        sha256 is the tarball checksum of an archive release.
+        """
+        executable = os.path.join(current, relative)
+        if executable != info['executable']:
+            link = os.path.join(self.bin_dir, name)
+            if info.get('venv'):
+                self.create_launcher(executable, link, info['venv'])
+            else:
+                self.create_symlink(executable, link)
+        if info.get('archive'):
+            # Archive releases have no git metadata; they are named after their commit
+            release_id = os.path.basename(os.path.realpath(current)).split('-', 1)[0]
+            fields = {'commit': release_id if len(release_id) == 40 else None, 'branch': info.get('branch'),
+                      'archive': {**info['archive'], 'sha256': sha256}}
+        else:
+            fields = self._checkout_state(current)
+        fields.update({'executable': executable, 'deps': fingerprints or {}, 'bytecode': bytecode,
+                       'last_updated': datetime.now().isoformat()})
+        # A detached release (e.g. a pinned commit) has no branch to record
+        if 'branch' not in fields:
+            fields['branch'] = None
+        return fields
+
+    def rollback(self, name: str, release_id: Optional[str] = None) -> bool:
+        """Switch a tool back to the previous release, or to the given one"""
+        info = self.registry.get(name)
+        if not info:
+            self.config.print(f"Tool {name} is not installed.", Fore.RED)
+            return False
+        root = self.releases.root_of(info['path'])
+        history = info.get('releases') or []
+        if not self.releases.uses_releases(root) or not history:
+            self.config.print(f"{name} has no previous releases; reinstall it to use the release layout.", Fore.RED)
+            return False
+
+        active = self.releases.active(root)
+        ids = [entry['id'] for entry in history]
+        if release_id:
+            matches = [entry for entry in history if entry['id'].startswith(release_id)]
+            if len(matches) != 1:
+                self.config.print(f"Release {release_id} of {name} is {'ambiguous' if matches else 'not available'}. "
+                                  f"Kept releases: {', '.join(i[:12] for i in ids)}", Fore.RED)
+                return False
+            target = matches[0]
+        else:
+            position = ids.index(active) if active in ids else len(ids)
+            if position == 0:
+                self.config.print(f"{name} is already on its oldest kept release.", Fore.YELLOW)
+                return False
+            target = history[position - 1]
+
+        release = self.releases.release_path(root, target['id'])
+        if not os.path.isdir(release):
+            self.config.print(f"Release {target['id'][:12]} of {name} is missing on disk.", Fore.RED)
             return False
+        current = self.releases.activate(root, release)
+        fields = self._activated_fields(name, info, current, target.get('executable') or
+                                        os.path.relpath(info['executable'], info['path']), target.get('deps'),
+                                        target.get('bytecode'), target.get('sha256'))
+        self.registry.update(name, fields)
+        self.record_integrity(name)
+        self.config.print(f"{name} rolled back to {target['id'][:12]} (activated {target['activated_at']})", Fore.GREEN)
+        return True
+
+    def update_tool(self, name: str, use_cache: bool = True, force: bool = False, force_deps: bool = False) -> bool:
+        """Update an installed tool"""
+        return self._update(name, use_cache=use_cache, force=force, force_deps=force_deps) != 'failed'
+
+    def update_tools(self, names: List[str], jobs: int = 4, use_cache: bool = True,
+                     force: bool = False, force_deps: bool = False,
+                     remotes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Update several tools concurrently and return the status of each.
+
+        remotes maps tools to upstream commits already looked up, which saves their ls-remote.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        remotes = remotes or {}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            statuses = executor.map(
+                lambda name: self._update(name, use_cache=use_cache, force=force, force_deps=force_deps,
+                                          remote=remotes.get(name)), names
+            )
+            return dict(zip(names, statuses))
 
     def ensure_path_in_environment(self):
         """Ensure the bin directory is in the PATH for all supported shells"""
         system = platform.system()
         
-        if system == "Windows":
-            self._ensure_windows_path()
-        else:
-            self._ensure_unix_path()
+        with profiler.span("ensure_path"):
+            if system == "Windows":
+                self._ensure_windows_path()
+            else:
+                self._ensure_unix_path()
 
     def _ensure_windows_path(self):
         """Ensure the bin directory is in the PATH on Windows"""
         try:
             # Use setx to persistently add the bin directory to PATH
             self.config.print(f"Adding {self.bin_dir} to PATH on Windows...", Fore.CYAN)
-            subprocess.run(f'setx PATH "%PATH%;{self.bin_dir}"', shell=True, check=True)
+            runner.run(['setx', 'PATH', f"{os.environ.get('PATH', '')};{self.bin_dir}"], check=True)
             self.config.print("Restart your terminal to apply the changes.", Fore.YELLOW)
-        except subprocess.CalledProcessError as e:
+        except CommandError as e:
             self.config.print(f"Failed to update PATH: {e}", Fore.RED)
 
     def _ensure_unix_path(self):
@@ -166,10 +685,11 @@ class ToolManager:
         system = platform.system()
         
         try:
+            os.makedirs(os.path.dirname(symlink_path), exist_ok=True)
             if system == "Windows":
                 # On Windows, copy the executable to the bin_dir
                 self.config.print(f"Copying {executable} to {symlink_path} on Windows...", Fore.CYAN)
-                subprocess.run(f'copy "{executable}" "{symlink_path}"', shell=True, check=True)
+                shutil.copy2(executable, symlink_path)
             else:
                 # On Unix-like systems, create a symlink
                 self.config.print(f"Creating symlink for {executable} at {symlink_path}...", Fore.CYAN)
@@ -180,4 +700,36 @@ class ToolManager:
             return True
         except Exception as e:
             self.config.print(f"Failed to create symlink: {e}", Fore.RED)
-            return False 
\ No newline at end of file
+            return False
+
+    def create_launcher(self, executable: str, launcher_path: str, venv_dir: str) -> bool:
+        """Create an entry point that runs the executable inside the tool's virtual environment"""
+        try:
+            with open(executable, 'rb') as f:
+                first_line = f.readline(256)
+            is_python = executable.endswith('.py') or (first_line.startswith(b'#!') and b'python' in first_line)
+
+            os.makedirs(os.path.dirname(launcher_path), exist_ok=True)
+            if platform.system() == "Windows":
+                launcher_path += ".cmd"
+                python = os.path.join(venv_dir, "Scripts", "python.exe")
+                command = f'"{python}" "{executable}"' if is_python else f'"{executable}"'
+                content = (f'@echo off\r\nset "VIRTUAL_ENV={venv_dir}"\r\n'
+                           f'set "PATH={venv_dir}\\Scripts;%PATH%"\r\n{command} %*\r\n')
+            else:
+                python = os.path.join(venv_dir, "bin", "python")
+                command = f'exec "{python}" "{executable}" "$@"' if is_python else f'exec "{executable}" "$@"'
+                content = (f'#!/bin/sh\nVIRTUAL_ENV="{venv_dir}"\nPATH="$VIRTUAL_ENV/bin:$PATH"\n'
+                           f'export VIRTUAL_ENV PATH\n{command}\n')
+
+            self.config.print(f"Creating launcher for {executable} at {launcher_path}...", Fore.CYAN)
+            if os.path.lexists(launcher_path):
+                os.remove(launcher_path)
+            with open(launcher_path, 'w') as f:
+                f.write(content)
+            os.chmod(launcher_path, 0o755)
+            self.config.print(f"Launcher created: {launcher_path}", Fore.GREEN)
+            return True
+        except Exception as e:
+            self.config.print(f"Failed to create launcher: {e}", Fore.RED)
+            return False
@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+# Fields stored in their own columns; everything else lives in the JSON 'extra' column
+COLUMNS = ('path', 'executable', 'url', 'installed_at', 'last_updated')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tools (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    executable TEXT,
+    url TEXT,
+    installed_at TEXT,
+    last_updated TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_tools_url ON tools (url);
+CREATE INDEX IF NOT EXISTS idx_tools_installed_at ON tools (installed_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class MigrationError(Exception):
+    """The legacy .tools.json exists but cannot be imported; it is left untouched"""
+
+class ToolRegistry:
+    """SQLite-backed tools database that is safe for concurrent deployer processes.
+
+    The database runs in WAL mode so readers never block writers, and every
+    change is a short IMMEDIATE transaction touching a single tool.
+    """
+
+    def __init__(self, db_file: str, legacy_file: Optional[str] = None, timeout: float = 30.0,
+                 warn: Optional[Callable[[str], None]] = None):
+        self.db_file = db_file
+        self.legacy_file = legacy_file
+        self.timeout = timeout
+        self.warn = warn or (lambda message: None)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_file, timeout=self.timeout, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _initialize(self):
+        if self._initialized:
+            return
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._migrate(connection)
+        finally:
+            connection.close()
+        self._initialized = True
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction that is rolled back on error"""
+        self._initialize()
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def _migrate(self, connection: sqlite3.Connection):
+        """Import the legacy .tools.json once, then keep it only as a backup"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                connection.execute("COMMIT")
+                return
+            try:
+                with open(self.legacy_file, 'r') as f:
+                    tools = json.load(f)
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                # A truncated file must not be taken for an empty one and archived
+                raise MigrationError(f"Cannot read {self.legacy_file} ({e}); fix or remove it to continue") from e
+            if not isinstance(tools, dict):
+                raise MigrationError(f"{self.legacy_file} does not hold a tools object; fix or remove it to continue")
+            for name, info in tools.items():
+                if not isinstance(info, dict) or not info.get('path'):
+                    self.warn(f"Skipping {name} from {self.legacy_file}: the record has no install path")
+                    continue
+                self._write(connection, name, info)
+            connection.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (self.legacy_file,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+
+    def _write(self, connection: sqlite3.Connection, name: str, info: Dict):
+        extra = {key: value for key, value in info.items() if key not in COLUMNS}
+        connection.execute(
+            """
+            INSERT INTO tools (name, path, executable, url, installed_at, last_updated, extra)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                path = excluded.path, executable = excluded.executable, url = excluded.url,
+                installed_at = excluded.installed_at, last_updated = excluded.last_updated,
+                extra = excluded.extra
+            """,
+            (name, *[info.get(column) for column in COLUMNS], json.dumps(extra))
+        )
+
+    def _row_to_info(self, row: sqlite3.Row) -> Dict:
+        info = {column: row[column] for column in COLUMNS if row[column] is not None}
+        info.update(json.loads(row['extra'] or '{}'))
+        return info
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Return a tool's record"""
+        self._initialize()
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM tools WHERE name = ?", (name,)).fetchone()
+        finally:
+            connection.close()
+        return self._row_to_info(row) if row else None
+
+    def all(self) -> Dict[str, Dict]:
+        """Return every record, in installation order"""
+        self._initialize()
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT * FROM tools ORDER BY rowid").fetchall()
+        finally:
+            connection.close()
+        return {row['name']: self._row_to_info(row) for row in rows}
+
+    def put(self, name: str, info: Dict):
+        """Insert or replace a tool's record"""
+        with self._transaction() as connection:
+            self._write(connection, name, info)
+
+    def update(self, name: str, fields: Dict) -> bool:
+        """Merge fields into an existing record atomically; returns False if it does not exist"""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT * FROM tools WHERE name = ?", (name,)).fetchone()
+            if not row:
+                return False
+            info = self._row_to_info(row)
+            info.update(fields)
+            self._write(connection, name, info)
+        return True
+
+    def delete(self, name: str) -> bool:
+        """Remove a tool's record; returns False if it did not exist"""
+        with self._transaction() as connection:
+            cursor = connection.execute("DELETE FROM tools WHERE name = ?", (name,))
+        return cursor.rowcount > 0
@@ -0,0 +1,151 @@
+import os
+import sys
+import stat
+import errno
+import subprocess
+from typing import List, Tuple
+from colorama import Fore
+
+# Set to 0 to leave trashed directories for an explicit 'gc' instead of a background process
+BACKGROUND_GC = os.environ.get('TOOL_DEPLOYER_BACKGROUND_GC', '1') != '0'
+
+class Trash:
+    """Constant-time directory removal: trees are renamed into a trash directory
+    and deleted later, by a background 'gc' process or an explicit 'gc' command.
+
+    The trash lives next to the tools so the rename never crosses filesystems.
+    Anything left behind by an interrupted deletion stays in the trash and is
+    picked up by the next collection.
+    """
+
+    _collector_started = False
+
+    def __init__(self, config, trash_dir: str):
+        self.config = config
+        self.trash_dir = trash_dir
+        # Whether this run put anything in the trash
+        self.discarded = False
+
+    def discard(self, path: str) -> str:
+        """Move a directory into the trash and return its new location"""
+        os.makedirs(self.trash_dir, exist_ok=True)
+        target = os.path.join(self.trash_dir, f"{os.path.basename(path.rstrip(os.sep))}.{os.urandom(6).hex()}")
+        try:
+            os.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Different filesystem: there is no cheap way out, so delete it here
+            delete_tree(path)
+            return path
+        self.discarded = True
+        return target
+
+    def entries(self) -> List[str]:
+        try:
+            return [entry.path for entry in os.scandir(self.trash_dir)]
+        except FileNotFoundError:
+            return []
+
+    def collect(self, jobs: int = 8) -> Tuple[int, List[str]]:
+        """Delete everything in the trash, subtrees in parallel; returns the number removed and any errors"""
+        entries = self.entries()
+        if not entries:
+            return 0, []
+        from concurrent.futures import ThreadPoolExecutor
+        errors: List[str] = []
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            # Work is split two levels down, below the big trees such as .git,
+            # node_modules and .venv, so a single large tool still fans out
+            tasks = []
+            for entry in entries:
+                for child in _children(entry):
+                    grandchildren = _children(child)
+                    tasks.extend(executor.submit(delete_tree, path, errors) for path in grandchildren)
+                    if not grandchildren:
+                        tasks.append(executor.submit(delete_tree, child, errors))
+            for task in tasks:
+                task.result()
+        removed = 0
+        for entry in entries:
+            # Sweep up the directories left above the deleted subtrees
+            delete_tree(entry, errors)
+            removed += not os.path.lexists(entry)
+        return removed, errors
+
+    def collect_in_background(self):
+        """Start a detached 'gc' process if this run discarded anything and has not started one yet"""
+        if not BACKGROUND_GC or not self.discarded or Trash._collector_started:
+            return
+        Trash._collector_started = True
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_deployer.py")
+        options = {'start_new_session': True} if os.name == 'posix' else \
+            {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        try:
+            subprocess.Popen([sys.executable, script, "--quiet", "--no-banner", "gc"], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True, **options)
+        except OSError as e:
+            self.config.print(f"Could not start background cleanup, run 'gc' later: {e}", Fore.YELLOW)
+
+def _children(path: str) -> List[str]:
+    """Entries of a real directory; empty for files, symlinks and missing paths"""
+    try:
+        if not stat.S_ISDIR(os.lstat(path).st_mode):
+            return []
+        return [entry.path for entry in os.scandir(path)]
+    except OSError:
+        return []
+
+def _unlink(path: str, errors: List[str]):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        # Read-only files (git objects on Windows) cannot be deleted until made writable
+        try:
+            os.chmod(path, stat.S_IWRITE)
+            os.unlink(path)
+        except OSError as e:
+            errors.append(f"{path}: {e}")
+    except OSError as e:
+        errors.append(f"{path}: {e}")
+
+def delete_tree(path: str, errors: List[str] = None):
+    """Delete a file or directory tree with os.scandir; missing entries are fine, since
+    another collector may be deleting the same tree. Failures are appended to errors,
+    or raised when errors is None."""
+    collected = [] if errors is None else errors
+    stack = [(path, False)]
+    while stack:
+        current, scanned = stack.pop()
+        if scanned:
+            try:
+                os.rmdir(current)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                collected.append(f"{current}: {e}")
+            continue
+        try:
+            is_dir = stat.S_ISDIR(os.lstat(current).st_mode)
+        except FileNotFoundError:
+            continue
+        if not is_dir:
+            _unlink(current, collected)
+            continue
+        # Remove the directory once its children are gone
+        stack.append((current, True))
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, False))
+                    else:
+                        _unlink(entry.path, collected)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            collected.append(f"{current}: {e}")
+    if errors is None and collected:
+        raise OSError(f"could not delete {path}: {collected[0]}")
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import platform
+import tempfile
+import threading
+import zipfile
+import configparser
+from typing import Callable, Dict, List, Optional
+from colorama import Fore
+from packaging.utils import canonicalize_name
+from command_runner import runner, CommandError, NETWORK_TIMEOUT
+
+VENV_DIRNAME = ".venv"
+
+def file_sha256(path: str) -> str:
+    """Hash a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class VenvManager:
+    """Creates per-tool virtual environments whose packages are hardlinked from a shared store.
+
+    Each resolved distribution is unpacked once into packages/<key>, where the key is
+    the sha256 of the artifact pip resolved (plus the interpreter tag for sdists that
+    have to be built). Venvs only receive hardlinks to those files.
+    """
+
+    def __init__(self, config, store_dir: str):
+        self.config = config
+        self.store_dir = store_dir
+        self.packages_dir = os.path.join(store_dir, "packages")
+        self.windows = platform.system() == "Windows"
+        self.python_tag = f"{sys.implementation.name}{sys.version_info[0]}{sys.version_info[1]}"
+        self._lock = threading.Lock()
+
+    def venv_path(self, tool_dir: str) -> str:
+        return os.path.join(tool_dir, VENV_DIRNAME)
+
+    def bin_path(self, venv_dir: str) -> str:
+        return os.path.join(venv_dir, "Scripts" if self.windows else "bin")
+
+    def python_path(self, venv_dir: str) -> str:
+        return os.path.join(self.bin_path(venv_dir), "python.exe" if self.windows else "python")
+
+    def site_packages(self, venv_dir: str) -> str:
+        if self.windows:
+            return os.path.join(venv_dir, "Lib", "site-packages")
+        return os.path.join(venv_dir, "lib", f"python{sys.version_info[0]}.{sys.version_info[1]}", "site-packages")
+
+    def create(self, tool_dir: str) -> str:
+        """Create the tool's virtual environment if it does not exist yet"""
+        venv_dir = self.venv_path(tool_dir)
+        if not os.path.exists(self.python_path(venv_dir)):
+            self.config.print(f"Creating virtual environment in {venv_dir}...", Fore.CYAN)
+            # Packages are linked in from the store, so pip itself is not needed in the venv
+            runner.run([sys.executable, "-m", "venv", "--without-pip", venv_dir], check=True)
+        return venv_dir
+
+    def requirement_args(self, tool_dir: str) -> Optional[List[str]]:
+        requirements = os.path.join(tool_dir, "requirements.txt")
+        if os.path.exists(requirements):
+            return ["-r", requirements]
+        if any(os.path.exists(os.path.join(tool_dir, f)) for f in ["setup.py", "pyproject.toml"]):
+            return [tool_dir]
+        return None
+
+    def resolve(self, tool_dir: str, on_start: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Resolve the full set of distributions for a tool without installing anything"""
+        args = self.requirement_args(tool_dir)
+        if not args:
+            return []
+        result = runner.run(
+            [sys.executable, "-m", "pip", "install", "--dry-run", "--ignore-installed",
+             "--quiet", "--report", "-", *args],
+            cwd=tool_dir, retries=3, timeout=NETWORK_TIMEOUT, on_start=on_start
+        )
+        if not result.ok:
+            raise RuntimeError(result.stderr.strip() or result.describe())
+        return json.loads(result.stdout).get("install", [])
+
+    def _store_key(self, item: Dict) -> Optional[str]:
+        """Content key of a resolved distribution, or None if it has no stable archive hash"""
+        info = item.get("download_info", {})
+        sha256 = info.get("archive_info", {}).get("hashes", {}).get("sha256")
+        if not sha256:
+            return None
+        # Built sdists are specific to the interpreter that built them
+        return sha256 if info.get("url", "").endswith(".whl") else f"{sha256}-{self.python_tag}"
+
+    def _build_spec(self, item: Dict) -> str:
+        info = item["download_info"]
+        vcs = info.get("vcs_info")
+        if vcs:
+            return f"{vcs['vcs']}+{info['url']}@{vcs['commit_id']}"
+        return info["url"]
+
+    def _unpack(self, wheel_path: str, key: str) -> str:
+        """Unpack a wheel into the store, separating site-packages, scripts and data files"""
+        entry = os.path.join(self.packages_dir, key)
+        staging = tempfile.mkdtemp(prefix=f"{key}.", dir=self.packages_dir)
+        try:
+            with zipfile.ZipFile(wheel_path) as wheel:
+                for member in wheel.infolist():
+                    parts = member.filename.split("/")
+                    if member.is_dir() or ".." in parts:
+                        continue
+                    target = ["site"] + parts
+                    if parts[0].endswith(".data") and len(parts) > 2:
+                        # <name>.data/{purelib,platlib,scripts,data,headers}/...
+                        scheme, rest = parts[1], parts[2:]
+                        target = (["site"] if scheme in ("purelib", "platlib") else [scheme]) + rest
+                    destination = os.path.join(staging, *target)
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    with wheel.open(member) as src, open(destination, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    mode = (member.external_attr >> 16) & 0o777
+                    if mode:
+                        os.chmod(destination, mode)
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+        return entry
+
+    def _populate(self, items: List[Dict], on_start: Optional[Callable[[int], None]] = None) -> Dict[str, str]:
+        """Make sure every resolved distribution is unpacked in the store; returns name -> entry"""
+        os.makedirs(self.packages_dir, exist_ok=True)
+        entries = {}
+        missing = []
+        for item in items:
+            name = canonicalize_name(item["metadata"]["name"])
+            key = self._store_key(item)
+            if key and os.path.isdir(os.path.join(self.packages_dir, key)):
+                entries[name] = os.path.join(self.packages_dir, key)
+            else:
+                missing.append((name, key, item))
+
+        if not missing:
+            return entries
+
+        with tempfile.TemporaryDirectory(dir=self.store_dir) as wheelhouse:
+            self.config.print(f"Fetching {len(missing)} packages into the shared store...", Fore.CYAN)
+            runner.run(
+                [sys.executable, "-m", "pip", "wheel", "--no-deps", "--quiet", "-w", wheelhouse,
+                 *[self._build_spec(item) for _, _, item in missing]],
+                check=True, retries=3, timeout=NETWORK_TIMEOUT, echo=not self.config.quiet, on_start=on_start
+            )
+            wheels = {}
+            for wheel in os.listdir(wheelhouse):
+                if wheel.endswith(".whl"):
+                    wheels[canonicalize_name(wheel.split("-")[0])] = os.path.join(wheelhouse, wheel)
+
+            with self._lock:
+                for name, key, _ in missing:
+                    wheel_path = wheels.get(name)
+                    if not wheel_path:
+                        raise RuntimeError(f"pip did not produce a wheel for {name}")
+                    key = key or file_sha256(wheel_path)
+                    entry = os.path.join(self.packages_dir, key)
+                    entries[name] = entry if os.path.isdir(entry) else self._unpack(wheel_path, key)
+        return entries
+
+    def _link_tree(self, source: str, destination: str):
+        """Hardlink every file of source into destination, copying across filesystems"""
+        for root, _, files in os.walk(source):
+            target_root = os.path.join(destination, os.path.relpath(root, source))
+            os.makedirs(target_root, exist_ok=True)
+            for file in files:
+                target = os.path.join(target_root, file)
+                if os.path.lexists(target):
+                    os.remove(target)
+                try:
+                    os.link(os.path.join(root, file), target)
+                except OSError:
+                    shutil.copy2(os.path.join(root, file), target)
+
+    def _remove_installed(self, site_packages: str, name: str):
+        """Remove a previously linked version of a distribution using its RECORD"""
+        if not os.path.isdir(site_packages):
+            return
+        for entry in os.listdir(site_packages):
+            if not entry.endswith(".dist-info") or canonicalize_name(entry[:-len(".dist-info")].rsplit("-", 1)[0]) != name:
+                continue
+            record = os.path.join(site_packages, entry, "RECORD")
+            if os.path.exists(record):
+                with open(record, "r") as f:
+                    for line in f:
+                        path = os.path.normpath(os.path.join(site_packages, line.split(",")[0]))
+                        if path.startswith(site_packages) and os.path.isfile(path):
+                            os.remove(path)
+                            if path.endswith(".py"):
+                                # The store compiles its packages, so RECORD does not list their bytecode
+                                from importlib.util import cache_from_source
+                                if os.path.isfile(cache_from_source(path)):
+                                    os.remove(cache_from_source(path))
+            shutil.rmtree(os.path.join(site_packages, entry), ignore_errors=True)
+
+    def _write_scripts(self, entry: str, venv_dir: str):
+        """Create per-venv launchers for a distribution's scripts and console entry points"""
+        bin_dir = self.bin_path(venv_dir)
+        python = self.python_path(venv_dir)
+
+        scripts_dir = os.path.join(entry, "scripts")
+        if os.path.isdir(scripts_dir):
+            for script in os.listdir(scripts_dir):
+                with open(os.path.join(scripts_dir, script), "rb") as f:
+                    content = f.read()
+                # Wheel scripts use a '#!python' placeholder shebang
+                if content.startswith(b"#!python"):
+                    content = b"#!" + python.encode() + content[len(b"#!python"):]
+                self._write_executable(os.path.join(bin_dir, script), content)
+
+        site = os.path.join(entry, "site")
+        dist_infos = [d for d in os.listdir(site) if d.endswith(".dist-info")] if os.path.isdir(site) else []
+        for dist_info in dist_infos:
+            entry_points = os.path.join(site, dist_info, "entry_points.txt")
+            if not os.path.exists(entry_points):
+                continue
+            parser = configparser.ConfigParser(delimiters=("=",))
+            parser.optionxform = str
+            parser.read(entry_points)
+            if not parser.has_section("console_scripts"):
+                continue
+            for script, target in parser.items("console_scripts"):
+                module, _, func = target.strip().partition(":")
+                func = func.split("[")[0].strip()
+                launcher = (
+                    f"#!{python}\nimport sys\nfrom {module.strip()} import {func.split('.')[0]}\n"
+                    f"sys.exit({func}())\n"
+                )
+                self._write_executable(os.path.join(bin_dir, script), launcher.encode())
+
+    def _write_executable(self, path: str, content: bytes):
+        if os.path.lexists(path):
+            os.remove(path)
+        with open(path, "wb") as f:
+            f.write(content)
+        os.chmod(path, 0o755)
+
+    def install_requirements(self, tool_dir: str, venv_dir: str, on_start: Optional[Callable[[int], None]] = None) -> bool:
+        """Install a tool's Python dependencies into its venv by linking them from the store.
+
+        on_start receives the process id of each pip command, so callers can cancel it.
+        """
+        try:
+            items = self.resolve(tool_dir, on_start)
+            if not items:
+                self.config.print("No Python requirements to install.", Fore.YELLOW)
+                return True
+            entries = self._populate(items, on_start)
+            # Compiled in the store before linking, so the venv gets the bytecode along with the sources
+            from bytecode import BytecodeCompiler
+            BytecodeCompiler(self.config).compile_packages(entries.values())
+
+            site_packages = self.site_packages(venv_dir)
+            self.config.print(f"Linking {len(entries)} packages into {venv_dir}...", Fore.CYAN)
+            for name, entry in entries.items():
+                self._remove_installed(site_packages, name)
+                self._link_tree(os.path.join(entry, "site"), site_packages)
+                if os.path.isdir(os.path.join(entry, "data")):
+                    self._link_tree(os.path.join(entry, "data"), venv_dir)
+                self._write_scripts(entry, venv_dir)
+            return True
+        except (OSError, RuntimeError, CommandError, json.JSONDecodeError) as e:
+            self.config.print(f"Failed to install dependencies into {venv_dir}: {e}", Fore.RED)
+            return False
@@ -0,0 +1,200 @@
+import os
+import time
+import random
+import signal
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from colorama import Fore
+from command_runner import backoff_delay
+
+# Check interval for a tool that just changed, and the longest it can stretch to
+DEFAULT_INTERVAL = 3600.0
+MAX_INTERVAL = 24 * 3600.0
+# Budget of git requests (ls-remote checks and fetches) per minute
+DEFAULT_RATE = 30.0
+# Each check is moved by up to this fraction of its interval, so tools spread out over time
+JITTER = 0.1
+# A check that finds nothing new stretches the tool's interval by this factor
+GROWTH = 1.5
+# Delay before retrying a failed check or update, doubled with each consecutive failure
+RETRY_BASE = 60.0
+# The tools database is re-read at least this often to pick up installs and uninstalls
+IDLE_WAKEUP = 60.0
+
+def parse_duration(value: str) -> float:
+    """Parse a duration such as 90, 30m, 6h or 1d into seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    value = str(value).strip().lower()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+class RateBudget:
+    """Token bucket allowing 'rate' requests per minute in bursts of up to 'burst'"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.per_second = rate / 60.0
+        self.burst = burst if burst is not None else max(1.0, rate / 4)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def available(self) -> int:
+        self._refill()
+        return max(0, int(self.tokens))
+
+    def charge(self, count: float = 1):
+        """Spend tokens; the balance may go negative, which holds back later requests"""
+        self._refill()
+        self.tokens -= count
+
+    def wait_time(self, count: float = 1) -> float:
+        """Seconds until count tokens are available"""
+        self._refill()
+        return max(0.0, (count - self.tokens) / self.per_second)
+
+class UpdateWatcher:
+    """Keeps installed tools up to date from a long-running foreground process.
+
+    Every tool is checked on its own schedule with one git ls-remote, and only
+    tools whose upstream commit moved are fetched and get their changed
+    dependency manifests reinstalled. Intervals stretch while a tool stays
+    unchanged, failures back off exponentially, and all git requests are charged
+    to a requests-per-minute budget. The schedule is kept in the tools database
+    under 'watch', so a restarted watcher carries on where the last one stopped.
+    """
+
+    def __init__(self, config, tool_manager, interval: float = DEFAULT_INTERVAL,
+                 max_interval: float = MAX_INTERVAL, rate: float = DEFAULT_RATE, jobs: int = 4,
+                 use_cache: bool = True, names: Optional[List[str]] = None):
+        self.config = config
+        self.tool_manager = tool_manager
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.rate = rate
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.names = set(names) if names else None
+        self.budget = RateBudget(rate)
+        self.stop_requested = threading.Event()
+        self.failures = 0
+
+    def _log(self, message: str, color=Fore.WHITE):
+        self.config.print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", color)
+
+    def watched(self) -> Dict[str, Dict]:
+        """Installed tools that follow a branch; pinned tools have nothing to check"""
+        tools = self.tool_manager.registry.all()
+        return {name: info for name, info in tools.items()
+                if info.get('branch') and (self.names is None or name in self.names)}
+
+    def schedule(self, info: Dict) -> Dict:
+        """A tool's watch state, with defaults for tools that were never checked"""
+        state = dict(info.get('watch') or {})
+        state['interval'] = min(self.max_interval, max(self.interval, state.get('interval', self.interval)))
+        state.setdefault('next_check', 0.0)
+        state.setdefault('failures', 0)
+        return state
+
+    def due(self, tools: Dict[str, Dict], now: float) -> List[str]:
+        """Tools whose next check has come, most overdue first"""
+        pending = sorted((self.schedule(info)['next_check'], name) for name, info in tools.items())
+        return [name for next_check, name in pending if next_check <= now]
+
+    def _idle_time(self, tools: Dict[str, Dict]) -> float:
+        upcoming = [self.schedule(info)['next_check'] for info in tools.values()]
+        if not upcoming:
+            return IDLE_WAKEUP
+        return min(IDLE_WAKEUP, max(1.0, min(upcoming) - time.time()))
+
+    def check(self, due: List[str], tools: Dict[str, Dict], allowed: int):
+        """Check a batch of due tools within the budget and update the ones that changed"""
+        batch, repositories = {}, set()
+        for name in due:
+            info = tools[name]
+            repository = (info.get('url') or info['path'], info['branch'])
+            # Tools sharing a repository ride along on the same ls-remote
+            if repository not in repositories:
+                if len(repositories) >= allowed:
+                    continue
+                repositories.add(repository)
+            batch[name] = info
+        self.budget.charge(len(repositories))
+        heads = self.tool_manager.remote_heads(batch)
+
+        changed = {name: head for name, head in heads.items() if head and head != batch[name].get('commit')}
+        results: Dict[str, str] = {}
+        if changed:
+            self.budget.charge(len(changed))
+            self._log(f"Upstream changed for {', '.join(sorted(changed))}, updating...", Fore.CYAN)
+            results = self.tool_manager.update_tools(sorted(changed), jobs=self.jobs, use_cache=self.use_cache,
+                                                     remotes=changed)
+            if self.tool_manager.trash.discarded:
+                # Replaced releases are deleted here; a watcher outlives any one background collector
+                self.tool_manager.trash.collect(self.jobs)
+                self.tool_manager.trash.discarded = False
+
+        now = time.time()
+        for name, info in batch.items():
+            self._record(name, self.schedule(info), heads[name], results.get(name), now)
+
+    def _record(self, name: str, state: Dict, head: Optional[str], status: Optional[str], now: float):
+        state['last_checked'] = datetime.now().isoformat()
+        if head is None or status == 'failed':
+            state['failures'] += 1
+            state['error'] = "update failed" if head else "could not reach upstream"
+            delay = backoff_delay(state['failures'], RETRY_BASE, state['interval'])
+            self.failures += 1
+            self._log(f"{name}: {state['error']} ({state['failures']} in a row), retrying in {delay:.0f}s",
+                      Fore.RED)
+        else:
+            if status == 'updated':
+                self._log(f"{name} updated to {head[:12]}", Fore.GREEN)
+                state['interval'] = self.interval
+            else:
+                state['interval'] = min(self.max_interval, state['interval'] * GROWTH)
+            state['remote'] = head
+            state['failures'] = 0
+            state.pop('error', None)
+            delay = state['interval'] * random.uniform(1 - JITTER, 1 + JITTER)
+        state['next_check'] = now + delay
+        self.tool_manager.registry.update(name, {'watch': state})
+
+    def _handle_signal(self, signum, frame):
+        if self.stop_requested.is_set():
+            raise KeyboardInterrupt
+        self._log("Stopping after the running checks and updates finish...", Fore.YELLOW)
+        self.stop_requested.set()
+
+    def run(self, once: bool = False) -> int:
+        """Check and update tools until stopped, or until nothing is due with once; returns the failure count"""
+        # A daemon has nobody to answer credential prompts
+        os.environ.setdefault('GIT_TERMINAL_PROMPT', '0')
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(signum, self._handle_signal)
+        self._log(f"Watching {len(self.watched())} tools, budget {self.rate:g} requests/min", Fore.CYAN)
+        try:
+            while not self.stop_requested.is_set():
+                tools = self.watched()
+                due = self.due(tools, time.time())
+                if not due:
+                    if once:
+                        break
+                    self.stop_requested.wait(self._idle_time(tools))
+                    continue
+                allowed = self.budget.available()
+                if not allowed:
+                    self.stop_requested.wait(self.budget.wait_time())
+                    continue
+                self.check(due, tools, allowed)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        return self.failures